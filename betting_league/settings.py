@@ -57,10 +57,56 @@ if DATABASE_URL:
         DATABASE_URL, conn_max_age=600, ssl_require=False
     )
 
+# Optional read replica for the read-only league pages (league/replica.py)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = dj_database_url.parse(DATABASE_REPLICA_URL, conn_max_age=600, ssl_require=False)
+else:
+    # a second connection to the primary, unused (REPLICA_DB_ALIAS is None) but there for the routing tests
+    DATABASES["replica"] = dict(DATABASES["default"])
+# tests don't build a second database: the replica alias reads the default test database
+DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["league.replica.ReplicaRouter"]
+REPLICA_DB_ALIAS = "replica" if DATABASE_REPLICA_URL else None
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "15"))  # reads pinned to primary after a write
+
 # Safety: don't allow SQLite in prod accidentally
 if not DEBUG and not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set in production")
 
+# --- Cache (versioned standings/dashboard payloads; see league/cache.py) ---
+# Must be shared by all gunicorn workers: Redis if REDIS_URL is set (pip install redis),
+# otherwise a file cache on local disk. DEBUG without either uses in-process memory.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+elif DEBUG:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", "/tmp/betting_league_cache"),
+        }
+    }
+LEAGUE_CACHE_TIMEOUT = int(os.getenv("LEAGUE_CACHE_TIMEOUT", str(7 * 24 * 3600)))
+# single-flight rebuilds: how long a rebuild lock lives, how long a request with nothing stale waits for it
+LEAGUE_CACHE_LOCK_SECONDS = 30
+LEAGUE_CACHE_WAIT_SECONDS = 2.0
+# re-warm after a version bump commits: "background" (a thread, off the request), "inline" or "off"
+LEAGUE_CACHE_WARM = os.getenv("LEAGUE_CACHE_WARM", "background")
+
+# --- Odds feed (manage.py ingest_odds; league/odds.py) ---
+ODDS_API_URL = os.getenv("ODDS_API_URL", "")
+ODDS_API_KEY = os.getenv("ODDS_API_KEY", "")
+
+# --- Request metrics (league/metrics.py, served at /metrics) ---
+# Each gunicorn worker writes its numbers here; /metrics merges them. Staff can view
+# the page; a scraper can send "Authorization: Bearer $METRICS_TOKEN" instead.
+METRICS_DIR = os.getenv("METRICS_DIR", "/tmp/betting_league_metrics")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -76,12 +122,16 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'league.middleware.RequestMetricsMiddleware',
+    'league.middleware.SeasonSnapshotMiddleware',
+    'league.replica.StickyPrimaryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'league.middleware.RecomputeCoalescingMiddleware',
 ]
 
 ROOT_URLCONF = 'betting_league.urls'
@@ -154,6 +204,9 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # ]
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Pre-rendered pages of finalized seasons (manage.py finalize_season), served by league.middleware
+SEASON_SNAPSHOT_DIR = os.getenv("SEASON_SNAPSHOT_DIR", str(BASE_DIR / "season_snapshots"))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,98 +1,75 @@
 # league/admin.py
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils import timezone
 from .models import Season, Team, TeamMembership, Bet, TeamParlay
-from .sevices import recompute_team_parlay
-from .models import FuturePick
+from .sevices import recompute_team_parlays, settle_bets, set_parlay_status, settle_futures_market, reprice_parlays
+from .models import FuturePick, UnitsLedger, RevealSnapshot, BetArchive, Game, Market, Selection
+from . import exposure, ledger, settlement
+from .cache import bump_season_version
 
 # ---------- Admin actions ----------
-def _affected_groups(qs):
+def _settle(queryset, status):
     """
-    Return distinct (team_id, season_year, week) triplets for a queryset of Bets.
-    We pull season__year so we don't need to re-fetch Season objects later.
+    Bets go through the set-based settlement service (constant queries however
+    many team/week parlays are touched); their parlays are re-derived from the legs.
     """
-    return list(qs.values_list("team_id", "season__year", "week").distinct())
-
-def _recompute_from_groups(groups):
-    teams = {t.id: t for t in Team.objects.filter(id__in=[g[0] for g in groups])}
-    for team_id, season_year, week in groups:
-        recompute_team_parlay(teams[team_id], season_year, week)
+    return settle_bets(queryset, status)
 
 @admin.action(description="Mark selected bets WON")
 def mark_won(modeladmin, request, queryset):
-    groups = _affected_groups(queryset)            # collect BEFORE update()
-    n = queryset.update(status="WON", settled_at=timezone.now())
-    _recompute_from_groups(groups)
+    n = _settle(queryset, "WON")
     modeladmin.message_user(request, f"Marked {n} bets as WON and updated affected parlays.")
 
 @admin.action(description="Mark selected bets LOST")
 def mark_lost(modeladmin, request, queryset):
-    groups = _affected_groups(queryset)
-    n = queryset.update(status="LOST", settled_at=timezone.now())
-    _recompute_from_groups(groups)
+    n = _settle(queryset, "LOST")
     modeladmin.message_user(request, f"Marked {n} bets as LOST and updated affected parlays.")
 
 @admin.action(description="Mark selected bets PENDING")
 def mark_pending(modeladmin, request, queryset):
-    groups = _affected_groups(queryset)
-    n = queryset.update(status="PENDING", settled_at=None)
-    _recompute_from_groups(groups)
+    n = _settle(queryset, "PENDING")
     modeladmin.message_user(request, f"Marked {n} bets as PENDING and updated affected parlays.")
 
 @admin.action(description="Mark selected bets PUSH")
 def mark_push(modeladmin, request, queryset):
-    groups = _affected_groups(queryset)
-    n = queryset.update(status="PUSH", settled_at=timezone.now())
-    _recompute_from_groups(groups)
+    n = _settle(queryset, "PUSH")
     modeladmin.message_user(request, f"Marked {n} bets as PUSH and updated parlays.")
 
 @admin.action(description="Recompute parlay odds from selected legs (booked price = product of all legs)")
 def recompute_parlay_odds(modeladmin, request, queryset):
-    from .models import Bet
-    updated = 0
-    for p in queryset:
-        legs = Bet.objects.filter(team=p.team, season=p.season, week=p.week, parlay_selected=True)
-        dec = 1.0
-        for b in legs:
-            # BOOKED price: product of ALL legs’ decimal odds, regardless of status
-            dec *= b.decimal_odds
-        p.decimal_odds = round(dec, 4)
-        p.save(update_fields=["decimal_odds"])
-        updated += 1
+    updated = reprice_parlays(queryset)
     modeladmin.message_user(request, f"Recomputed odds for {updated} parlays.")
 
+# A parlay's status is derived from its legs. These override it by hand (a leg
+# voided off the books, a dispute): the override holds until one of the
+# parlay's legs changes, which re-derives it, as "Set parlay STATUS from legs" does.
+@admin.action(description="Override selected parlays' status: WON (until a leg changes)")
+def parlay_won(modeladmin, request, queryset):
+    n = set_parlay_status(queryset, "WON")
+    modeladmin.message_user(request, f"Marked {n} parlays as WON; a change to their legs re-derives it.")
+
+@admin.action(description="Override selected parlays' status: LOST (until a leg changes)")
+def parlay_lost(modeladmin, request, queryset):
+    n = set_parlay_status(queryset, "LOST")
+    modeladmin.message_user(request, f"Marked {n} parlays as LOST; a change to their legs re-derives it.")
+
+@admin.action(description="Override selected parlays' status: PENDING (until a leg changes)")
+def parlay_pending(modeladmin, request, queryset):
+    n = set_parlay_status(queryset, "PENDING")
+    modeladmin.message_user(request, f"Marked {n} parlays as PENDING; a change to their legs re-derives it.")
+
 @admin.action(description="Set parlay STATUS from legs (odds stay as booked full product)")
 def settle_parlay_from_legs(modeladmin, request, queryset):
-    from .models import Bet
-    updated = 0
-    for p in queryset:
-        legs = list(Bet.objects.filter(team=p.team, season=p.season, week=p.week, parlay_selected=True))
-
-        # ----- Status only -----
-        if any(l.status == "LOST" for l in legs):
-            p.status = "LOST"
-        elif any(l.status == "PENDING" for l in legs) or not legs:
-            p.status = "PENDING"
-        elif all(l.status == "PUSH" for l in legs):
-            p.status = "PUSH"
-        else:
-            # at least one WON and none pending/lost (others may be PUSH)
-            p.status = "WON"
-
-        # ----- Odds: ALWAYS full booked price (all legs), independent of status -----
-        dec_all = 1.0
-        for l in legs:
-            dec_all *= l.decimal_odds
-        p.decimal_odds = round(dec_all, 4)
-
-        p.save(update_fields=["status", "decimal_odds"])
-        updated += 1
+    keys = list(queryset.values_list("team_id", "season_id", "week"))
+    updated = recompute_team_parlays(keys)
+    exposure.refresh(exposure.team_picks({(season_id, team_id, week) for team_id, season_id, week in keys}))
+    _bump_seasons([(season_id,) for _, season_id, _ in keys])
     modeladmin.message_user(request, f"Updated {updated} parlays from legs.")
 
 # ---------- Model admin registrations ----------
 @admin.register(Season)
 class SeasonAdmin(admin.ModelAdmin):
-    list_display = ("year", "start_date", "end_date")
+    list_display = ("year", "start_date", "end_date", "finalized_at", "archived_at")
     ordering = ("-year",)
 
 @admin.register(Team)
@@ -107,42 +84,157 @@ class TeamMembershipAdmin(admin.ModelAdmin):
 
 @admin.register(Bet)
 class BetAdmin(admin.ModelAdmin):
-    list_display = ("user","team","season","week","bet_type","pick_text","line",
+    list_display = ("user","team","season","week","bet_type","pick_text","game","line",
                     "over_under","american_odds","parlay_selected","status","settled_at")
+    list_select_related = ("user","team","season","game")
     list_filter = ("season","team","week","bet_type","status","parlay_selected","over_under")
     search_fields = ("user__username","pick_text")
+    raw_id_fields = ("game","selection")
     actions = [mark_won, mark_lost, mark_pending, mark_push]
 
 @admin.register(TeamParlay)
 class TeamParlayAdmin(admin.ModelAdmin):
     list_display = ("team", "season", "week", "decimal_odds", "stake_units", "status", "updated_at")
     list_filter = ("season", "team", "week", "status")
-    actions = [recompute_parlay_odds, settle_parlay_from_legs, mark_won, mark_lost, mark_pending]
+    actions = [recompute_parlay_odds, settle_parlay_from_legs, parlay_won, parlay_lost, parlay_pending]
+
+def _bump_seasons(keys):
+    """Advance the cache version of every season touched by (season_id, ...) keys."""
+    for season_id in {k[0] for k in keys}:
+        bump_season_version(season_id)
+
+def _future_keys(qs):
+    return list(qs.values_list("season_id", "team_id").distinct())
 
 @admin.action(description="Mark selected futures WON")
 def futures_won(modeladmin, request, queryset):
+    keys = _future_keys(queryset)
     n = queryset.update(status="WON", settled_at=timezone.now())
+    ledger.refresh_futures(keys)
+    _bump_seasons(keys)
     modeladmin.message_user(request, f"Marked {n} futures as WON.")
 
 @admin.action(description="Mark selected futures LOST")
 def futures_lost(modeladmin, request, queryset):
+    keys = _future_keys(queryset)
     n = queryset.update(status="LOST", settled_at=timezone.now())
+    ledger.refresh_futures(keys)
+    _bump_seasons(keys)
     modeladmin.message_user(request, f"Marked {n} futures as LOST.")
 
 @admin.action(description="Mark selected futures PUSH")
 def futures_push(modeladmin, request, queryset):
+    keys = _future_keys(queryset)
     n = queryset.update(status="PUSH", settled_at=timezone.now())
+    ledger.refresh_futures(keys)
+    _bump_seasons(keys)
     modeladmin.message_user(request, f"Marked {n} futures as PUSH.")
 
 @admin.action(description="Mark selected futures PENDING")
 def futures_pending(modeladmin, request, queryset):
+    keys = _future_keys(queryset)
     n = queryset.update(status="PENDING", settled_at=None)
+    ledger.refresh_futures(keys)
+    _bump_seasons(keys)
     modeladmin.message_user(request, f"Marked {n} futures as PENDING.")
 
+@admin.action(description="Settle the whole market: selected pick's selection WON, every other LOST")
+def futures_market_winner(modeladmin, request, queryset):
+    winners = set(queryset.exclude(market="TEAM_OU").values_list("season", "market", "selection_key"))
+    markets = {(season_id, market) for season_id, market, _ in winners}
+    if not winners or len(markets) != len(winners):
+        modeladmin.message_user(
+            request, "Select one Super Bowl or MVP pick per market (win totals: manage.py settle_futures).",
+            level=messages.ERROR,
+        )
+        return
+    for season_id, market, key in winners:
+        try:
+            counts = settle_futures_market(Season.objects.get(pk=season_id), market, key)
+        except ValueError as e:  # a pick nobody could key: settle it by hand
+            modeladmin.message_user(request, str(e), level=messages.ERROR)
+            continue
+        modeladmin.message_user(request, f"{market} settled on {key}: {counts.get('WON', 0)} won, {counts.get('LOST', 0)} lost.")
+
 @admin.register(FuturePick)
 class FuturePickAdmin(admin.ModelAdmin):
-    list_display = ("team", "season", "index", "pick_text", "american_odds", "status", "settled_at")
-    list_filter = ("season", "team", "status")
-    search_fields = ("pick_text", "team__name")
-    actions = [futures_won, futures_lost, futures_push, futures_pending]
-    
\ No newline at end of file
+    list_display = ("team", "season", "index", "pick_text", "market", "selection_key", "american_odds", "status", "settled_at")
+    list_filter = ("season", "market", "team", "status")
+    search_fields = ("pick_text", "selection_key", "team__name")
+    actions = [futures_market_winner, futures_won, futures_lost, futures_push, futures_pending]
+    
+@admin.register(UnitsLedger)
+class UnitsLedgerAdmin(admin.ModelAdmin):
+    list_display = ("season", "team", "user", "week", "source", "units", "picks", "wins", "losses", "pushes", "updated_at")
+    list_filter = ("season", "source", "team", "week")
+    readonly_fields = [f.name for f in UnitsLedger._meta.fields]
+
+@admin.register(BetArchive)
+class BetArchiveAdmin(admin.ModelAdmin):
+    """Archived seasons' bets: read-only (restore the season to edit them)."""
+    list_display = ("user", "team", "season", "week", "bet_type", "pick_text", "american_odds", "status", "pnl_units")
+    list_filter = ("season", "week", "bet_type", "status")
+    search_fields = ("user__username", "team__name", "pick_text")
+    list_select_related = ("user", "team", "season")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class SelectionInline(admin.TabularInline):
+    model = Selection
+    extra = 0
+    fields = ("key", "label", "line", "american_odds", "updated_at")
+    readonly_fields = fields
+
+class MarketInline(admin.TabularInline):
+    model = Market
+    extra = 0
+    fields = ("key", "market_type", "description", "result", "updated_at")
+    readonly_fields = fields
+    show_change_link = True
+
+@admin.action(description="Settle pending bets on selected games from their final scores")
+def settle_from_scores(modeladmin, request, queryset):
+    result = settlement.settle(Bet.objects.filter(game__in=queryset))
+    modeladmin.message_user(
+        request,
+        f"Settled {result.total} bets ({result.settled['WON']} won, {result.settled['LOST']} lost, "
+        f"{result.settled['PUSH']} push); {result.skipped} could not be graded and stay pending.",
+    )
+
+@admin.register(Game)
+class GameAdmin(admin.ModelAdmin):
+    """Owned by the odds feed (manage.py ingest_odds): read-only here."""
+    list_display = ("season", "week", "away", "home", "kickoff", "status", "away_score", "home_score", "updated_at")
+    list_filter = ("season", "week", "status")
+    search_fields = ("external_id", "home", "away")
+    readonly_fields = [f.name for f in Game._meta.fields]
+    inlines = [MarketInline]
+    actions = [settle_from_scores]
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(Market)
+class MarketAdmin(admin.ModelAdmin):
+    list_display = ("game", "key", "market_type", "description", "updated_at")
+    list_filter = ("market_type", "game__season", "game__week")
+    list_select_related = ("game",)
+    readonly_fields = [f.name for f in Market._meta.fields]
+    inlines = [SelectionInline]
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(RevealSnapshot)
+class RevealSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("season", "week", "data_version", "built_at")
+    list_filter = ("season",)
+    exclude = ("payload",)
+    readonly_fields = ("season", "week", "data_version", "built_at")
@@ -0,0 +1,59 @@
+# league/archive.py
+"""
+Moving closed seasons' bets between Bet and BetArchive.
+
+Archiving copies a fully settled season's bets (ids, settled odds and PnL
+included) into BetArchive and deletes them from Bet in one transaction, then
+flags the season. Nothing derived changes: the ledger, parlays and futures
+stay where they are, so standings and cached payloads are still valid. Reads
+that go through bets_for(season) follow the rows; restore moves them back.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Season, Bet, BetArchive, ARCHIVED_BET_FIELDS
+from .recompute import defer_recomputes
+
+BATCH_SIZE = 2000
+
+def _copy(source_qs, model) -> int:
+    """bulk_create model rows from source_qs in batches. Bet's odds/PnL columns are generated, so not copied in."""
+    fields = ARCHIVED_BET_FIELDS
+    if model is Bet:
+        fields = [f for f in fields if f not in ("decimal_odds", "pnl_units")]
+    n, batch = 0, []
+    for row in source_qs.order_by("id").values(*fields).iterator(chunk_size=BATCH_SIZE):
+        batch.append(model(**row))
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            n, batch = n + len(batch), []
+    model.objects.bulk_create(batch)
+    return n + len(batch)
+
+@transaction.atomic
+def archive_season(season) -> int:
+    """Move a settled season's bets into BetArchive. Returns bets moved."""
+    season = Season.objects.select_for_update().get(pk=season.pk)
+    if season.archived_at:
+        raise ValueError(f"Season {season.year} is already archived.")
+    live = Bet.objects.filter(season=season)
+    if live.filter(status="PENDING").exists():
+        raise ValueError(f"Season {season.year} still has pending bets.")
+    n = _copy(live, BetArchive)
+    # the ledger and parlays already reflect these bets: drop the per-row recomputes delete would queue
+    with defer_recomputes(flush_on_exit=False):
+        live.delete()
+    Season.objects.filter(pk=season.pk).update(archived_at=timezone.now())
+    return n
+
+@transaction.atomic
+def restore_season(season) -> int:
+    """Move an archived season's bets back into Bet (odds and PnL are regenerated). Returns bets moved."""
+    season = Season.objects.select_for_update().get(pk=season.pk)
+    if not season.archived_at:
+        raise ValueError(f"Season {season.year} is not archived.")
+    archived = BetArchive.objects.filter(season=season)
+    n = _copy(archived, Bet)  # bulk_create: no signals, nothing to recompute
+    archived.delete()
+    Season.objects.filter(pk=season.pk).update(archived_at=None)
+    return n
@@ -0,0 +1,324 @@
+# league/bench.py
+"""
+Repeatable benchmark suite (see `manage.py bench_league`).
+
+Runs against a throwaway test database, created the way the test runner
+creates one and dropped afterwards, with a private cache, so the configured
+database and cache are never touched. Each size seeds its own seasons
+(years 9000+, "bench_" users), drives the real URLs through the test client
+(middleware, templates and admin actions included) and records wall time and
+query counts per scenario; admin actions are checked to have changed what
+they act on. Results are plain dicts so they can be written as JSON and
+compared against a previous run.
+"""
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, time as dtime, timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.db.models import F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_databases, teardown_databases
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Season, Bet, TeamMembership, TeamParlay
+from .reveal import ET, build_snapshot
+from .seeding import seed_league, delete_seasons
+from .sevices import parlay_price_and_status, settle_bets
+
+SIZES = {
+    "small": dict(seasons=1, teams=4, users=16),
+    "medium": dict(seasons=2, teams=12, users=72),
+    "large": dict(seasons=3, teams=32, users=256),
+}
+BENCH_YEAR = 9000
+PREFIX = "bench"
+
+def _cold(season):
+    """Move the season to a fresh cache version without triggering the on-commit re-warm."""
+    Season.objects.filter(pk=season.pk).update(data_version=F("data_version") + 1)
+
+def _pick_data(odds: int):
+    data = {}
+    for bt in ("SPREAD", "TOTAL", "PROP"):
+        data.update({
+            f"{bt}-pick_text": f"bench {bt.lower()}", f"{bt}-line": "-3.5",
+            f"{bt}-american_odds": str(odds), f"{bt}-over_under": "OVER",
+        })
+    data["TOTAL-parlay_selected"] = "on"
+    return data
+
+def _stats(samples, queries):
+    samples = sorted(samples)
+    return {
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))], 3),
+        "max_ms": round(samples[-1], 3),
+        "queries": max(queries),
+    }
+
+def _measure(name, run, repeat, setup=None, expect=200, check=None):
+    """
+    Time run() repeat times after one untimed warm-up; setup() runs untimed
+    before each call and check() (returning an error message or None) after it.
+    """
+    samples, queries = [], []
+    for i in range(repeat + 1):
+        if setup:
+            setup()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = run()
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != expect:
+            raise RuntimeError(f"{name}: HTTP {response.status_code} (expected {expect})")
+        problem = check() if check else None
+        if problem:
+            raise RuntimeError(f"{name}: {problem}")
+        if i:  # first call is the warm-up
+            samples.append(elapsed)
+            queries.append(len(ctx.captured_queries))
+    return {"scenario": name, "runs": repeat, **_stats(samples, queries)}
+
+def _measure_spike(name, url, users, repeat, concurrency, setup=None):
+    """
+    The reveal rush: `concurrency` logged-in viewers, one thread and DB
+    connection each, request url at the same instant. setup() runs before
+    each of the repeat rounds; every request's latency is a sample.
+    """
+    clients = []
+    for i in range(concurrency):
+        c = Client()
+        c.force_login(users[i % len(users)])
+        clients.append(c)
+    samples, queries = [], []
+    lock = threading.Lock()
+
+    def hit(client, barrier):
+        try:
+            with CaptureQueriesContext(connections["default"]) as ctx:
+                barrier.wait()
+                start = time.perf_counter()
+                response = client.get(url, secure=True)
+                elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}")
+            with lock:
+                samples.append(elapsed)
+                queries.append(len(ctx.captured_queries))
+        finally:
+            connections.close_all()  # this thread's connection
+
+    walls = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        barrier = threading.Barrier(concurrency + 1)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(hit, c, barrier) for c in clients]
+            barrier.wait()
+            start = time.perf_counter()
+            for f in futures:
+                f.result()
+            walls.append((time.perf_counter() - start) * 1000)
+    return {
+        "scenario": name, "runs": repeat, "concurrency": concurrency,
+        **_stats(samples, queries), "wall_ms": round(statistics.median(walls), 3),
+    }
+
+def scenarios(season, weeks: int):
+    """(name, run, setup, expected status, check) for one seeded season; the last week is the pending one."""
+    member = (
+        TeamMembership.objects.filter(team__season=season)
+        .select_related("user").order_by("user__username").first()
+    )
+    user = member.user
+    admin = User.objects.filter(username=f"{PREFIX}_admin").first() or User.objects.create_superuser(
+        f"{PREFIX}_admin", email="", password=None,
+    )
+    viewer, staff = Client(), Client()
+    viewer.force_login(user)
+    staff.force_login(admin)
+
+    y, last = season.year, weeks
+    standings = reverse("standings", args=[y])
+    dashboard = reverse("league_dashboard", args=[y])
+    week_url = reverse("week_view", args=[y, last])
+    changelist = reverse("admin:league_bet_changelist") + f"?season__id__exact={season.id}&week__exact={last}"
+    parlays = reverse("admin:league_teamparlay_changelist") + f"?season__id__exact={season.id}&week__exact={last}"
+    bets = Bet.objects.filter(season=season, week=last)
+    week_parlays = TeamParlay.objects.filter(season=season, week=last)
+    odds = iter(range(110, 10_000, 5))
+
+    def admin_action(url, action, queryset):
+        # what the changelist form posts: the action and the ticked rows
+        data = {"action": action, "index": "0", "_selected_action": [str(pk) for pk in queryset.values_list("pk", flat=True)]}
+        return lambda: staff.post(url, data, secure=True)
+
+    def reopen():
+        settle_bets(bets, "PENDING")
+
+    def all_won():
+        left = bets.exclude(status="WON").count()
+        return f"{left} of the week's bets not WON" if left else None
+
+    def stale_parlays():
+        # legs settled, parlays still PENDING: settle_parlay_from_legs has something to derive
+        settle_bets(bets, "WON")
+        week_parlays.update(status="PENDING")
+
+    def parlays_match_legs():
+        legs = {}
+        for team_id, odds_, status in bets.filter(parlay_selected=True).values_list("team_id", "american_odds", "status"):
+            legs.setdefault(team_id, []).append((odds_, status))
+        wrong = [
+            team_id for team_id, status in week_parlays.values_list("team_id", "status")
+            if status != parlay_price_and_status(legs.get(team_id, []))[1]
+        ]
+        changed = week_parlays.exclude(status="PENDING").exists()
+        return None if changed and not wrong else f"parlays not derived from their legs (teams {wrong})"
+
+    return [
+        ("standings_cold", lambda: viewer.get(standings, secure=True), lambda: _cold(season), 200, None),
+        ("standings_warm", lambda: viewer.get(standings, secure=True), None, 200, None),
+        ("dashboard_cold", lambda: viewer.get(dashboard, secure=True), lambda: _cold(season), 200, None),
+        ("dashboard_warm", lambda: viewer.get(dashboard, secure=True), None, 200, None),
+        ("dashboard_week", lambda: viewer.get(dashboard, {"week": last - 1}, secure=True), lambda: _cold(season), 200,
+         None),
+        ("week_view", lambda: viewer.get(week_url, secure=True), None, 200, None),
+        ("user_stats", lambda: viewer.get(reverse("user_stats", args=[user.username]), secure=True), None, 200, None),
+        ("submit_pick", lambda: viewer.post(reverse("submit_pick", args=[y, last]), _pick_data(next(odds)), secure=True),
+         None, 302, None),
+        ("admin_mark_won_week", admin_action(changelist, "mark_won", bets), reopen, 302, all_won),
+        ("admin_settle_parlays_week", admin_action(parlays, "settle_parlay_from_legs", week_parlays), stale_parlays,
+         302, parlays_match_legs),
+    ]
+
+def _open_reveal(season, week: int):
+    """Move season.start_date so week's Sunday 1 PM ET reveal is the most recent one."""
+    now = timezone.now().astimezone(ET)
+    sunday = now.date() - timedelta(days=(now.weekday() + 1) % 7)
+    if datetime.combine(sunday, dtime(13), tzinfo=ET) > now:
+        sunday -= timedelta(weeks=1)
+    start = sunday - timedelta(weeks=week - 1)
+    Season.objects.filter(pk=season.pk).update(start_date=start)
+    season.start_date = start
+
+def spike_scenarios(season, weeks: int):
+    """(name, url, setup) for the reveal rush on the last week's dashboard, live vs pre-built snapshot."""
+    url = reverse("league_dashboard", args=[season.year]) + f"?week={weeks}"
+
+    def snapshot():
+        _cold(season)
+        season.refresh_from_db(fields=["data_version"])
+        build_snapshot(season, weeks)  # what the cron job does before 1 PM
+
+    return [
+        ("reveal_spike_live", url, lambda: _cold(season)),
+        ("reveal_spike_snapshot", url, snapshot),
+    ]
+
+@contextmanager
+def throwaway_database():
+    """
+    Point the default alias at a fresh test database for the duration (the
+    test runner's setup_databases), then drop it. SQLite gets a file rather
+    than the runner's in-memory database: the spike opens a connection per thread.
+    """
+    test = connections["default"].settings_dict.setdefault("TEST", {})
+    tmp = None
+    if connection.vendor == "sqlite" and not test.get("NAME"):
+        tmp = tempfile.mkdtemp(prefix="league-bench-")
+        test["NAME"] = os.path.join(tmp, "bench.sqlite3")
+    old = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+    try:
+        yield
+    finally:
+        teardown_databases(old, verbosity=0)
+        if tmp:
+            del test["NAME"]
+            shutil.rmtree(tmp, ignore_errors=True)
+
+@contextmanager
+def bench_league(size: str, weeks: int = 18, seed: int = 42):
+    """Seed the bench seasons for size and yield the latest one, deleting them afterwards."""
+    spec = SIZES[size]
+    try:
+        seasons = seed_league(weeks=weeks, start_year=BENCH_YEAR, seed=seed, prefix=PREFIX, **spec)
+        yield seasons[-1]
+    finally:  # sizes share the database
+        delete_seasons(range(BENCH_YEAR, BENCH_YEAR + spec["seasons"]))
+        User.objects.filter(username__startswith=f"{PREFIX}_").delete()
+
+def run(sizes, repeat: int = 5, weeks: int = 18, seed: int = 42, only=None, log=None, concurrency: int = 16):
+    """Run every scenario (or those named in only) at each size. Returns the results document."""
+    results = []
+    # the client talks to "testserver"; secure=True keeps SECURE_SSL_REDIRECT out of the way. A
+    # private cache keeps the bench's season ids out of the real one; reads stay on the test
+    # database and post-commit warms are left out of the request timings, as in production
+    bench_settings = override_settings(
+        ALLOWED_HOSTS=["testserver"], REPLICA_DB_ALIAS=None, LEAGUE_CACHE_WARM="off",
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "league-bench"}},
+    )
+    with bench_settings, throwaway_database():
+        for size in sizes:
+            with bench_league(size, weeks=weeks, seed=seed) as season:
+                bets = Bet.objects.filter(season__year__gte=BENCH_YEAR).count()
+                for name, fn, setup, expect, check in scenarios(season, weeks):
+                    if only and name not in only:
+                        continue
+                    row = {"size": size, **SIZES[size], "bets": bets,
+                           **_measure(name, fn, repeat, setup, expect, check)}
+                    results.append(row)
+                    if log:
+                        log(row)
+                spikes = [sc for sc in spike_scenarios(season, weeks) if not only or sc[0] in only]
+                if spikes and concurrency > 0:
+                    _open_reveal(season, weeks)
+                    users = [
+                        m.user for m in TeamMembership.objects.filter(team__season=season)
+                        .select_related("user").order_by("user__username")
+                    ]
+                    for name, url, setup in spikes:
+                        row = {"size": size, **SIZES[size], "bets": bets,
+                               **_measure_spike(name, url, users, repeat, concurrency, setup)}
+                        results.append(row)
+                        if log:
+                            log(row)
+    return {
+        "schema": 1,
+        "created_at": timezone.now().isoformat(),
+        "django": django.get_version(),
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "repeat": repeat,
+        "concurrency": concurrency,
+        "results": results,
+    }
+
+def compare(current: dict, baseline: dict, threshold: float = 1.25):
+    """
+    Rows whose median (or query count) grew by more than threshold x the
+    baseline's for the same size and scenario: (size, scenario, old, new, ratio).
+    """
+    before = {(r["size"], r["scenario"]): r for r in baseline.get("results", [])}
+    slower = []
+    for r in current["results"]:
+        old = before.get((r["size"], r["scenario"]))
+        if not old:
+            continue
+        ratio = r["median_ms"] / old["median_ms"] if old["median_ms"] else 1.0
+        if ratio > threshold or r["queries"] > old["queries"]:
+            slower.append((r["size"], r["scenario"], old, r, round(ratio, 2)))
+    return slower
@@ -0,0 +1,283 @@
+# league/cache.py
+"""
+Versioned per-season payload cache.
+
+Keys embed Season.data_version, which is bumped whenever something a cached
+page shows changes: results, or picks that are already public (see
+sevices.submit_week_picks), so stale entries are never read again and simply
+age out. A transaction bumps a season at most once. The version comes for
+free with the Season row every view already loads, making a warm read a
+single cache lookup. After a bump commits, the default payloads are rebuilt
+eagerly, in a background thread rather than in the request that committed
+(LEAGUE_CACHE_WARM), so the first viewer after a settlement doesn't pay for it.
+
+Rebuilds are single-flight: on a miss one request (in any worker, given a
+shared cache) takes a short lock and rebuilds; the rest serve the payload
+of the version before, or, when there is none, wait briefly for the
+rebuild to land. Pages that served a stale payload drop their validators
+(see stale_served) so browsers don't pin the old body under the new ETag.
+The lock has to be atomic across workers, which cache.add() isn't on every
+backend, so it is taken the backend's own way (see _payload_lock).
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections, transaction
+from django.db.models import F
+
+from .models import Season
+
+_local = threading.local()
+logger = logging.getLogger(__name__)
+
+def _timeout():
+    return getattr(settings, "LEAGUE_CACHE_TIMEOUT", 7 * 24 * 3600)
+
+def _lock_timeout():
+    return getattr(settings, "LEAGUE_CACHE_LOCK_SECONDS", 30)
+
+def _wait():
+    return getattr(settings, "LEAGUE_CACHE_WAIT_SECONDS", 2.0)
+
+def _warm_mode():
+    return getattr(settings, "LEAGUE_CACHE_WARM", "background")
+
+def _digest(parts) -> str:
+    return hashlib.md5(repr(parts).encode()).hexdigest()[:16] if parts else "default"
+
+def payload_key(kind: str, season, *parts) -> str:
+    return f"league:{kind}:{season.pk}:v{season.data_version}:{_digest(parts)}"
+
+def _latest_key(kind: str, season, parts) -> str:
+    """Points at the newest version built for these parts (the stale fallback)."""
+    return f"league:{kind}:{season.pk}:latest:{_digest(parts)}"
+
+def stale_served(reset: bool = True) -> bool:
+    """Whether cached_payload handed this thread a previous version's payload since the last reset."""
+    served = getattr(_local, "stale", False)
+    if reset:
+        _local.stale = False
+    return served
+
+# ---------- single-flight locks ----------
+class _RedisLock:
+    """SET NX with an expiry to take it, a compare-and-delete script to release only our own."""
+
+    RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, backend, key):
+        self.key = backend.make_and_validate_key(key)
+        self.client = backend._cache.get_client(self.key, write=True)
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return bool(self.client.set(self.key, self.token, nx=True, ex=_lock_timeout()))
+
+    def release(self) -> None:
+        self.client.eval(self.RELEASE, 1, self.key, self.token)
+
+class _FileLock:
+    """
+    flock() on a file beside the cache's (FileBasedCache.add() is check-then-write).
+    The kernel drops it if the holder dies; the holder unlinks the file before
+    letting go, so a taker that opened the old file sees it replaced and backs off.
+    """
+
+    def __init__(self, backend, key):
+        self.path = os.path.join(backend._dir, hashlib.md5(key.encode()).hexdigest() + ".lock")
+        self.fd = None
+
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if os.fstat(fd).st_ino != os.stat(self.path).st_ino:
+                raise FileNotFoundError(self.path)  # released (and unlinked) while we were opening it
+        except OSError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def release(self) -> None:
+        if self.fd is not None:
+            os.unlink(self.path)
+            os.close(self.fd)
+            self.fd = None
+
+_held = set()
+_held_guard = threading.Lock()
+
+class _ProcessLock:
+    """LocMemCache is per process, so the lock is too: a set of held keys under a mutex."""
+
+    def __init__(self, backend, key):
+        self.key = (id(backend._cache), key)
+        self.held = False
+
+    def acquire(self) -> bool:
+        with _held_guard:
+            if self.key in _held:
+                return False
+            _held.add(self.key)
+            self.held = True
+            return True
+
+    def release(self) -> None:
+        if self.held:
+            with _held_guard:
+                _held.discard(self.key)
+            self.held = False
+
+class _AddLock:
+    """Other backends: add() (atomic on memcached and the database cache); release checks it is still ours."""
+
+    def __init__(self, backend, key):
+        self.backend, self.key, self.token = backend, key, uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return self.backend.add(self.key, self.token, _lock_timeout())
+
+    def release(self) -> None:
+        if self.backend.get(self.key) == self.token:
+            self.backend.delete(self.key)
+
+def _payload_lock(key: str):
+    """The single-flight lock for one payload key, the default cache backend's way."""
+    backend = caches["default"]
+    for backend_class, lock_class in ((RedisCache, _RedisLock), (FileBasedCache, _FileLock), (LocMemCache, _ProcessLock)):
+        if isinstance(backend, backend_class):
+            return lock_class(backend, key)
+    return _AddLock(backend, key)
+
+def cached_payload(kind: str, season, build, *parts, stale_ok: bool = True):
+    """
+    Return build() for (kind, season, *parts), cached until the season's data_version moves.
+    On a miss only the lock holder rebuilds; others get the previous version's
+    payload (if stale_ok) or wait up to LEAGUE_CACHE_WAIT_SECONDS for it.
+    """
+    key = payload_key(kind, season, *parts)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    lock = _payload_lock(key + ":lock")
+    if not lock.acquire():
+        if stale_ok:
+            version = cache.get(_latest_key(kind, season, parts))
+            stale = cache.get(key.replace(f":v{season.data_version}:", f":v{version}:")) if version is not None else None
+            if stale is not None:
+                _local.stale = True
+                return stale
+        deadline = time.monotonic() + _wait()
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            payload = cache.get(key)
+            if payload is not None:
+                return payload
+        # the holder is slow or gone: build without the lock rather than fail the request
+
+    try:
+        payload = cache.get(key)  # the last holder may have stored it between our miss and our lock
+        if payload is None:
+            payload = build()
+            cache.set(key, payload, _timeout())
+            latest = _latest_key(kind, season, parts)
+            built = cache.get(latest)
+            if built is None or built < season.data_version:  # a new season's payloads are v0
+                cache.set(latest, season.data_version, _timeout())
+    finally:
+        lock.release()
+    return payload
+
+class _Warm:
+    """on_commit callback that re-warms a season; also marks the season as bumped in this transaction."""
+
+    def __init__(self, season_id):
+        self.season_id = season_id
+
+    def __call__(self):
+        mode = _warm_mode()
+        if mode == "inline":
+            warm_season(self.season_id)
+        elif mode == "background":
+            threading.Thread(target=self.run, name=f"league-warm-{self.season_id}", daemon=True).start()
+
+    def run(self):
+        try:
+            warm_season(self.season_id)
+        except Exception:
+            logger.exception("warming season %s failed", self.season_id)
+        finally:
+            connections.close_all()  # this thread's connections only
+
+def _bumped(season_id) -> bool:
+    """Whether the season's version already moved in this transaction (and won't be rolled back alone)."""
+    conn = transaction.get_connection()
+    if not conn.in_atomic_block:
+        return False
+    current = set(conn.savepoint_ids)
+    return any(
+        isinstance(func, _Warm) and func.season_id == season_id and current <= sids
+        for sids, func, _ in conn.run_on_commit
+    )
+
+def _refresh_snapshot(season_id) -> None:
+    """
+    After a change commits, a finalized season's static pages follow it right
+    away, whatever LEAGUE_CACHE_WARM says: they are served ahead of every
+    view, so they can't wait for (or depend on) a re-warm.
+    """
+    season = Season.objects.filter(pk=season_id, finalized_at__isnull=False).first()
+    if season is None:
+        return
+    from . import finalize  # renders through the views
+    try:
+        finalize.refresh(season)
+    except Exception:
+        logger.exception("refreshing the snapshot of season %s failed; serving live pages", season.year)
+        finalize.remove(season)
+
+def bump_season_version(season_id) -> None:
+    """Invalidate every cached payload for a season (once per transaction) and re-warm after commit."""
+    if _bumped(season_id):
+        return
+    Season.objects.filter(pk=season_id).update(data_version=F("data_version") + 1)
+    transaction.on_commit(_Warm(season_id))
+    transaction.on_commit(lambda: _refresh_snapshot(season_id))
+
+def warm_season(season_id) -> None:
+    """
+    Rebuild the payloads most viewers hit first: standings and the all-weeks
+    dashboard. (A finalized season's static pages are refreshed by their own
+    post-commit hook, _refresh_snapshot.)
+    """
+    from .views import standings_payload, dashboard_payload  # views import this module
+
+    from .reveal import revealed_through
+
+    season = Season.objects.filter(pk=season_id).first()
+    if season is None:
+        return
+    cached_payload("standings", season, lambda: standings_payload(season))
+    parts = dashboard_cache_parts(revealed=revealed_through(season))
+    cached_payload("dashboard", season, lambda: dashboard_payload(season, *parts), *parts)
+
+def dashboard_cache_parts(sel_week="", sel_user="", sel_team="", sel_parlay="", reveal_is_open=False, after="",
+                          revealed=0):
+    """
+    Normalized dashboard filter tuple (+ page cursor, + the last revealed week);
+    shared by the view and warm_season so keys line up.
+    """
+    return (sel_week, sel_user, sel_team, sel_parlay, reveal_is_open, after, revealed)
@@ -0,0 +1,101 @@
+# league/exports.py
+"""
+Streaming season exports (CSV / NDJSON) of bets, parlays and futures.
+
+Rows are read with .iterator(chunk_size=...) (a server-side cursor on
+PostgreSQL) and encoded one at a time, so memory stays flat however large
+the season is. Decimal odds and PnL are the rows' generated columns.
+"""
+import csv
+import json
+
+from django.db.models import F, Value, CharField, IntegerField, FloatField, BooleanField
+
+from .models import TeamParlay, FuturePick, bets_for
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+COLUMNS = [
+    "kind", "season", "week", "team", "user", "bet_type", "index", "pick_text",
+    "line", "over_under", "american_odds", "decimal_odds", "stake_units",
+    "parlay_selected", "status", "pnl_units", "settled_at", "created_at",
+]
+
+CHUNK_SIZE = 2000
+
+def _null(field):
+    return Value(None, output_field=field)
+
+def export_rows(season, week=None, team=None):
+    """Yield one dict per bet, parlay and future (futures only when no week filter)."""
+    bets = bets_for(season)
+    parlays = TeamParlay.objects.filter(season=season)
+    futures = FuturePick.objects.filter(season=season)
+    if week is not None:
+        bets, parlays = bets.filter(week=week), parlays.filter(week=week)
+    if team is not None:
+        bets, parlays, futures = bets.filter(team=team), parlays.filter(team=team), futures.filter(team=team)
+
+    sources = [
+        bets.order_by("week", "team__name", "user__username", "bet_type").values(
+            kind=Value("bet"), season_year=F("season__year"), wk=F("week"),
+            team_name=F("team__name"), username=F("user__username"),
+            type=F("bet_type"), idx=_null(IntegerField()), pick=F("pick_text"),
+            line_value=F("line"), ou=F("over_under"), odds=F("american_odds"),
+            dec=F("decimal_odds"), stake=F("stake_units"), in_parlay=F("parlay_selected"),
+            state=F("status"), pnl=F("pnl_units"), settled=F("settled_at"), created=F("created_at"),
+        ),
+        parlays.order_by("week", "team__name").values(
+            kind=Value("parlay"), season_year=F("season__year"), wk=F("week"),
+            team_name=F("team__name"), username=_null(CharField()),
+            type=_null(CharField()), idx=_null(IntegerField()), pick=_null(CharField()),
+            line_value=_null(FloatField()), ou=_null(CharField()), odds=_null(IntegerField()),
+            dec=F("decimal_odds"), stake=F("stake_units"), in_parlay=_null(BooleanField()),
+            state=F("status"), pnl=F("pnl_units"), settled=_null(CharField()), created=_null(CharField()),
+        ),
+    ]
+    if week is None:
+        sources.append(futures.order_by("team__name", "index").values(
+            kind=Value("future"), season_year=F("season__year"), wk=_null(IntegerField()),
+            team_name=F("team__name"), username=_null(CharField()),
+            type=_null(CharField()), idx=F("index"), pick=F("pick_text"),
+            line_value=_null(FloatField()), ou=_null(CharField()), odds=F("american_odds"),
+            dec=F("decimal_odds"), stake=F("stake_units"), in_parlay=_null(BooleanField()),
+            state=F("status"), pnl=F("pnl_units"), settled=F("settled_at"), created=F("created_at"),
+        ))
+
+    for qs in sources:
+        for r in qs.iterator(chunk_size=CHUNK_SIZE):
+            yield {
+                "kind": r["kind"], "season": r["season_year"], "week": r["wk"],
+                "team": r["team_name"], "user": r["username"], "bet_type": r["type"],
+                "index": r["idx"], "pick_text": r["pick"], "line": r["line_value"],
+                "over_under": r["ou"], "american_odds": r["odds"],
+                "decimal_odds": round(r["dec"], 4) if r["dec"] is not None else None,
+                "stake_units": r["stake"], "parlay_selected": r["in_parlay"], "status": r["state"],
+                "pnl_units": round(r["pnl"], 4) if r["pnl"] is not None else None,
+                "settled_at": r["settled"].isoformat() if r["settled"] else None,
+                "created_at": r["created"].isoformat() if r["created"] else None,
+            }
+
+class _Echo:
+    """File-like object whose write() just returns the line (csv.writer -> generator)."""
+    def write(self, value):
+        return value
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(["" if row[c] is None else row[c] for c in COLUMNS])
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, separators=(",", ":")) + "\n"
+
+def iter_export(fmt: str, season, week=None, team=None):
+    rows = export_rows(season, week=week, team=team)
+    return iter_csv(rows) if fmt == "csv" else iter_ndjson(rows)
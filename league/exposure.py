@@ -0,0 +1,137 @@
+# league/exposure.py
+"""
+Pending exposure per game and pick (the Exposure table).
+
+Kept current the way the units ledger is, one pick at a time: write paths
+collect the exposure keys they touch (picks() before and after a write,
+team_picks() when a parlay or a settlement moves a team's whole week) and
+refresh() re-aggregates just those picks' pending bets and upserts their
+rows on the (season, week, game, bet_type, pick) unique key, deleting the
+ones nothing is pending on any more. The staff report is then a single read.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .ledger import keys_q
+from .matching import normalize
+from .models import Bet, TeamParlay, Exposure
+
+# (season_id, week, game_key, bet_type, pick); game_key is the game id, 0 for unlinked picks
+PICK_KEY = ("season_id", "week", "game_key", "bet_type", "pick")
+PICK_FIELDS = ("season_id", "week", "game_id", "bet_type", "selection__label", "pick_text")
+WEEK_KEY = ("season_id", "week")
+TEAM_KEY = ("season_id", "team_id", "week")
+TOTALS = ["bets", "stake_units", "potential_return_units", "parlay_legs", "parlay_return_units"]
+
+def _pick(row) -> str:
+    return (row["selection__label"] or normalize(row["pick_text"]))[:255]
+
+def _key(row) -> tuple:
+    return (row["season_id"], row["week"], row["game_id"] or 0, row["bet_type"], _pick(row))
+
+def picks(where) -> set:
+    """Exposure keys of the bets matching where (a Q), whatever their status."""
+    return {_key(b) for b in Bet.objects.filter(where).values(*PICK_FIELDS)}
+
+def team_picks(keys) -> set:
+    """Exposure keys of every bet in the (season_id, team_id, week) keys: what a parlay or settlement there moves."""
+    keys = set(keys)
+    return picks(keys_q(TEAM_KEY, keys)) if keys else set()
+
+def week_picks(keys) -> set:
+    """Every exposure key in the (season_id, week) keys, on file or pending, for callers that can't name theirs."""
+    keys = set(keys)
+    if not keys:
+        return set()
+    where = keys_q(WEEK_KEY, keys)
+    return picks(where & Q(status="PENDING")) | set(Exposure.objects.filter(where).values_list(*PICK_KEY))
+
+@transaction.atomic(savepoint=False)
+def refresh(keys) -> int:
+    """keys: exposure keys, see PICK_KEY. Returns rows written."""
+    keys = set(keys)
+    if not keys:
+        return 0
+    games = {(season_id, week, game_key or None, bet_type) for season_id, week, game_key, bet_type, _ in keys}
+    bets = [
+        b for b in Bet.objects.filter(keys_q(("season_id", "week", "game_id", "bet_type"), games), status="PENDING")
+        .values(*PICK_FIELDS, "team_id", "selection_id", "stake_units", "decimal_odds", "parlay_selected")
+        if _key(b) in keys
+    ]
+    teams = {(b["season_id"], b["team_id"], b["week"]) for b in bets if b["parlay_selected"]}
+    parlays = {
+        (p["season_id"], p["team_id"], p["week"]): p["stake_units"] * p["decimal_odds"]
+        for p in TeamParlay.objects.filter(keys_q(TEAM_KEY, teams), status="PENDING").values(
+            "season_id", "team_id", "week", "stake_units", "decimal_odds",
+        )
+    } if teams else {}
+    rows = {}
+    for b in bets:
+        key = _key(b)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = Exposure(
+                season_id=key[0], week=key[1], game_key=key[2], game_id=b["game_id"],
+                selection_id=b["selection_id"], bet_type=key[3], pick=key[4],
+            )
+        row.bets += 1
+        row.stake_units += b["stake_units"]
+        row.potential_return_units += b["stake_units"] * b["decimal_odds"]
+        parlay = parlays.get((b["season_id"], b["team_id"], b["week"])) if b["parlay_selected"] else None
+        if parlay is not None:
+            row.parlay_legs += 1
+            row.parlay_return_units += parlay
+
+    Exposure.objects.bulk_create(
+        rows.values(), update_conflicts=True,
+        unique_fields=["season", "week", "game_key", "bet_type", "pick"],
+        update_fields=["game", "selection", *TOTALS, "updated_at"],
+    )
+    gone = keys - rows.keys()
+    if gone:
+        Exposure.objects.filter(keys_q(PICK_KEY, gone)).delete()
+    return len(rows)
+
+@transaction.atomic
+def rebuild_season(season) -> int:
+    """Drop and re-derive a season's exposure rows. Returns rows written."""
+    Exposure.objects.filter(season=season).delete()
+    weeks = Bet.objects.filter(season=season, status="PENDING").values_list("week", flat=True).distinct()
+    return refresh(week_picks({(season.id, w) for w in weeks}))
+
+# ---------- report ----------
+def _swing(rows) -> float:
+    """
+    Best minus worst net result for the bettors across a market's outcomes:
+    each side hitting (its bettors collect, everyone else in the market
+    loses their stake), or none of the backed sides hitting.
+    """
+    staked = sum(r.stake_units for r in rows)
+    outcomes = [-staked] + [r.potential_return_units - staked for r in rows]
+    return max(outcomes) - min(outcomes)
+
+def report(season, week: int) -> list:
+    """The week's exposure grouped by game (unlinked picks last), biggest stake first."""
+    rows = (
+        Exposure.objects.filter(season=season, week=week)
+        .select_related("game", "selection")
+        .order_by("-stake_units", "pick")
+    )
+    games = {}
+    for row in rows:
+        g = games.setdefault(row.game_id, {
+            "game": row.game, "rows": [], "bets": 0, "stake": 0.0, "potential_return": 0.0, "parlay_legs": 0,
+            "markets": defaultdict(list),
+        })
+        g["rows"].append(row)
+        g["bets"] += row.bets
+        g["stake"] += row.stake_units
+        g["potential_return"] += row.potential_return_units
+        g["parlay_legs"] += row.parlay_legs
+        if row.selection_id:
+            g["markets"][row.selection.market_id].append(row)
+    for g in games.values():
+        g["swing"] = sum(_swing(rs) for rs in g.pop("markets").values())
+    return sorted(games.values(), key=lambda g: (g["game"] is None, -g["stake"]))
@@ -0,0 +1,162 @@
+# league/finalize.py
+"""
+Static snapshots of finished seasons.
+
+Once every bet, parlay and futures pick of a season is settled its pages
+never change, so `manage.py finalize_season` renders them once (as seen by
+a logged-out viewer, with a neutral nav), compresses them and writes them
+under SEASON_SNAPSHOT_DIR/<year>/. SeasonSnapshotMiddleware serves those
+files through WhiteNoise before the session and auth middleware run, so a
+past season costs no queries.
+
+Any later change to a finalized season (an admin reopening a result) bumps
+its data_version; a post-commit hook (cache._refresh_snapshot, independent
+of the re-warm) then calls refresh(), which re-renders the files, or removes
+them while something is pending again.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+from whitenoise.compress import Compressor
+
+from .models import Season, TeamParlay, FuturePick, bets_for
+
+# URLs that can have a snapshot: /<kind>/<year>/ plus /week/<year>/<n>/ and the chart JSON
+SNAPSHOT_URL = re.compile(r"^/(standings|dashboard|futures|week)/(\d+)/(\d+/|chart-data/)?$")
+
+def snapshot_root() -> str:
+    return str(getattr(settings, "SEASON_SNAPSHOT_DIR", os.path.join(settings.BASE_DIR, "season_snapshots")))
+
+def season_dir(year: int) -> str:
+    return os.path.join(snapshot_root(), str(year))
+
+def candidates(path: str, query) -> list:
+    """
+    Snapshot file names (relative to the root) that answer path + query, best first.
+    Only bare pages, the dashboard's ?week=N and the chart JSON's ?since_week=N
+    qualify; any other query string goes to the live view.
+    """
+    m = SNAPSHOT_URL.match(path)
+    if not m:
+        return []
+    kind, year, rest = m.groups()
+    base = os.path.join(year, kind, rest.strip("/")) if rest else os.path.join(year, kind)
+    index = "index.json" if rest == "chart-data/" else "index.html"
+    keys = list(query)
+    if not keys:
+        return [os.path.join(base, index)]
+    if len(keys) == 1 and query[keys[0]].isdigit():
+        n = query[keys[0]]
+        if kind == "dashboard" and not rest and keys == ["week"]:
+            return [os.path.join(base, f"week-{n}.html")]
+        if rest == "chart-data/" and keys == ["since_week"]:
+            # the full series is a valid answer too: the page falls back to it when a delta doesn't merge
+            return [os.path.join(base, f"since-{n}.json"), os.path.join(base, index)]
+    return []
+
+def _query(query: dict) -> QueryDict:
+    q = QueryDict(mutable=True)
+    q.update(query)
+    return q
+
+def is_settled(season) -> bool:
+    """Nothing left PENDING in the season."""
+    return not any(
+        qs.filter(status="PENDING").exists()
+        for qs in (bets_for(season), TeamParlay.objects.filter(season=season), FuturePick.objects.filter(season=season))
+    )
+
+def _render(path: str, query: dict) -> bytes:
+    """The page as a logged-out viewer gets it, flagged so templates drop per-user bits."""
+    request = RequestFactory().get(path, query)
+    request.user = AnonymousUser()
+    request.resolver_match = match = resolve(path)
+    request.league_snapshot = True
+    response = match.func(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} {query or ''}: HTTP {response.status_code}")
+    return response.content
+
+def _pages(season):
+    y = season.year
+    weeks = sorted(set(bets_for(season).values_list("week", flat=True)))
+    yield reverse("standings", args=[y]), {}
+    yield reverse("futures_board", args=[y]), {}
+    yield reverse("league_dashboard", args=[y]), {}
+    for w in weeks:
+        yield reverse("league_dashboard", args=[y]), {"week": str(w)}
+        yield reverse("week_view", args=[y, w]), {}
+
+def build(season) -> int:
+    """Render every page of the season into a fresh directory and swap it in. Returns files written."""
+    root = snapshot_root()
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=root, prefix=f".{season.year}-")  # dot-named: never matched by a URL
+    compressor = Compressor(quiet=True)
+    written = 0
+
+    def write(path, query, content):
+        nonlocal written
+        name = candidates(path, _query(query))[0]
+        target = os.path.join(tmp, os.path.relpath(name, str(season.year)))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(content)
+        written += 1 + len(compressor.compress(target))
+
+    try:
+        for path, query in _pages(season):
+            write(path, query, _render(path, query))
+        charts = reverse("standings_chart_data", args=[season.year])
+        full = _render(charts, {})
+        write(charts, {}, full)
+        # returning visitors ask for weeks after the one they have stored: usually the last one
+        last = json.loads(full).get("last_settled_week")
+        if last:
+            since = {"since_week": str(last)}
+            write(charts, since, _render(charts, since))
+
+        final = season_dir(season.year)
+        old = None
+        if os.path.isdir(final):
+            old = tempfile.mkdtemp(dir=root, prefix=f".{season.year}-old-")
+            os.replace(final, os.path.join(old, "pages"))
+        os.replace(tmp, final)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return written
+
+def remove(season) -> None:
+    shutil.rmtree(season_dir(season.year), ignore_errors=True)
+
+def finalize(season) -> int:
+    """Snapshot a fully settled season and mark it finalized. Raises ValueError if anything is pending."""
+    if not is_settled(season):
+        raise ValueError(f"Season {season.year} still has pending results.")
+    written = build(season)
+    Season.objects.filter(pk=season.pk).update(finalized_at=timezone.now())
+    return written
+
+def unfinalize(season) -> None:
+    """Back to live pages for good (until finalized again)."""
+    Season.objects.filter(pk=season.pk).update(finalized_at=None)
+    remove(season)
+
+def refresh(season) -> None:
+    """After a change to a finalized season: re-render it, or drop its files while results are reopened."""
+    if is_settled(season):
+        build(season)
+    else:
+        remove(season)
@@ -0,0 +1,103 @@
+# league/ledger.py
+"""
+Units ledger maintenance.
+
+Every refresh re-aggregates only the keys that were touched (a user's week,
+a team's parlay week, a team's futures) and upserts those ledger rows on
+their unique key, so the cost of keeping standings current is proportional
+to what changed and concurrent refreshes of one key can't double it.
+"""
+from django.db import transaction
+from django.db.models import Q, Sum, Count
+
+from .models import Season, Bet, BetArchive, TeamParlay, FuturePick, UnitsLedger, bets_for
+
+BET_KEY = ("season_id", "team_id", "user_id", "week")
+PARLAY_KEY = ("season_id", "team_id", "week")
+FUTURE_KEY = ("season_id", "team_id")
+
+def keys_q(fields, keys):
+    """OR of exact-match filters, one per key tuple."""
+    q = Q()
+    for key in keys:
+        q |= Q(**dict(zip(fields, key)))
+    return q
+
+def _aggregate(qs, group_fields):
+    # pnl_units is a stored generated column on bets, parlays and futures alike
+    return (
+        qs.values(*group_fields)
+        .order_by()
+        .annotate(
+            units=Sum("pnl_units"),
+            picks=Count("id"),
+            wins=Count("id", filter=Q(status="WON")),
+            losses=Count("id", filter=Q(status="LOST")),
+            pushes=Count("id", filter=Q(status="PUSH")),
+        )
+    )
+
+def _entry(row, source):
+    return UnitsLedger(
+        season_id=row["season_id"], team_id=row["team_id"],
+        user_id=row.get("user_id"), user_key=row.get("user_id") or 0, week=row.get("week", 0), source=source,
+        units=float(row["units"] or 0.0), picks=row["picks"],
+        wins=row["wins"], losses=row["losses"], pushes=row["pushes"],
+    )
+
+@transaction.atomic(savepoint=False)
+def _replace(source, fields, keys, rows):
+    """Upsert the aggregated rows for keys and drop the keys that have none left."""
+    UnitsLedger.objects.bulk_create(
+        [_entry(r, source) for r in rows], update_conflicts=True,
+        unique_fields=["season", "team", "user_key", "week", "source"],
+        update_fields=["units", "picks", "wins", "losses", "pushes", "updated_at"],
+    )
+    gone = keys - {tuple(r[f] for f in fields) for r in rows}
+    if gone:
+        UnitsLedger.objects.filter(keys_q(fields, gone), source=source).delete()
+
+def refresh_bets(keys):
+    """keys: iterable of (season_id, team_id, user_id, week). Archived seasons' bets are read from BetArchive."""
+    keys = set(keys)
+    if not keys:
+        return
+    archived = set(
+        Season.objects.filter(id__in={k[0] for k in keys}, archived_at__isnull=False).values_list("id", flat=True)
+    )
+    rows = []
+    for model, part in (
+        (Bet, {k for k in keys if k[0] not in archived}),
+        (BetArchive, {k for k in keys if k[0] in archived}),  # as bets_for() reads them
+    ):
+        if part:
+            rows += _aggregate(model.objects.filter(keys_q(BET_KEY, part)), BET_KEY)
+    _replace("BET", BET_KEY, keys, rows)
+
+def refresh_parlays(keys):
+    """keys: iterable of (season_id, team_id, week)."""
+    keys = set(keys)
+    if not keys:
+        return
+    rows = _aggregate(TeamParlay.objects.filter(keys_q(PARLAY_KEY, keys)), PARLAY_KEY)
+    _replace("PARLAY", PARLAY_KEY, keys, list(rows))
+
+def refresh_futures(keys):
+    """keys: iterable of (season_id, team_id). Futures are booked at week 0."""
+    keys = set(keys)
+    if not keys:
+        return
+    rows = _aggregate(FuturePick.objects.filter(keys_q(FUTURE_KEY, keys)), FUTURE_KEY)
+    _replace("FUTURE", FUTURE_KEY, keys, list(rows))
+
+@transaction.atomic
+def rebuild_season(season) -> int:
+    """Drop and re-derive every ledger row for one season. Returns rows written."""
+    UnitsLedger.objects.filter(season=season).delete()
+    entries = (
+        [_entry(r, "BET") for r in _aggregate(bets_for(season), BET_KEY)]
+        + [_entry(r, "PARLAY") for r in _aggregate(TeamParlay.objects.filter(season=season), PARLAY_KEY)]
+        + [_entry(r, "FUTURE") for r in _aggregate(FuturePick.objects.filter(season=season), FUTURE_KEY)]
+    )
+    UnitsLedger.objects.bulk_create(entries)
+    return len(entries)
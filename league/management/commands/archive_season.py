@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from league.models import Season
+from league.archive import archive_season, restore_season
+
+
+class Command(BaseCommand):
+    help = "Move a closed season's bets into the archive table (or back with --restore)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("season", type=int, help="Season year")
+        parser.add_argument("--restore", action="store_true", help="Move the bets back into the live table")
+
+    def handle(self, *args, **opts):
+        season = Season.objects.filter(year=opts["season"]).first()
+        if season is None:
+            raise CommandError(f"No season {opts['season']}.")
+        try:
+            n = restore_season(season) if opts["restore"] else archive_season(season)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"{season.year}: {n} bets {'restored' if opts['restore'] else 'archived'}")
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from league import bench
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main views, submit_pick and the admin settlement actions against "
+        "seeded leagues of several sizes and write the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="small,medium", help=f"Comma list of {', '.join(bench.SIZES)}")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scenario (after one warm-up)")
+        parser.add_argument("--weeks", type=int, default=18)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--only", help="Comma list of scenario names to run")
+        parser.add_argument("--concurrency", type=int, default=16, help="Simultaneous viewers in the reveal spike (0 skips it)")
+        parser.add_argument("--output", "-o", default="bench_output.json")
+        parser.add_argument("--baseline", help="Previous results file to compare against")
+        parser.add_argument("--threshold", type=float, default=1.25, help="Median slowdown ratio that counts as a regression")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **opts):
+        sizes = [s.strip() for s in opts["sizes"].split(",") if s.strip()]
+        unknown = [s for s in sizes if s not in bench.SIZES]
+        if unknown:
+            raise CommandError(f"Unknown size(s): {', '.join(unknown)}")
+        only = {s.strip() for s in opts["only"].split(",")} if opts["only"] else None
+
+        def log(row):
+            self.stdout.write(
+                f"{row['size']:>6} {row['scenario']:<26} median {row['median_ms']:>9.2f} ms"
+                f"  p95 {row['p95_ms']:>9.2f} ms  {row['queries']:>4} queries"
+                + (f"  x{row['concurrency']} wall {row['wall_ms']:.2f} ms" if "concurrency" in row else "")
+            )
+
+        results = bench.run(
+            sizes, repeat=opts["repeat"], weeks=opts["weeks"], seed=opts["seed"], only=only, log=log,
+            concurrency=opts["concurrency"],
+        )
+        with open(opts["output"], "w", encoding="utf-8") as out:
+            json.dump(results, out, indent=2)
+        self.stdout.write(f"Wrote {len(results['results'])} results to {opts['output']}")
+
+        if not opts["baseline"]:
+            return
+        with open(opts["baseline"], encoding="utf-8") as f:
+            slower = bench.compare(results, json.load(f), threshold=opts["threshold"])
+        for size, scenario, old, new, ratio in slower:
+            self.stdout.write(self.style.WARNING(
+                f"REGRESSION {size} {scenario}: {old['median_ms']} -> {new['median_ms']} ms (x{ratio}), "
+                f"{old['queries']} -> {new['queries']} queries"
+            ))
+        if slower and opts["fail_on_regression"]:
+            raise CommandError(f"{len(slower)} scenario(s) regressed against {opts['baseline']}.")
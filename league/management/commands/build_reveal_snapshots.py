@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from league.models import Season, RevealSnapshot
+from league import reveal
+
+
+class Command(BaseCommand):
+    help = (
+        "Freeze each week's reveal page shortly before Sunday 1 PM ET. "
+        "Run from cron every few minutes; weeks already built at the current data version are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season", type=int, help="Season year (default: the latest)")
+        parser.add_argument("--week", type=int, help="Build this week now, whatever the time")
+        parser.add_argument("--lead-minutes", type=int, default=15, help="How long before reveal to build")
+        parser.add_argument("--hold-hours", type=int, default=6, help="How long after reveal to keep rebuilding")
+        parser.add_argument("--force", action="store_true", help="Rebuild even if the snapshot is current")
+
+    def handle(self, *args, **opts):
+        seasons = Season.objects.order_by("-year")
+        season = seasons.filter(year=opts["season"]).first() if opts["season"] else seasons.first()
+        if season is None:
+            raise CommandError(f"No season {opts['season']}." if opts["season"] else "No seasons yet.")
+
+        if opts["week"]:
+            weeks = [opts["week"]]
+        else:
+            weeks = reveal.due_weeks(
+                season, lead=timedelta(minutes=opts["lead_minutes"]), hold=timedelta(hours=opts["hold_hours"]),
+            )
+        current = set(
+            RevealSnapshot.objects.filter(season=season, data_version=season.data_version)
+            .values_list("week", flat=True)
+        )
+        for week in weeks:
+            if week in current and not opts["force"]:
+                continue
+            snap = reveal.build_snapshot(season, week)
+            self.stdout.write(f"{season.year} W{week}: {len(snap.payload['bets'])} bets @v{snap.data_version}")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from league.models import Season
+from league.exports import EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream a season's bets, parlays and futures as CSV or NDJSON (stdout or --output)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("season", type=int, help="Season year, e.g. 2025")
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--week", type=int, help="Only this week (futures are omitted)")
+        parser.add_argument("--team", help="Only this team (name within the season)")
+        parser.add_argument("--output", "-o", help="File to write (default: stdout)")
+
+    def handle(self, *args, **opts):
+        season = Season.objects.filter(year=opts["season"]).first()
+        if season is None:
+            raise CommandError(f"No season {opts['season']}.")
+        team = None
+        if opts["team"]:
+            team = season.teams.filter(name=opts["team"]).first()
+            if team is None:
+                raise CommandError(f"No team {opts['team']!r} in {season.year}.")
+
+        chunks = iter_export(opts["format"], season, week=opts["week"], team=team)
+        if not opts["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(opts["output"], "w", newline="", encoding="utf-8") as out:
+            for chunk in chunks:
+                out.write(chunk)
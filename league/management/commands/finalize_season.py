@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from league.models import Season
+from league import finalize
+
+
+class Command(BaseCommand):
+    help = (
+        "Render a fully settled season's standings, futures, dashboard and week pages (plus chart JSON) "
+        "to compressed static files served without touching the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("season", type=int, help="Season year")
+        parser.add_argument("--undo", action="store_true", help="Remove the snapshot and serve the live pages again")
+
+    def handle(self, *args, **opts):
+        season = Season.objects.filter(year=opts["season"]).first()
+        if season is None:
+            raise CommandError(f"No season {opts['season']}.")
+        if opts["undo"]:
+            finalize.unfinalize(season)
+            self.stdout.write(f"{season.year}: back to live pages")
+            return
+        try:
+            n = finalize.finalize(season)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"{season.year}: {n} files in {finalize.season_dir(season.year)}")
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from league.models import Season
+from league import odds
+
+logger = logging.getLogger(__name__)
+
+def parse_weeks(spec: str) -> list:
+    """"3", "1-18" or "1,2,5" -> sorted week numbers."""
+    weeks = set()
+    for part in spec.split(","):
+        lo, _, hi = part.strip().partition("-")
+        weeks.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(weeks)
+
+
+class Command(BaseCommand):
+    help = (
+        "Pull games, markets and prices from the odds feed (or a replay directory) and upsert what changed. "
+        "With --every it keeps running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season", type=int, help="Season year (default: the latest)")
+        parser.add_argument("--weeks", default="1-18", help='e.g. "3", "1-18", "1,2,5"')
+        parser.add_argument("--replay", help="Read week-<N>.json slates from this directory instead of the feed")
+        parser.add_argument("--url", default=getattr(settings, "ODDS_API_URL", ""), help="Feed base URL (ODDS_API_URL)")
+        parser.add_argument("--rate", type=float, default=5.0, help="Max feed requests per second")
+        parser.add_argument("--concurrency", type=int, default=8, help="Pooled connections / requests in flight")
+        parser.add_argument("--record", help="Also save each fetched slate here, for --replay later")
+        parser.add_argument("--every", type=int, help="Repeat every N seconds (worker mode)")
+
+    def handle(self, *args, **opts):
+        seasons = Season.objects.order_by("-year")
+        season = seasons.filter(year=opts["season"]).first() if opts["season"] else seasons.first()
+        if season is None:
+            raise CommandError(f"No season {opts['season']}." if opts["season"] else "No seasons yet.")
+        try:
+            weeks = parse_weeks(opts["weeks"])
+        except ValueError:
+            raise CommandError(f"Bad --weeks {opts['weeks']!r}.")
+        if not opts["replay"] and not opts["url"]:
+            raise CommandError("Pass --replay DIR or --url (or set ODDS_API_URL).")
+        if opts["every"] is not None and opts["every"] <= 0:
+            raise CommandError("--every takes a number of seconds above 0.")
+        try:
+            self.provider(opts)  # setup problems (httpx missing) stop the command, worker or not
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        while True:
+            close_old_connections()  # a worker outlives CONN_MAX_AGE and any connection the database dropped
+            start = time.perf_counter()
+            try:
+                result = asyncio.run(odds.ingest(season, self.provider(opts), weeks, record_to=opts["record"]))
+            except Exception as e:
+                if not opts["every"]:
+                    raise CommandError(f"Ingest failed: {e}") from e
+                # a feed timeout, a transport error or a bad slate: log it and try again next round
+                logger.exception("odds ingest for %s failed", season.year)
+                self.stderr.write(f"{season.year}: ingest failed ({e}); retrying in {opts['every']}s")
+            else:
+                self.stdout.write(
+                    f"{season.year} weeks {weeks[0]}-{weeks[-1]}: {result.fetched} games, {result.changed} changed, "
+                    f"{result.markets} markets, {result.selections} selections, {result.removed} removed, {result.linked} picks linked "
+                    f"in {time.perf_counter() - start:.2f}s"
+                )
+                if not opts["every"]:
+                    return
+            time.sleep(opts["every"])
+
+    def provider(self, opts):
+        if opts["replay"]:
+            return odds.ReplayProvider(opts["replay"])
+        return odds.HttpProvider(
+            opts["url"], api_key=getattr(settings, "ODDS_API_KEY", ""),
+            rate=opts["rate"], concurrency=opts["concurrency"],
+        )
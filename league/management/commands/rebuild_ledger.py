@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from league.models import Season
+from league import exposure, ledger
+
+
+class Command(BaseCommand):
+    help = "Re-derive the units ledger and pending exposure from bets, parlays and futures (all seasons, or one with --season)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season", type=int, help="Season year to rebuild (default: all)")
+
+    def handle(self, *args, **opts):
+        seasons = Season.objects.order_by("year")
+        if opts["season"]:
+            seasons = seasons.filter(year=opts["season"])
+            if not seasons.exists():
+                raise CommandError(f"No season {opts['season']}.")
+        for season in seasons:
+            n = ledger.rebuild_season(season)
+            e = exposure.rebuild_season(season)
+            self.stdout.write(f"{season.year}: {n} ledger rows, {e} exposure rows")
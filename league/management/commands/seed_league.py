@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from league.models import Bet
+from league.seeding import seed_league
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic league: N seasons, T teams, U users, weekly picks, parlays and futures."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seasons", type=int, default=1)
+        parser.add_argument("--teams", type=int, default=8)
+        parser.add_argument("--users", type=int, default=32, help="Users per season, spread across the teams")
+        parser.add_argument("--weeks", type=int, default=18)
+        parser.add_argument("--start-year", type=int, default=2025)
+        parser.add_argument("--pending-weeks", type=int, default=1, help="Trailing weeks of the last season left PENDING")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same league)")
+        parser.add_argument("--prefix", default="seed", help="Username / team name prefix")
+        parser.add_argument("--replace", action="store_true", help="Delete existing seasons with the same years first")
+
+    def handle(self, *args, **opts):
+        if opts["teams"] < 1 or opts["users"] < opts["teams"]:
+            raise CommandError("Need at least one team and at least one user per team.")
+        try:
+            seasons = seed_league(
+                seasons=opts["seasons"], teams=opts["teams"], users=opts["users"],
+                weeks=opts["weeks"], start_year=opts["start_year"],
+                pending_weeks=opts["pending_weeks"], seed=opts["seed"],
+                prefix=opts["prefix"], replace=opts["replace"],
+            )
+        except ValueError as e:
+            raise CommandError(f"{e} Pass --replace to overwrite.")
+        for season in seasons:
+            n = Bet.objects.filter(season=season).count()
+            self.stdout.write(f"{season.year}: {opts['teams']} teams, {opts['users']} users, {n} bets")
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from league.models import Season, FuturePick
+from league.matching import FUTURE_MARKETS, futures_key
+from league.sevices import settle_futures_market
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle one futures market for every team at once. SUPER_BOWL / MVP take the winner "
+        '("Chiefs", "Josh Allen"); TEAM_OU takes final win totals ("NE=9,KC=12").'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("season", type=int, help="Season year")
+        parser.add_argument("market", choices=[m for m, _ in FUTURE_MARKETS])
+        parser.add_argument("outcome", nargs="?", default="", help="Winner, or CODE=WINS,... for TEAM_OU")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="List the market's selections and who the outcome would settle, write nothing")
+        parser.add_argument("--force", action="store_true",
+                            help="Settle even if no pick is on the winner (every recognized pick LOST)")
+
+    def handle(self, *args, **opts):
+        season = Season.objects.filter(year=opts["season"]).first()
+        if season is None:
+            raise CommandError(f"No season {opts['season']}.")
+        market = opts["market"]
+        outcome = opts["outcome"]
+        if market == "TEAM_OU":
+            try:
+                outcome = {
+                    code.strip().upper(): float(wins)
+                    for code, wins in (part.split("=") for part in opts["outcome"].split(",") if part.strip())
+                }
+            except ValueError:
+                raise CommandError('TEAM_OU outcome looks like "NE=9,KC=12".')
+
+        if opts["dry_run"] or not outcome:
+            winner = futures_key(market, outcome) if isinstance(outcome, str) and outcome else None
+            rows = (
+                FuturePick.objects.filter(season=season, market=market)
+                .values_list("selection_key").annotate(n=Count("id")).order_by("-n", "selection_key")
+            )
+            for key, n in rows:
+                if not key:
+                    mark = " <- unrecognized, stays pending"
+                else:
+                    mark = " <- won" if key == winner else " <- settled" if isinstance(outcome, dict) and key in outcome else ""
+                self.stdout.write(f"{key or '(blank)':<30} {n}{mark}")
+            return
+
+        try:
+            counts = settle_futures_market(season, market, outcome, force=opts["force"])
+        except ValueError as e:
+            raise CommandError(f"{e} (see --dry-run)")
+        self.stdout.write(
+            f"{season.year} {market}: " + (", ".join(f"{n} {st.lower()}" for st, n in sorted(counts.items())) or "nothing to settle")
+        )
+        left = FuturePick.objects.filter(season=season, market=market, selection_key="", status="PENDING").count()
+        if left:
+            self.stdout.write(f"{left} unrecognized pick(s) left PENDING: settle them in the admin")
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from league.models import Season, Bet
+from league import settlement
+from league.management.commands.ingest_odds import parse_weeks
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle pending spread, total and prop bets from final scores: the ones the odds feed "
+        "stored, or a JSON/CSV scores file (see league/settlement.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season", type=int, help="Season year (default: the latest)")
+        parser.add_argument("--weeks", default="1-18", help='e.g. "3", "1-18", "1,2,5"')
+        parser.add_argument("--scores", help="JSON or CSV file of final scores / prop results to apply first")
+        parser.add_argument("--dry-run", action="store_true", help="Grade and report, write nothing")
+
+    def handle(self, *args, **opts):
+        seasons = Season.objects.order_by("-year")
+        season = seasons.filter(year=opts["season"]).first() if opts["season"] else seasons.first()
+        if season is None:
+            raise CommandError(f"No season {opts['season']}." if opts["season"] else "No seasons yet.")
+        if season.archived_at:
+            raise CommandError(f"Season {season.year} is archived.")
+        try:
+            weeks = parse_weeks(opts["weeks"])
+        except ValueError:
+            raise CommandError(f"Bad --weeks {opts['weeks']!r}.")
+
+        start = time.perf_counter()
+        if opts["scores"]:
+            try:
+                rows = settlement.read_scores(opts["scores"])
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Can't read {opts['scores']}: {e}")
+            if opts["dry_run"]:
+                self.stdout.write("--dry-run: scores file not applied, grading what is already stored")
+            else:
+                games, props, unknown = settlement.apply_scores(season, rows)
+                self.stdout.write(f"Applied {games} final scores, {props} prop results")
+                if unknown:
+                    self.stderr.write(f"Unknown game ids (ingest them first): {', '.join(unknown)}")
+
+        result = settlement.settle(
+            Bet.objects.filter(season=season, week__in=weeks), dry_run=opts["dry_run"],
+        )
+        self.stdout.write(
+            f"{season.year} weeks {weeks[0]}-{weeks[-1]}: {'would settle' if opts['dry_run'] else 'settled'} "
+            f"{result.total} bets ({result.settled['WON']} won, {result.settled['LOST']} lost, "
+            f"{result.settled['PUSH']} push), {result.skipped} left pending "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
@@ -0,0 +1,161 @@
+# league/matching.py
+"""
+Mapping a free-text pick onto the odds feed's games and selections.
+
+Picks are still typed in ("KC -3.5 @ LAC"), so a bet is linked to a
+structured Selection (and its Game) by matching the text against the week's
+selections: team codes pick the game, then the label, the side named first
+(spreads) or Over/Under (totals, props) pick the selection. A prop also has
+to name the selection's player or have been booked at its line, so a pick on
+a prop the feed doesn't carry isn't linked to another player's. A pick that
+only identifies its game gets the game alone; anything ambiguous stays unlinked.
+
+Futures picks get the same treatment per market (futures_key): every
+team's pick #1 is the Super Bowl winner, #2 the MVP, #3 a team win total.
+
+Only takes model classes as arguments (no league.models import), so the
+data migrations run the same code against their historical models.
+"""
+import re
+from collections import defaultdict
+
+CANDIDATE_FIELDS = {
+    "selection_id": "id", "key": "key", "label": "label", "line": "line",
+    "market_type": "market__market_type", "game_id": "market__game_id",
+    "home": "market__game__home", "away": "market__game__away",
+}
+
+def normalize(text: str) -> str:
+    return " ".join((text or "").upper().split())
+
+def candidates(selection_model, season_id: int, week: int) -> list:
+    """Every selection on the week's games, flattened for match()."""
+    rows = selection_model.objects.filter(
+        market__game__season_id=season_id, market__game__week=week,
+    ).values(*CANDIDATE_FIELDS.values())
+    return [{name: row[path] for name, path in CANDIDATE_FIELDS.items()} for row in rows]
+
+def _only(rows):
+    return rows[0] if len(rows) == 1 else None
+
+def _by_label(text: str, rows: list) -> list:
+    """Selections whose label is the pick, or starts it ("KC -3.5" for "KC -3.5 @ LAC")."""
+    return [c for c in rows if text == normalize(c["label"]) or text.startswith(normalize(c["label"]) + " ")]
+
+def _player(label: str) -> list:
+    """The words of a prop label ahead of its Over/Under ("Mahomes Over 265.5 pass yds" -> ["MAHOMES"])."""
+    words = normalize(label).split()
+    return words[:next((i for i, w in enumerate(words) if w in ("OVER", "UNDER")), 0)]
+
+def same_prop(pick_text: str, label: str, selection_line, line) -> bool:
+    """Whether a prop pick booked at line is on this selection: it names the label's player or has its line."""
+    player, words = _player(label), re.findall(r"[A-Z]+", normalize(pick_text))
+    return bool(player) and all(w in words for w in player) or line is not None and selection_line == line
+
+def match(pick_text: str, bet_type: str, over_under, rows: list, line=None):
+    """(game_id, selection_id) for a pick booked at line; either can be None."""
+    text = normalize(pick_text)
+    if not text:
+        return None, None
+    typed = [c for c in rows if c["market_type"] == bet_type]
+
+    # team codes in the text, in the order they appear
+    words = re.findall(r"[A-Z]+", text)
+    games = {c["game_id"] for c in rows if c["home"] in words or c["away"] in words}
+    if len(games) != 1:
+        hit = _only(_by_label(text, typed))  # e.g. "Over 46.5" when only one game has that total
+        return (hit["game_id"], hit["selection_id"]) if hit else (None, None)
+    game_id = games.pop()
+    typed = [c for c in typed if c["game_id"] == game_id]
+
+    hit = _only(_by_label(text, typed))
+    if hit is None and bet_type == "SPREAD" and typed:
+        home, away = typed[0]["home"], typed[0]["away"]
+        first = next(w for w in words if w in (home, away))
+        hit = _only([c for c in typed if c["key"] == ("home" if first == home else "away")])
+    elif hit is None and over_under:
+        sides = [c for c in typed if c["key"] == over_under.lower()]
+        if bet_type == "PROP":
+            sides = [c for c in sides if same_prop(text, c["label"], c["line"], line)]
+        hit = _only(sides)
+    return game_id, hit["selection_id"] if hit else None
+
+def link(selection_model, bets) -> list:
+    """Set game/selection on bets (saved or not) from their pick text. Returns the bets that changed."""
+    groups = defaultdict(list)
+    for bet in bets:
+        groups[(bet.season_id, bet.week)].append(bet)
+    changed = []
+    for (season_id, week), group in groups.items():
+        rows = candidates(selection_model, season_id, week)
+        for bet in group:
+            found = match(bet.pick_text, bet.bet_type, bet.over_under, rows, bet.line) if rows else (None, None)
+            if found != (bet.game_id, bet.selection_id):
+                bet.game_id, bet.selection_id = found
+                changed.append(bet)
+    return changed
+
+# ---------- futures ----------
+# slot -> market: every team's pick #1 is the Super Bowl winner, #2 the MVP, #3 a team win total
+FUTURE_MARKETS = (
+    ("SUPER_BOWL", "Super Bowl Winner"),
+    ("MVP", "MVP"),
+    ("TEAM_OU", "Team O/U"),
+)
+FUTURE_MARKET_BY_INDEX = {1: "SUPER_BOWL", 2: "MVP", 3: "TEAM_OU"}
+
+NFL_TEAMS = {
+    "ARI": ("Arizona", "Cardinals"), "ATL": ("Atlanta", "Falcons"), "BAL": ("Baltimore", "Ravens"),
+    "BUF": ("Buffalo", "Bills"), "CAR": ("Carolina", "Panthers"), "CHI": ("Chicago", "Bears"),
+    "CIN": ("Cincinnati", "Bengals"), "CLE": ("Cleveland", "Browns"), "DAL": ("Dallas", "Cowboys"),
+    "DEN": ("Denver", "Broncos"), "DET": ("Detroit", "Lions"), "GB": ("Green Bay", "Packers"),
+    "HOU": ("Houston", "Texans"), "IND": ("Indianapolis", "Colts"), "JAX": ("Jacksonville", "Jaguars"),
+    "KC": ("Kansas City", "Chiefs"), "LAC": (None, "Chargers"), "LAR": (None, "Rams"),
+    "LV": ("Las Vegas", "Raiders"), "MIA": ("Miami", "Dolphins"), "MIN": ("Minnesota", "Vikings"),
+    "NE": ("New England", "Patriots"), "NO": ("New Orleans", "Saints"), "NYG": (None, "Giants"),
+    "NYJ": (None, "Jets"), "PHI": ("Philadelphia", "Eagles"), "PIT": ("Pittsburgh", "Steelers"),
+    "SEA": ("Seattle", "Seahawks"), "SF": ("San Francisco", "49ers"), "TB": ("Tampa Bay", "Buccaneers"),
+    "TEN": ("Tennessee", "Titans"), "WAS": ("Washington", "Commanders"),
+}
+# lower-case name -> code; LA and New York host two teams each, so their cities aren't listed
+TEAM_NAMES = {
+    **{nick.lower(): code for code, (_, nick) in NFL_TEAMS.items()},
+    **{city.lower(): code for code, (city, _) in NFL_TEAMS.items() if city},
+    "niners": "SF", "pats": "NE", "bucs": "TB", "jags": "JAX", "commies": "WAS",
+}
+FUTURE_FILLER = {"TO", "WIN", "WINS", "WINNER", "THE", "SUPER", "BOWL", "SB", "MVP", "AWARD"}
+NAME_SUFFIXES = {"JR", "SR", "II", "III", "IV"}
+
+def team_code(text: str):
+    """The NFL team a bit of text names (code, nickname or city), or None."""
+    for word in re.findall(r"\b[A-Z]{2,3}\b", text or ""):  # codes only as typed in capitals
+        if word in NFL_TEAMS:
+            return word
+    lowered = " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+    for name in sorted(TEAM_NAMES, key=len, reverse=True):  # longest first: "green bay" over "bay"-like overlaps
+        if re.search(rf"\b{re.escape(name)}\b", lowered):
+            return TEAM_NAMES[name]
+    return None
+
+def futures_key(market: str, text: str) -> str:
+    """
+    Normalized selection a futures pick is on, the same for every team that
+    picked it: a team code for SUPER_BOWL and TEAM_OU ("Chiefs to win SB" and
+    "KC" are both "KC"), the surname for MVP ("Drake Maye MVP" and "Maye" are
+    both "MAYE"). Blank when the text names no team / player: such picks are
+    left for a person to look at rather than settled.
+    """
+    if market in ("SUPER_BOWL", "TEAM_OU"):
+        return team_code(text) or ""
+    words = [
+        w for w in re.findall(r"[A-Z]+", normalize(text))
+        if w not in FUTURE_FILLER and w not in NAME_SUFFIXES and w not in NFL_TEAMS  # "Josh Allen (BUF) MVP"
+    ]
+    return words[-1][:100] if words else ""
+
+def team_ou(text: str):
+    """("OVER" | "UNDER", line) from a win-total pick like "Patriots over 8.5 wins", or (None, None)."""
+    m = re.search(r"\b(over|under|o|u)\s*(\d+(?:\.\d+)?)", (text or "").lower())
+    if not m:
+        return None, None
+    return ("OVER" if m.group(1).startswith("o") else "UNDER"), float(m.group(2))
@@ -0,0 +1,170 @@
+# league/metrics.py
+"""
+Per-view request metrics in Prometheus text format, shared across workers.
+
+Each process accumulates its histograms in memory and every few seconds
+writes them to <METRICS_DIR>/<pid>.json (write-then-rename, so readers never
+see half a file). A scrape of /metrics on any worker merges every worker's
+file with its own live numbers. Files of exited workers are kept so the
+counters stay monotonic; clear the directory on deploy.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SQL_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+HISTOGRAMS = {
+    "league_request_duration_seconds": ("Request latency by view.", LATENCY_BUCKETS),
+    "league_request_queries": ("SQL queries per request by view.", QUERY_BUCKETS),
+    "league_request_sql_seconds": ("Time spent in SQL per request by view.", SQL_SECONDS_BUCKETS),
+}
+COUNTERS = {
+    "league_requests_total": "Requests by view, method and status code.",
+}
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+_state = {"histograms": {}, "counters": {}}  # name -> {labels tuple: value}
+_last_flush = 0.0
+
+def _metrics_dir() -> str:
+    return getattr(settings, "METRICS_DIR", "/tmp/betting_league_metrics")
+
+def _flush_interval() -> float:
+    return getattr(settings, "METRICS_FLUSH_SECONDS", 5.0)
+
+class QueryTimer:
+    """connection.execute_wrapper() hook that counts queries and sums their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+def _observe(name: str, labels: tuple, value: float) -> None:
+    buckets = HISTOGRAMS[name][1]
+    series = _state["histograms"].setdefault(name, {})
+    # per-bucket (non-cumulative) counts, +Inf last, then sum and count
+    h = series.setdefault(labels, [0] * (len(buckets) + 1) + [0.0, 0])
+    i = next((i for i, le in enumerate(buckets) if value <= le), len(buckets))
+    h[i] += 1
+    h[-2] += value
+    h[-1] += 1
+
+def record_request(view: str, method: str, status: int, seconds: float, queries: int, sql_seconds: float) -> None:
+    labels = (("view", view), ("method", method))
+    with _lock:
+        _observe("league_request_duration_seconds", labels, seconds)
+        _observe("league_request_queries", labels, queries)
+        _observe("league_request_sql_seconds", labels, sql_seconds)
+        counters = _state["counters"].setdefault("league_requests_total", {})
+        key = labels + (("status", str(status)),)
+        counters[key] = counters.get(key, 0) + 1
+    if time.monotonic() - _last_flush >= _flush_interval():
+        flush()
+
+def _snapshot() -> dict:
+    """This process's numbers as JSON-able data."""
+    with _lock:
+        return {
+            kind: {name: [[dict(labels), value] for labels, value in series.items()]
+                   for name, series in _state[kind].items()}
+            for kind in ("histograms", "counters")
+        }
+
+def flush() -> None:
+    """Write this process's numbers to its file in METRICS_DIR."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    path = os.path.join(_metrics_dir(), f"{os.getpid()}.json")
+    try:
+        os.makedirs(_metrics_dir(), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(_snapshot(), f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass  # metrics must never break a request
+
+atexit.register(flush)
+
+def _merge(into: dict, data: dict) -> None:
+    for name, series in data.get("histograms", {}).items():
+        target = into["histograms"].setdefault(name, {})
+        for labels, values in series:
+            key = tuple(labels.items())
+            old = target.get(key)
+            target[key] = values if old is None else [a + b for a, b in zip(old, values)]
+    for name, series in data.get("counters", {}).items():
+        target = into["counters"].setdefault(name, {})
+        for labels, value in series:
+            key = tuple(labels.items())
+            target[key] = target.get(key, 0) + value
+
+def collect() -> dict:
+    """Every worker's numbers merged (this process from memory, the others from their files)."""
+    merged = {"histograms": {}, "counters": {}}
+    own = f"{os.getpid()}.json"
+    try:
+        names = [n for n in os.listdir(_metrics_dir()) if n.endswith(".json") and n != own]
+    except OSError:
+        names = []
+    workers = 1
+    for name in names:
+        try:
+            with open(os.path.join(_metrics_dir(), name), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue  # a worker mid-rename or a stray file
+        if not isinstance(data, dict):
+            continue
+        _merge(merged, data)
+        workers += 1
+    _merge(merged, _snapshot())
+    merged["workers"] = workers
+    return merged
+
+def _labels(pairs) -> str:
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+def _num(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(data=None) -> str:
+    """Prometheus text exposition of collect()."""
+    data = data or collect()
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, h in sorted(data["histograms"].get(name, {}).items()):
+            running = 0
+            for le, n in zip([*map(str, buckets), "+Inf"], h[:-2]):
+                running += n
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {running}")
+            lines.append(f"{name}_sum{_labels(labels)} {_num(h[-2])}")
+            lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+    for name, help_text in COUNTERS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for labels, value in sorted(data["counters"].get(name, {}).items()):
+            lines.append(f"{name}{_labels(labels)} {value}")
+    lines += [
+        "# HELP league_metrics_workers Worker processes contributing to these metrics.",
+        "# TYPE league_metrics_workers gauge",
+        f"league_metrics_workers {data['workers']}",
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,73 @@
+# league/middleware.py
+import os
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.urls import resolve
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import MissingFileError
+
+from . import finalize, metrics
+from .recompute import defer_recomputes
+
+
+class RecomputeCoalescingMiddleware:
+    """Recompute each parlay/ledger key dirtied by a request once, at the end of it."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with defer_recomputes():
+            return self.get_response(request)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, SQL query count and SQL time per resolved view (see
+    league/metrics.py). Streaming bodies are timed up to the first byte only.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = metrics.QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unresolved"  # never the raw path: keeps label cardinality bounded
+        metrics.record_request(view, request.method, response.status_code, elapsed, timer.count, timer.seconds)
+        return response
+
+
+class SeasonSnapshotMiddleware:
+    """
+    Serve a finalized season's pre-rendered pages (league/finalize.py) before
+    sessions or auth are touched: no queries. WhiteNoise supplies the
+    ETag/Last-Modified handling and the gzip/brotli negotiation.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.files = WhiteNoise(application=None, max_age=0)  # always revalidate: a reopened result re-renders
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD"):
+            for name in finalize.candidates(request.path_info, request.GET):
+                try:
+                    static_file = self.files.get_static_file(
+                        os.path.join(finalize.snapshot_root(), name), request.path_info,
+                    )
+                except MissingFileError:
+                    continue
+                request.resolver_match = resolve(request.path_info)  # metrics label it by view
+                return WhiteNoiseMiddleware.serve(static_file, request)
+        return self.get_response(request)
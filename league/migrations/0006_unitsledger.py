@@ -0,0 +1,88 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:24
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def _odds_profit(american_odds, stake):
+    if -100 < american_odds < 100:
+        return 0.0
+    dec = 1 + (american_odds / 100.0) if american_odds >= 100 else 1 + (100.0 / abs(american_odds))
+    return stake * (dec - 1.0)
+
+
+def backfill_ledger(apps, schema_editor):
+    """Seed the ledger from existing rows (historical models, so no app imports)."""
+    Bet = apps.get_model("league", "Bet")
+    TeamParlay = apps.get_model("league", "TeamParlay")
+    FuturePick = apps.get_model("league", "FuturePick")
+    UnitsLedger = apps.get_model("league", "UnitsLedger")
+
+    groups = defaultdict(lambda: {"units": 0.0, "picks": 0, "WON": 0, "LOST": 0, "PUSH": 0})
+
+    def add(key, status, pnl):
+        g = groups[key]
+        g["picks"] += 1
+        g["units"] += pnl
+        if status in ("WON", "LOST", "PUSH"):
+            g[status] += 1
+
+    def odds_pnl(status, odds, stake):
+        if status == "WON":
+            return _odds_profit(odds, stake)
+        return -stake if status == "LOST" else 0.0
+
+    for row in Bet.objects.values_list("season_id", "team_id", "user_id", "week", "status", "american_odds", "stake_units"):
+        add(("BET",) + row[:4], row[4], odds_pnl(*row[4:]))
+    for s_id, t_id, week, status, dec, stake in TeamParlay.objects.values_list(
+        "season_id", "team_id", "week", "status", "decimal_odds", "stake_units"
+    ):
+        pnl = stake * (dec - 1.0) if status == "WON" else (-stake if status == "LOST" else 0.0)
+        add(("PARLAY", s_id, t_id, None, week), status, pnl)
+    for s_id, t_id, status, odds, stake in FuturePick.objects.values_list(
+        "season_id", "team_id", "status", "american_odds", "stake_units"
+    ):
+        add(("FUTURE", s_id, t_id, None, 0), status, odds_pnl(status, odds, stake))
+
+    UnitsLedger.objects.bulk_create([
+        UnitsLedger(
+            source=source, season_id=s_id, team_id=t_id, user_id=u_id, week=week,
+            units=g["units"], picks=g["picks"], wins=g["WON"], losses=g["LOST"], pushes=g["PUSH"],
+        )
+        for (source, s_id, t_id, u_id, week), g in groups.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0005_futurepick'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitsLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.PositiveIntegerField()),
+                ('source', models.CharField(choices=[('BET', 'Individual Bet'), ('PARLAY', 'Team Parlay'), ('FUTURE', 'Futures Pick')], max_length=10)),
+                ('units', models.FloatField(default=0.0)),
+                ('picks', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('pushes', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger', to='league.season')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger', to='league.team')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['season', 'week'], name='ledger_season_week_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('season', 'team', 'user', 'week', 'source'), name='ledger_unique_user_row'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('season', 'team', 'week', 'source'), name='ledger_unique_team_row')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
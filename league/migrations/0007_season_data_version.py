@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0006_unitsledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='season',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0007_season_data_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['season', 'week', 'status'], name='bet_season_week_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(condition=models.Q(('status', 'PENDING'), _negated=True), fields=['season', 'week', 'user'], name='bet_settled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['season', 'week', 'team'], name='bet_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamparlay',
+            index=models.Index(fields=['season', 'status', 'week'], name='parlay_season_status_week_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:40
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0008_query_shape_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bet',
+            name='decimal_odds',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(american_odds__gte=100, then=django.db.models.expressions.CombinedExpression(models.Value(1.0), '+', django.db.models.expressions.CombinedExpression(models.F('american_odds'), '/', models.Value(100.0)))), models.When(american_odds__lte=-100, then=django.db.models.expressions.CombinedExpression(models.Value(1.0), '+', django.db.models.expressions.CombinedExpression(models.Value(100.0), '/', django.db.models.expressions.CombinedExpression(models.F('american_odds'), '*', models.Value(-1.0))))), default=models.Value(1.0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='pnl_units',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(status='WON', then=django.db.models.expressions.CombinedExpression(models.F('stake_units'), '*', django.db.models.expressions.CombinedExpression(models.Case(models.When(american_odds__gte=100, then=django.db.models.expressions.CombinedExpression(models.Value(1.0), '+', django.db.models.expressions.CombinedExpression(models.F('american_odds'), '/', models.Value(100.0)))), models.When(american_odds__lte=-100, then=django.db.models.expressions.CombinedExpression(models.Value(1.0), '+', django.db.models.expressions.CombinedExpression(models.Value(100.0), '/', django.db.models.expressions.CombinedExpression(models.F('american_odds'), '*', models.Value(-1.0))))), default=models.Value(1.0), output_field=models.FloatField()), '-', models.Value(1.0)))), models.When(status='LOST', then=django.db.models.expressions.CombinedExpression(models.F('stake_units'), '*', models.Value(-1.0))), default=models.Value(0.0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='futurepick',
+            name='decimal_odds',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(american_odds__gte=100, then=django.db.models.expressions.CombinedExpression(models.Value(1.0), '+', django.db.models.expressions.CombinedExpression(models.F('american_odds'), '/', models.Value(100.0)))), models.When(american_odds__lte=-100, then=django.db.models.expressions.CombinedExpression(models.Value(1.0), '+', django.db.models.expressions.CombinedExpression(models.Value(100.0), '/', django.db.models.expressions.CombinedExpression(models.F('american_odds'), '*', models.Value(-1.0))))), default=models.Value(1.0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='futurepick',
+            name='pnl_units',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(status='WON', then=django.db.models.expressions.CombinedExpression(models.F('stake_units'), '*', django.db.models.expressions.CombinedExpression(models.Case(models.When(american_odds__gte=100, then=django.db.models.expressions.CombinedExpression(models.Value(1.0), '+', django.db.models.expressions.CombinedExpression(models.F('american_odds'), '/', models.Value(100.0)))), models.When(american_odds__lte=-100, then=django.db.models.expressions.CombinedExpression(models.Value(1.0), '+', django.db.models.expressions.CombinedExpression(models.Value(100.0), '/', django.db.models.expressions.CombinedExpression(models.F('american_odds'), '*', models.Value(-1.0))))), default=models.Value(1.0), output_field=models.FloatField()), '-', models.Value(1.0)))), models.When(status='LOST', then=django.db.models.expressions.CombinedExpression(models.F('stake_units'), '*', models.Value(-1.0))), default=models.Value(0.0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='teamparlay',
+            name='pnl_units',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(status='WON', then=django.db.models.expressions.CombinedExpression(models.F('stake_units'), '*', django.db.models.expressions.CombinedExpression(models.F('decimal_odds'), '-', models.Value(1.0)))), models.When(status='LOST', then=django.db.models.expressions.CombinedExpression(models.F('stake_units'), '*', models.Value(-1.0))), default=models.Value(0.0), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0009_generated_odds_pnl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevealSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.PositiveIntegerField()),
+                ('data_version', models.PositiveIntegerField()),
+                ('payload', models.JSONField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reveal_snapshots', to='league.season')),
+            ],
+            options={
+                'unique_together': {('season', 'week')},
+            },
+        ),
+    ]
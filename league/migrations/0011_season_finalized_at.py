@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0010_reveal_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='season',
+            name='finalized_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
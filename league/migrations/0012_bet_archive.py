@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0011_season_finalized_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='season',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='BetArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('week', models.PositiveIntegerField()),
+                ('bet_type', models.CharField(choices=[('SPREAD', 'Spread'), ('TOTAL', 'Total'), ('PROP', 'Player Prop')], max_length=10)),
+                ('pick_text', models.CharField(max_length=255)),
+                ('line', models.FloatField()),
+                ('american_odds', models.IntegerField()),
+                ('stake_units', models.FloatField()),
+                ('parlay_selected', models.BooleanField()),
+                ('over_under', models.CharField(blank=True, choices=[('OVER', 'Over'), ('UNDER', 'Under')], max_length=5, null=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('WON', 'Won'), ('LOST', 'Lost'), ('PUSH', 'Push')], max_length=10)),
+                ('settled_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('decimal_odds', models.FloatField()),
+                ('pnl_units', models.FloatField()),
+                ('season', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_bets', to='league.season')),
+                ('team', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_bets', to='league.team')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['season', 'week'], name='betarchive_season_week_idx')],
+            },
+        ),
+    ]
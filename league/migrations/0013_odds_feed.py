@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0012_bet_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Game',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.PositiveIntegerField()),
+                ('external_id', models.CharField(max_length=64, unique=True)),
+                ('home', models.CharField(max_length=8)),
+                ('away', models.CharField(max_length=8)),
+                ('kickoff', models.DateTimeField()),
+                ('status', models.CharField(choices=[('SCHEDULED', 'Scheduled'), ('LIVE', 'In progress'), ('FINAL', 'Final'), ('POSTPONED', 'Postponed')], default='SCHEDULED', max_length=10)),
+                ('home_score', models.PositiveIntegerField(blank=True, null=True)),
+                ('away_score', models.PositiveIntegerField(blank=True, null=True)),
+                ('content_hash', models.CharField(editable=False, max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='games', to='league.season')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Market',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('market_type', models.CharField(choices=[('SPREAD', 'Spread'), ('TOTAL', 'Total'), ('PROP', 'Player Prop')], max_length=10)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='markets', to='league.game')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Selection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50)),
+                ('label', models.CharField(max_length=255)),
+                ('line', models.FloatField(blank=True, null=True)),
+                ('american_odds', models.IntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='selections', to='league.market')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['season', 'week'], name='game_season_week_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='market',
+            unique_together={('game', 'key')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='selection',
+            unique_together={('market', 'key')},
+        ),
+    ]
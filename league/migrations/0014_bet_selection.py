@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from league import matching
+
+
+def link_existing_bets(apps, schema_editor):
+    """Map free-text picks onto whatever games/selections the feed already loaded."""
+    Game = apps.get_model("league", "Game")
+    Selection = apps.get_model("league", "Selection")
+    weeks = Game.objects.values_list("season_id", "week").distinct()
+    for name in ("Bet", "BetArchive"):
+        model = apps.get_model("league", name)
+        for season_id, week in weeks:
+            bets = model.objects.filter(season_id=season_id, week=week).only(
+                "season", "week", "bet_type", "pick_text", "line", "over_under", "game", "selection",
+            )
+            model.objects.bulk_update(matching.link(Selection, bets), ["game", "selection"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0013_odds_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bet',
+            name='game',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bets', to='league.game'),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='selection',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bets', to='league.selection'),
+        ),
+        migrations.AddField(
+            model_name='betarchive',
+            name='game',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_bets', to='league.game'),
+        ),
+        migrations.AddField(
+            model_name='betarchive',
+            name='selection',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_bets', to='league.selection'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['season', 'week', 'game'], name='bet_season_week_game_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='betarchive',
+            index=models.Index(fields=['season', 'week', 'game'], name='betarchive_game_idx'),
+        ),
+        migrations.RunPython(link_existing_bets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0014_bet_selection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='market',
+            name='result',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:06
+
+from django.db import migrations, models
+
+from league import matching
+
+
+def fill_selection_keys(apps, schema_editor):
+    FuturePick = apps.get_model("league", "FuturePick")
+    picks = list(FuturePick.objects.only("index", "pick_text"))
+    for pick in picks:
+        pick.market = matching.FUTURE_MARKET_BY_INDEX.get(pick.index, "")
+        pick.selection_key = matching.futures_key(pick.market, pick.pick_text)
+    FuturePick.objects.bulk_update(picks, ["market", "selection_key"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0015_market_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='futurepick',
+            name='market',
+            field=models.CharField(blank=True, choices=[('SUPER_BOWL', 'Super Bowl Winner'), ('MVP', 'MVP'), ('TEAM_OU', 'Team O/U')], editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='futurepick',
+            name='selection_key',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='futurepick',
+            index=models.Index(fields=['season', 'market', 'selection_key'], name='future_market_key_idx'),
+        ),
+        migrations.RunPython(fill_selection_keys, migrations.RunPython.noop),
+    ]
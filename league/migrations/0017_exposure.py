@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0016_futures_selection_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Exposure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.PositiveIntegerField()),
+                ('bet_type', models.CharField(choices=[('SPREAD', 'Spread'), ('TOTAL', 'Total'), ('PROP', 'Player Prop')], max_length=10)),
+                ('pick', models.CharField(max_length=255)),
+                ('bets', models.PositiveIntegerField(default=0)),
+                ('stake_units', models.FloatField(default=0.0)),
+                ('potential_return_units', models.FloatField(default=0.0)),
+                ('parlay_legs', models.PositiveIntegerField(default=0)),
+                ('parlay_return_units', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('game', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exposure', to='league.game')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exposure', to='league.season')),
+                ('selection', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exposure', to='league.selection')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['season', 'week'], name='exposure_season_week_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:37
+
+from django.db import migrations, models
+
+TOTALS = ["bets", "stake_units", "potential_return_units", "parlay_legs", "parlay_return_units"]
+
+
+def merge_picks(apps, schema_editor):
+    # rows were keyed by selection too, and concurrent refreshes could write a
+    # key twice: keep one row per old key, then fold each
+    # (season, week, game, bet_type, pick) into one row
+    Exposure = apps.get_model("league", "Exposure")
+    seen, kept, extra = set(), {}, []
+    for row in Exposure.objects.order_by("-id"):
+        row.game_key = row.game_id or 0
+        key = (row.season_id, row.week, row.game_key, row.bet_type, row.pick)
+        first = kept.setdefault(key, row)
+        if first is not row:
+            extra.append(row.id)
+            if (key, row.selection_id) not in seen:
+                for f in TOTALS:
+                    setattr(first, f, getattr(first, f) + getattr(row, f))
+        seen.add((key, row.selection_id))
+    Exposure.objects.filter(id__in=extra).delete()
+    Exposure.objects.bulk_update(kept.values(), ["game_key", *TOTALS], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0017_exposure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exposure',
+            name='game_key',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(merge_picks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='exposure',
+            constraint=models.UniqueConstraint(fields=('season', 'week', 'game_key', 'bet_type', 'pick'), name='exposure_unique_pick'),
+        ),
+    ]
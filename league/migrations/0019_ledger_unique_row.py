@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_user_keys(apps, schema_editor):
+    UnitsLedger = apps.get_model("league", "UnitsLedger")
+    UnitsLedger.objects.filter(user__isnull=False).update(user_key=F("user_id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0018_exposure_unique_pick'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='unitsledger',
+            name='ledger_unique_user_row',
+        ),
+        migrations.RemoveConstraint(
+            model_name='unitsledger',
+            name='ledger_unique_team_row',
+        ),
+        migrations.AddField(
+            model_name='unitsledger',
+            name='user_key',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_user_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='unitsledger',
+            constraint=models.UniqueConstraint(fields=('season', 'team', 'user_key', 'week', 'source'), name='ledger_unique_row'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from league import matching
+
+
+def refill_selection_keys(apps, schema_editor):
+    # MVP keys are surnames now, and unrecognized picks get a blank key
+    FuturePick = apps.get_model("league", "FuturePick")
+    picks = list(FuturePick.objects.only("market", "pick_text"))
+    for pick in picks:
+        pick.selection_key = matching.futures_key(pick.market, pick.pick_text)
+    FuturePick.objects.bulk_update(picks, ["selection_key"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0019_ledger_unique_row'),
+    ]
+
+    operations = [
+        migrations.RunPython(refill_selection_keys, migrations.RunPython.noop),
+    ]
@@ -6,20 +6,28 @@ from django.utils import timezone
 from django.db.models import F, Q, Sum, Case, When, FloatField, Count
 from django.core.exceptions import ValidationError
 
-# Odds helpers
-def american_to_decimal(american_odds: int) -> float:
-    # +150 -> 2.50 ; -120 -> 1.8333
-    if american_odds >= 100:
-        return 1 + (american_odds / 100.0)
-    elif american_odds <= -100:
-        return 1 + (100.0 / abs(american_odds))
-    else:
-        raise ValueError("American odds must be >= +100 or <= -100")
+# Odds helpers live in league/pricing.py (re-exported here for existing imports)
+from .pricing import american_to_decimal, safe_decimal_odds, decimal_odds_expr, pnl_expr
+from .matching import FUTURE_MARKETS, FUTURE_MARKET_BY_INDEX, futures_key
+
+def refresh_generated(instance) -> None:
+    """
+    Re-read an instance's generated columns (decimal_odds, pnl_units) after
+    save(): the database computes them and Django leaves the old values in place.
+    """
+    fields = [f.attname for f in instance._meta.concrete_fields if f.generated]
+    instance.refresh_from_db(using=instance._state.db, fields=fields)
 
 class Season(models.Model):
     year = models.IntegerField(unique=True)  # e.g., 2025
     start_date = models.DateField(null=True, blank=True)
     end_date = models.DateField(null=True, blank=True)
+    # bumped whenever results change; versions the cached standings/dashboard payloads
+    data_version = models.PositiveIntegerField(default=0, editable=False)
+    # set by `manage.py finalize_season`: pages are served as static files (league/finalize.py)
+    finalized_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # set by `manage.py archive_season`: the season's bets live in BetArchive (see bets_for)
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return str(self.year)
@@ -64,15 +72,74 @@ OVER_UNDER_CHOICES = (
     ("UNDER", "Under"),
 )
 
+GAME_STATUS = (
+    ("SCHEDULED", "Scheduled"),
+    ("LIVE", "In progress"),
+    ("FINAL", "Final"),
+    ("POSTPONED", "Postponed"),
+)
+
+class Game(models.Model):
+    """An NFL game from the odds feed (league/odds.py). Teams are NFL abbreviations, not league teams."""
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="games")
+    week = models.PositiveIntegerField()
+    external_id = models.CharField(max_length=64, unique=True)  # provider's id
+    home = models.CharField(max_length=8)
+    away = models.CharField(max_length=8)
+    kickoff = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=GAME_STATUS, default="SCHEDULED")
+    home_score = models.PositiveIntegerField(null=True, blank=True)
+    away_score = models.PositiveIntegerField(null=True, blank=True)
+    content_hash = models.CharField(max_length=40, editable=False)  # of the last ingested payload
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["season", "week"], name="game_season_week_idx")]
+
+    def __str__(self):
+        return f"{self.away} @ {self.home} W{self.week}"
+
+class Market(models.Model):
+    """One betting market of a game: its spread, its total, or a player prop."""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="markets")
+    key = models.CharField(max_length=100)  # provider's market key, e.g. "spread", "prop:mahomes:pass_yds"
+    market_type = models.CharField(max_length=10, choices=BET_TYPE)
+    description = models.CharField(max_length=255, blank=True)
+    result = models.FloatField(null=True, blank=True)  # final stat a prop settles on (e.g. 281 passing yards)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("game", "key")
+
+    def __str__(self):
+        return f"{self.game} {self.key}"
+
+class Selection(models.Model):
+    """A side of a market at its current line and price."""
+    market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name="selections")
+    key = models.CharField(max_length=50)  # "home" / "away" / "over" / "under"
+    label = models.CharField(max_length=255)  # what a bet's pick_text would say, e.g. "KC -3.5"
+    line = models.FloatField(null=True, blank=True)
+    american_odds = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("market", "key")
+
+    def __str__(self):
+        return f"{self.label} ({self.american_odds:+d})"
+
 class Bet(models.Model):
     """One pick per user per NFL week (per season)."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bets")
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="bets")  # redundant but handy
     season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="bets")
     week = models.PositiveIntegerField()  # 1..18 regular season
-    # free-text now; later replace with structured matchup model fed by an API
     bet_type = models.CharField(max_length=10, choices=BET_TYPE,default='SPREAD')
     pick_text = models.CharField(max_length=255)         # e.g., "KC -3.5 @ LAC"
+    # what pick_text refers to in the odds feed, when league.matching can tell (see link_bets)
+    game = models.ForeignKey(Game, on_delete=models.SET_NULL, null=True, blank=True, related_name="bets")
+    selection = models.ForeignKey(Selection, on_delete=models.SET_NULL, null=True, blank=True, related_name="bets")
     line = models.FloatField(help_text="Spread or total number (e.g., -3.5, 47.5)")
     american_odds = models.IntegerField(help_text="e.g., -110, +150")
     stake_units = models.FloatField(default=1.0)  # 1 unit per pick (adjust if you allow variable stakes)
@@ -87,6 +154,10 @@ class Bet(models.Model):
     status = models.CharField(max_length=10, choices=BET_STATUS, default="PENDING")
     settled_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    # computed by the database on every write; aggregates are a plain Sum("pnl_units")
+    decimal_odds = models.GeneratedField(expression=decimal_odds_expr(), output_field=models.FloatField(), db_persist=True)
+    pnl_units = models.GeneratedField(expression=pnl_expr(decimal_odds_expr()), output_field=models.FloatField(), db_persist=True)
+
     def clean(self):
         super().clean()
         if self.bet_type in ("TOTAL", "PROP") and not self.over_under:
@@ -97,28 +168,76 @@ class Bet(models.Model):
 
     class Meta:
         unique_together = ("user", "season", "week", "bet_type")  # enforce one pick per week per user
+        indexes = [
+            # week_view / dashboard week filter: season + week, then status (settled or own pending)
+            models.Index(fields=["season", "week", "status"], name="bet_season_week_status_idx"),
+            # "settled only" reads (all-weeks dashboard, debug roll-ups, exports)
+            models.Index(fields=["season", "week", "user"], name="bet_settled_idx",
+                         condition=~Q(status="PENDING")),
+            # pending picks by team (personal pending rows, reveal, exposure)
+            models.Index(fields=["season", "week", "team"], name="bet_pending_idx",
+                         condition=Q(status="PENDING")),
+            # per-game reads: settlement, exposure, consensus
+            models.Index(fields=["season", "week", "game"], name="bet_season_week_game_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} W{self.week} {self.bet_type} {self.pick_text}"
 
-    @property
-    def decimal_odds(self) -> float:
-        return american_to_decimal(self.american_odds)
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        refresh_generated(self)
 
     @property
     def potential_return_units(self) -> float:
-        # stake * decimal_odds
+        # stake * decimal_odds; an unsaved bet has no generated column to read yet
+        if self._state.adding:
+            return self.stake_units * safe_decimal_odds(self.american_odds)
         return self.stake_units * self.decimal_odds
 
-    @property
-    def pnl_units(self) -> float:
-        if self.status == "WON":
-            return self.stake_units * (self.decimal_odds - 1.0)  # profit only
-        if self.status == "LOST":
-            return -self.stake_units
-        if self.status == "PUSH":
-            return 0.0
-        return 0.0  # pending
+class BetArchive(models.Model):
+    """
+    Bets of an archived (closed, fully settled) season, moved out of Bet so the
+    live table and its indexes only hold seasons still in play. Same columns
+    and ids as Bet; odds and PnL are stored as settled rather than generated.
+    Read through bets_for(season); written only by league.archive.
+    """
+    id = models.BigIntegerField(primary_key=True)  # the Bet id, so cursors and links keep working
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_bets")
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="archived_bets", db_index=False)
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="archived_bets", db_index=False)
+    week = models.PositiveIntegerField()
+    bet_type = models.CharField(max_length=10, choices=BET_TYPE)
+    pick_text = models.CharField(max_length=255)
+    game = models.ForeignKey(Game, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_bets", db_index=False)
+    selection = models.ForeignKey(Selection, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_bets")
+    line = models.FloatField()
+    american_odds = models.IntegerField()
+    stake_units = models.FloatField()
+    parlay_selected = models.BooleanField()
+    over_under = models.CharField(max_length=5, choices=OVER_UNDER_CHOICES, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=BET_STATUS)
+    settled_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    decimal_odds = models.FloatField()
+    pnl_units = models.FloatField()
+
+    class Meta:
+        # reads are by season (+ week, + game), or by user (FK index)
+        indexes = [
+            models.Index(fields=["season", "week"], name="betarchive_season_week_idx"),
+            models.Index(fields=["season", "week", "game"], name="betarchive_game_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} W{self.week} {self.bet_type} {self.pick_text} (archived)"
+
+# columns copied between Bet and BetArchive
+ARCHIVED_BET_FIELDS = [f.attname for f in BetArchive._meta.concrete_fields]
+
+def bets_for(season):
+    """A season's bets from whichever table holds them: Bet, or BetArchive once archived."""
+    return (BetArchive if season.archived_at else Bet).objects.filter(season=season)
 
 class TeamParlay(models.Model):
     """Represents the team parlay for a given week."""
@@ -130,48 +249,148 @@ class TeamParlay(models.Model):
     stake_units = models.FloatField(default=1.0)
     status = models.CharField(max_length=10, choices=BET_STATUS, default="PENDING")
     updated_at = models.DateTimeField(auto_now=True)
+    pnl_units = models.GeneratedField(expression=pnl_expr(F("decimal_odds")), output_field=models.FloatField(), db_persist=True)
 
     class Meta:
         unique_together = ("team", "season", "week")
+        indexes = [models.Index(fields=["season", "status", "week"], name="parlay_season_status_week_idx")]
 
     def __str__(self):
         return f"Parlay {self.team.name} W{self.week}"
 
-    @property
-    def pnl_units(self) -> float:
-        if self.status == "WON":
-            return self.stake_units * (self.decimal_odds - 1.0)
-        if self.status == "LOST":
-            return -self.stake_units
-        return 0.0
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        refresh_generated(self)
     
 class FuturePick(models.Model):
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="futures")
     season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="futures")
     index = models.PositiveSmallIntegerField(help_text="1..3")
     pick_text = models.CharField(max_length=255)
+    # derived on save: the market the slot is (by index) and what pick_text picks in it, e.g. ("SUPER_BOWL", "KC")
+    market = models.CharField(max_length=12, choices=FUTURE_MARKETS, blank=True, editable=False)
+    selection_key = models.CharField(max_length=100, blank=True, editable=False)
     american_odds = models.IntegerField(help_text="e.g., -110, +350")
     stake_units = models.FloatField(default=1.0)
     status = models.CharField(max_length=10, choices=BET_STATUS, default="PENDING")
     settled_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    decimal_odds = models.GeneratedField(expression=decimal_odds_expr(), output_field=models.FloatField(), db_persist=True)
+    pnl_units = models.GeneratedField(expression=pnl_expr(decimal_odds_expr()), output_field=models.FloatField(), db_persist=True)
 
     class Meta:
         unique_together = ("team", "season", "index")   # enforce one set of 3 per team
+        indexes = [
+            # settling a market: every team's pick on one outcome
+            models.Index(fields=["season", "market", "selection_key"], name="future_market_key_idx"),
+        ]
 
     def __str__(self):
         return f"Futures [{self.team.name} {self.season.year}] #{self.index}: {self.pick_text}"
 
+    def set_selection_key(self):
+        """Fill market/selection_key from index and pick_text (bulk_create callers do this themselves)."""
+        self.market = FUTURE_MARKET_BY_INDEX.get(self.index, "")
+        self.selection_key = futures_key(self.market, self.pick_text)
+
+    def save(self, *args, **kwargs):
+        self.set_selection_key()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "market", "selection_key"}
+        super().save(*args, **kwargs)
+        refresh_generated(self)
+
+LEDGER_SOURCE = (
+    ("BET", "Individual Bet"),
+    ("PARLAY", "Team Parlay"),
+    ("FUTURE", "Futures Pick"),
+)
+
+class UnitsLedger(models.Model):
+    """
+    Materialized PnL per (season, team, user, week, source).
+    Maintained by league.ledger whenever a bet, parlay or future changes;
+    standings reads from here instead of aggregating the raw tables.
+    user is NULL for team-level sources (parlays, futures); futures use week 0.
+    """
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="ledger")
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="ledger")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="ledger")
+    user_key = models.PositiveIntegerField(default=0, editable=False)  # user_id, 0 for team rows (no NULLs in the unique key)
+    week = models.PositiveIntegerField()
+    source = models.CharField(max_length=10, choices=LEDGER_SOURCE)
+    units = models.FloatField(default=0.0)       # settled PnL; pending rows contribute 0
+    picks = models.PositiveIntegerField(default=0)  # rows in the group, settled or not
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    pushes = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # one constraint, not a partial one per kind of row, so refreshes can upsert on it
+            models.UniqueConstraint(fields=["season", "team", "user_key", "week", "source"], name="ledger_unique_row"),
+        ]
+        indexes = [models.Index(fields=["season", "week"], name="ledger_season_week_idx")]
+
+    def __str__(self):
+        who = self.user.username if self.user_id else self.team.name
+        return f"{self.source} {who} W{self.week}: {self.units:+.2f}"
+
     @property
-    def decimal_odds(self) -> float:
-        return american_to_decimal(self.american_odds)
+    def settled(self) -> int:
+        return self.wins + self.losses + self.pushes
+
+class Exposure(models.Model):
+    """
+    Pending action per pick for one week: stake, what it pays if it hits and
+    how many team parlays ride on it. Maintained by league.exposure whenever
+    the week's bets or parlays change, so the commissioner's report is a
+    plain read. A pick is a feed selection when the bets are linked to one,
+    otherwise their (normalized) pick text, under the game if known.
+    """
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="exposure")
+    week = models.PositiveIntegerField()
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, null=True, blank=True, related_name="exposure")
+    game_key = models.PositiveIntegerField(default=0, editable=False)  # game_id, 0 for unlinked picks (no NULLs in the unique key)
+    selection = models.ForeignKey(Selection, on_delete=models.CASCADE, null=True, blank=True, related_name="exposure")
+    bet_type = models.CharField(max_length=10, choices=BET_TYPE)
+    pick = models.CharField(max_length=255)
+    bets = models.PositiveIntegerField(default=0)
+    stake_units = models.FloatField(default=0.0)
+    potential_return_units = models.FloatField(default=0.0)  # sum of stake * decimal odds
+    parlay_legs = models.PositiveIntegerField(default=0)       # pending team parlays with a leg on this pick
+    parlay_return_units = models.FloatField(default=0.0)     # what those parlays pay if every leg hits
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["season", "week", "game_key", "bet_type", "pick"], name="exposure_unique_pick"),
+        ]
+        indexes = [models.Index(fields=["season", "week"], name="exposure_season_week_idx")]
+
+    def __str__(self):
+        return f"W{self.week} {self.pick}: {self.stake_units:g}u staked"
 
     @property
-    def pnl_units(self) -> float:
-        if self.status == "WON":
-            return self.stake_units * (self.decimal_odds - 1.0)
-        if self.status == "LOST":
-            return -self.stake_units
-        if self.status == "PUSH":
-            return 0.0
-        return 0.0
+    def liability_units(self) -> float:
+        """What the league's bettors win, net, if this pick hits."""
+        return self.potential_return_units - self.stake_units
+
+class RevealSnapshot(models.Model):
+    """
+    A week's dashboard page (?week=N, every pick incl. pending) frozen for
+    the Sunday 1 PM reveal. Valid only while season.data_version matches;
+    built by league.reveal ahead of time or on first touch.
+    """
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="reveal_snapshots")
+    week = models.PositiveIntegerField()
+    data_version = models.PositiveIntegerField()
+    payload = models.JSONField()
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("season", "week")
+
+    def __str__(self):
+        return f"{self.season} W{self.week} reveal @v{self.data_version}"
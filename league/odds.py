@@ -0,0 +1,243 @@
+# league/odds.py
+"""
+Odds feed ingestion: games, markets and selections for a season's weeks.
+
+A provider returns each week's slate as plain dicts in one normalized shape
+(see SLATE FORMAT below). Fetching is asyncio: the HTTP provider shares one
+pooled httpx client, caps requests with a token bucket and fetches a week's
+games concurrently. Writing happens off the event loop in one transaction per
+run: each game's payload is hashed and only games whose hash changed are
+upserted (bulk_create with update_conflicts), so a refresh that finds nothing
+new is a single SELECT. Pending picks in the changed weeks are then re-linked
+to their game and selection (league.matching).
+
+Runs from `manage.py ingest_odds`, never inside a web request.
+
+SLATE FORMAT (one game):
+    {"id": "2025-w1-KC-LAC", "week": 1, "kickoff": "2025-09-07T20:25:00Z",
+     "home": "LAC", "away": "KC", "status": "SCHEDULED",
+     "home_score": null, "away_score": null,
+     "markets": [{"key": "spread", "type": "SPREAD", "description": "Point spread",
+                  "selections": [{"key": "away", "label": "KC -3.5", "line": -3.5, "odds": -110},
+                                 {"key": "home", "label": "LAC +3.5", "line": 3.5, "odds": -110}]}]}
+Selection keys are "home"/"away" on spreads and "over"/"under" on totals and
+props; league.matching leans on them to link typed picks. Once a game is
+FINAL, a prop market may carry "result" (the stat it settles on).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from . import exposure, matching
+from .ledger import keys_q
+from .models import Bet, Game, Market, Selection
+
+try:
+    import httpx
+except ImportError:  # optional: pip install httpx
+    httpx = None
+
+# ---------- rate limiting ----------
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate, self.burst = rate, burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# ---------- providers ----------
+class ReplayProvider:
+    """Slates from week-<N>.json files in a directory (recorded with --record, or written by hand)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def fetch_week(self, season_year: int, week: int) -> list:
+        name = os.path.join(self.path, f"week-{week}.json")
+        if not os.path.exists(name):
+            return []
+        data = await asyncio.to_thread(_read_json, name)
+        return data["games"] if isinstance(data, dict) else data
+
+class HttpProvider:
+    """
+    A JSON feed speaking the slate format:
+        GET {base_url}/seasons/{year}/weeks/{week}/games   -> [{"id": ...}, ...]
+        GET {base_url}/games/{id}                           -> one game with markets
+    """
+
+    def __init__(self, base_url: str, api_key: str = "", rate: float = 5.0, concurrency: int = 8, timeout: float = 10.0):
+        if httpx is None:
+            raise RuntimeError("The HTTP odds provider needs httpx (pip install httpx).")
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.limiter = RateLimiter(rate, burst=concurrency)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.client = None
+
+    async def __aenter__(self):
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url, headers=headers, timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        return False
+
+    async def _get(self, url: str):
+        for attempt in range(3):
+            await self.limiter.acquire()
+            response = await self.client.get(url)
+            if response.status_code == 429 or response.status_code >= 500:
+                await asyncio.sleep(float(response.headers.get("Retry-After", 2 ** attempt)))
+                continue
+            response.raise_for_status()
+            return response.json()
+        response.raise_for_status()
+
+    async def fetch_week(self, season_year: int, week: int) -> list:
+        listing = await self._get(f"/seasons/{season_year}/weeks/{week}/games")
+        return list(await asyncio.gather(*(self._get(f"/games/{g['id']}") for g in listing)))
+
+def _read_json(name):
+    with open(name, encoding="utf-8") as f:
+        return json.load(f)
+
+def record(path: str, week: int, games: list) -> None:
+    """Save a fetched slate where ReplayProvider will find it."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, f"week-{week}.json"), "w", encoding="utf-8") as f:
+        json.dump({"games": games}, f, indent=1, sort_keys=True)
+
+# ---------- change detection + upserts ----------
+def content_hash(game: dict) -> str:
+    return hashlib.sha1(json.dumps(game, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+@dataclass
+class IngestResult:
+    fetched: int = 0
+    changed: int = 0
+    markets: int = 0
+    selections: int = 0
+    removed: int = 0
+    linked: int = 0
+    weeks: list = field(default_factory=list)
+
+@transaction.atomic
+def upsert_slate(season, games: list) -> IngestResult:
+    """Write every game whose payload hash moved (plus its markets and selections) in a handful of queries."""
+    result = IngestResult(fetched=len(games))
+    hashes = {g["id"]: content_hash(g) for g in games}
+    known = dict(Game.objects.filter(external_id__in=hashes).values_list("external_id", "content_hash"))
+    changed = [g for g in games if known.get(g["id"]) != hashes[g["id"]]]
+    result.changed = len(changed)
+    if not changed:
+        return result
+
+    Game.objects.bulk_create(
+        [
+            Game(
+                season=season, week=g["week"], external_id=g["id"], home=g["home"], away=g["away"],
+                kickoff=parse_datetime(g["kickoff"]), status=g.get("status", "SCHEDULED"),
+                home_score=g.get("home_score"), away_score=g.get("away_score"), content_hash=hashes[g["id"]],
+            )
+            for g in changed
+        ],
+        update_conflicts=True, unique_fields=["external_id"],
+        update_fields=["season", "week", "home", "away", "kickoff", "status", "home_score", "away_score",
+                       "content_hash", "updated_at"],
+    )
+    game_ids = dict(Game.objects.filter(external_id__in=[g["id"] for g in changed]).values_list("external_id", "id"))
+
+    markets = [(game_ids[g["id"]], m) for g in changed for m in g.get("markets", [])]
+    Market.objects.bulk_create(
+        [Market(game_id=gid, key=m["key"], market_type=m["type"], description=m.get("description", ""),
+                result=m.get("result"))
+         for gid, m in markets],
+        update_conflicts=True, unique_fields=["game", "key"],
+        update_fields=["market_type", "description", "result", "updated_at"],
+    )
+    market_keys = {(gid, m["key"]) for gid, m in markets}
+    market_ids = {
+        (gid, key): mid for mid, gid, key in
+        Market.objects.filter(game_id__in=game_ids.values()).values_list("id", "game_id", "key")
+    }
+    selections = [(market_ids[(gid, m["key"])], s) for gid, m in markets for s in m.get("selections", [])]
+    Selection.objects.bulk_create(
+        [Selection(market_id=mid, key=s["key"], label=s["label"], line=s.get("line"), american_odds=s["odds"])
+         for mid, s in selections],
+        update_conflicts=True, unique_fields=["market", "key"],
+        update_fields=["label", "line", "american_odds", "updated_at"],
+    )
+    result.markets, result.selections = len(markets), len(selections)
+
+    # markets and sides the feed no longer lists for a changed game are gone
+    stale_markets = Market.objects.filter(game_id__in=game_ids.values())
+    if market_keys:
+        stale_markets = stale_markets.exclude(keys_q(("game_id", "key"), market_keys))
+    result.removed = stale_markets.delete()[0]
+    stale_selections = Selection.objects.filter(market__game_id__in=game_ids.values())
+    if selections:
+        stale_selections = stale_selections.exclude(keys_q(("market_id", "key"), {(mid, s["key"]) for mid, s in selections}))
+    result.removed += stale_selections.delete()[0]
+    result.linked = link_bets(season, {g["week"] for g in changed})
+    return result
+
+def link_bets(season, weeks) -> int:
+    """Re-map the weeks' pending picks onto the games and selections now on file. Returns bets changed."""
+    bets = Bet.objects.filter(season=season, week__in=weeks, status="PENDING").only(
+        "season", "week", "bet_type", "pick_text", "line", "over_under", "game", "selection",
+    )
+    changed = matching.link(Selection, bets)
+    if not changed:
+        return 0
+    moved = Q(id__in=[b.id for b in changed])
+    before = exposure.picks(moved)  # still the stored game/selection
+    Bet.objects.bulk_update(changed, ["game", "selection"], batch_size=500)  # no signals: PnL is untouched
+    exposure.refresh(before | exposure.picks(moved))
+    return len(changed)
+
+# ---------- the pipeline ----------
+async def ingest(season, provider, weeks, record_to=None) -> IngestResult:
+    """Fetch the weeks concurrently through provider, then upsert them in one transaction."""
+    async with provider:
+        slates = await asyncio.gather(*(provider.fetch_week(season.year, w) for w in weeks))
+    games = []
+    for week, slate in zip(weeks, slates):
+        if record_to and slate:
+            await asyncio.to_thread(record, record_to, week, slate)
+        games += slate
+    result = await sync_to_async(upsert_slate, thread_sensitive=True)(season, games)
+    result.weeks = list(weeks)
+    return result
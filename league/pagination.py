@@ -0,0 +1,78 @@
+# league/pagination.py
+"""
+Keyset (cursor) pagination over a fixed ascending ordering.
+
+The cursor is the last row's ordering values, url-safe base64 encoded. The
+next page is "rows strictly after that tuple", so paging deep into a season
+never re-reads the rows before it the way OFFSET does.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Q
+
+def _value(obj, path: str):
+    for part in path.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+def encode_cursor(obj, fields) -> str:
+    raw = json.dumps([_value(obj, f) for f in fields], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _field(model, path: str):
+    for part in path.split("__"):
+        field = model._meta.get_field(part)
+        model = field.related_model
+    return field
+
+def _valid(field, value) -> bool:
+    """Whether a cursor value can be compared against field (a hand-edited cursor mustn't reach the ORM)."""
+    if value is None:
+        return False
+    if isinstance(field, (models.CharField, models.TextField)):
+        return isinstance(value, str)
+    if isinstance(field, models.IntegerField):
+        return isinstance(value, int) and not isinstance(value, bool)
+    try:
+        field.to_python(value)
+    except ValidationError:
+        return False
+    return True
+
+def decode_cursor(token: str, fields, model=None):
+    """Ordering values from a cursor, or None if it is missing or malformed (or, given model, of the wrong types)."""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    if model is not None and not all(_valid(_field(model, f), v) for f, v in zip(fields, values)):
+        return None
+    return values
+
+def after_q(fields, values) -> Q:
+    """(f1, f2, ...) > (v1, v2, ...), spelled out as ORed equal-prefix comparisons."""
+    q = Q()
+    for i, field in enumerate(fields):
+        prefix = {fields[j]: values[j] for j in range(i)}
+        q |= Q(**prefix, **{f"{field}__gt": values[i]})
+    return q
+
+def keyset_page(qs, fields, token: str, size: int):
+    """
+    One page of qs ordered by fields (the last one must be unique, e.g. "id").
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    qs = qs.order_by(*fields)
+    values = decode_cursor(token, fields, qs.model)
+    if values is not None:
+        qs = qs.filter(after_q(fields, values))
+    rows = list(qs[: size + 1])
+    next_cursor = encode_cursor(rows[size - 1], fields) if len(rows) > size else None
+    return rows[:size], next_cursor
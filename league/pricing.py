@@ -0,0 +1,67 @@
+# league/pricing.py
+"""
+The one place odds math lives.
+
+- scalar helpers for single prices (forms, parlay repricing, unsaved rows)
+- the SQL expressions behind the generated decimal_odds / pnl_units columns
+
+Odds strictly between -100 and +100 are not valid American odds.
+american_to_decimal raises on them; safe_decimal_odds and the SQL versions
+price them at 1.0 (no profit), so one bad row can't break an aggregate.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, When, F, Value, FloatField
+
+# ---------- scalars ----------
+def american_to_decimal(american_odds: int) -> float:
+    # +150 -> 2.50 ; -120 -> 1.8333
+    if american_odds >= 100:
+        return 1 + (american_odds / 100.0)
+    elif american_odds <= -100:
+        return 1 + (100.0 / abs(american_odds))
+    else:
+        raise ValueError("American odds must be >= +100 or <= -100")
+
+def safe_decimal_odds(american_odds: int) -> float:
+    """Decimal odds as the generated columns price them: invalid odds are 1.0 rather than an error."""
+    try:
+        return american_to_decimal(american_odds)
+    except ValueError:
+        return 1.0
+
+def parlay_decimal_odds(odds) -> float:
+    """
+    Booked parlay price: product of every leg's decimal odds, multiplied
+    exactly (Decimal) and rounded to 4dp. Missing or invalid legs count as 1.
+    """
+    total = Decimal("1")
+    for o in odds:
+        try:
+            o = int(o)
+        except (TypeError, ValueError):
+            continue
+        if o >= 100:
+            total *= Decimal("1") + Decimal(o) / Decimal("100")
+        elif o <= -100:
+            total *= Decimal("1") + Decimal("100") / Decimal(-o)
+    return float(round(total, 4))
+
+# ---------- database expressions ----------
+def decimal_odds_expr(field: str = "american_odds"):
+    """SQL decimal odds from an American odds column; invalid odds price at 1.0."""
+    return Case(
+        When(**{f"{field}__gte": 100}, then=Value(1.0) + F(field) / Value(100.0)),
+        When(**{f"{field}__lte": -100}, then=Value(1.0) + Value(100.0) / (F(field) * Value(-1.0))),
+        default=Value(1.0),
+        output_field=FloatField(),
+    )
+
+def pnl_expr(decimal_odds):
+    """SQL PnL from a status/stake_units row and a decimal odds expression."""
+    return Case(
+        When(status="WON", then=F("stake_units") * (decimal_odds - Value(1.0))),
+        When(status="LOST", then=F("stake_units") * Value(-1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
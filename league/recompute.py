@@ -0,0 +1,135 @@
+# league/recompute.py
+"""
+Coalesced parlay/ledger recomputes.
+
+Bet signals mark their (team, season, week) dirty instead of recomputing on
+the spot. Dirty keys are flushed once, after commit, through the set-based
+recompute_team_parlays(), so a request that saves three legs of the same
+parlay recomputes it exactly once.
+
+    with defer_recomputes():              # scripts, bulk imports
+        for row in rows:
+            Bet.objects.create(...)       # no per-row recompute
+    # flushed here (or on commit, if still inside a transaction)
+
+Inside a transaction the keys are queued on a batch bound to the on_commit
+callback of the current savepoint: Django drops that callback when the
+savepoint or the transaction rolls back, and the keys go with it, so a
+rolled-back write never leaves keys behind for a later flush. (A key
+marked at two savepoint levels is recomputed twice; that is idempotent.) Under
+autocommit there is nothing to roll back; the keys wait for the end of the
+enclosing defer_recomputes() block, or flush straight away.
+
+RecomputeCoalescingMiddleware wraps every request in defer_recomputes().
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from . import exposure, ledger
+from .cache import bump_season_version
+from .sevices import recompute_team_parlays
+
+_state = threading.local()
+
+class _Batch:
+    """A set of dirty keys; calling it recomputes them (it is the on_commit callback)."""
+
+    def __init__(self):
+        self.parlays = set()  # (team_id, season_id, week)
+        self.bets = set()     # (season_id, team_id, user_id, week) ledger keys
+
+    def __bool__(self):
+        return bool(self.parlays or self.bets)
+
+    def add(self, bet) -> None:
+        self.parlays.add((bet.team_id, bet.season_id, bet.week))
+        self.bets.add((bet.season_id, bet.team_id, bet.user_id, bet.week))
+
+    def drop(self, other) -> None:
+        self.parlays -= other.parlays
+        self.bets -= other.bets
+
+    def clear(self) -> None:
+        self.parlays, self.bets = set(), set()
+
+    def __call__(self) -> None:
+        if not self:
+            return
+        parlays, bets = self.parlays, self.bets
+        self.clear()
+        with transaction.atomic():
+            recompute_team_parlays(parlays)
+            ledger.refresh_bets(bets)
+            # a saved or deleted bet may have left a pick this can't name: take its whole week
+            exposure.refresh(exposure.week_picks({(season_id, week) for _, season_id, week in parlays}))
+            # a saved or deleted bet may be settled; bump each touched season once
+            for season_id in {season_id for _, season_id, _ in parlays}:
+                bump_season_version(season_id)
+
+def _scope():
+    if not hasattr(_state, "depth"):
+        _state.depth = 0
+        _state.keys = _Batch()    # marked under autocommit inside the scope
+        _state.marked = _Batch()  # everything marked inside the scope
+        _state.batches = []       # on_commit batches the scope queued keys on
+    return _state
+
+def _batch() -> _Batch:
+    """The batch bound to the current savepoint, registering one on first use."""
+    conn = transaction.get_connection()
+    current = set(conn.savepoint_ids)
+    for sids, func, _ in reversed(conn.run_on_commit):
+        # usable if it goes away exactly when the current savepoint does: any
+        # ids it holds beyond the current ones belong to released savepoints
+        if isinstance(func, _Batch) and current <= sids:
+            return func
+    batch = _Batch()
+    transaction.on_commit(batch)
+    return batch
+
+def mark_bet_dirty(bet) -> None:
+    """Record that a Bet changed; its parlay and ledger row are recomputed on commit or at scope exit."""
+    st = _scope()
+    if st.depth:
+        st.marked.add(bet)
+    if transaction.get_connection().in_atomic_block:
+        batch = _batch()
+        if st.depth and batch not in st.batches:
+            st.batches.append(batch)
+        batch.add(bet)
+    elif st.depth:
+        st.keys.add(bet)  # the enclosing defer_recomputes() flushes
+    else:
+        batch = _Batch()
+        batch.add(bet)
+        batch()
+
+@contextmanager
+def defer_recomputes(flush_on_exit: bool = True):
+    """
+    Collect dirty keys for the duration of the block and recompute them once at
+    the end (after commit, if a transaction is still open). With
+    flush_on_exit=False the keys are dropped, for callers that rebuild
+    parlays and the ledger themselves afterwards.
+
+    The queue never outlives the outermost block. If the block raises, keys
+    from writes that already committed (autocommit) are still recomputed and
+    those queued inside a transaction follow it: dropped with a rollback,
+    flushed if the caller commits anyway.
+    """
+    st = _scope()
+    st.depth += 1
+    try:
+        yield
+    finally:
+        st.depth -= 1
+        if not st.depth:
+            keys, marked, batches = st.keys, st.marked, st.batches
+            st.keys, st.marked, st.batches = _Batch(), _Batch(), []
+            if not flush_on_exit:
+                for batch in batches:
+                    batch.drop(marked)
+            else:
+                keys()
@@ -0,0 +1,74 @@
+# league/replica.py
+"""
+Read-replica routing for the read-only league pages.
+
+Views marked @read_only_view send their reads to the replica alias
+(DATABASE_REPLICA_URL); everything else, and every write, uses default.
+After any successful write request (a pick, futures, an admin action) the
+browser gets a short-lived cookie that keeps its reads on the primary, so a
+user never sees a replica that hasn't caught up with their own change.
+Without a replica configured the marker is a no-op.
+"""
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+_state = threading.local()
+
+STICKY_COOKIE = "league_primary"
+
+def _alias():
+    return getattr(settings, "REPLICA_DB_ALIAS", "replica")
+
+def _sticky_seconds():
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 15)
+
+def replica_enabled() -> bool:
+    alias = _alias()
+    return alias is not None and alias in connections.databases
+
+def read_only_view(view):
+    """Route the view's reads (validators and payload builds included) to the replica."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not replica_enabled() or STICKY_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        previous = getattr(_state, "alias", None)
+        _state.alias = _alias()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.alias = previous
+    return wrapped
+
+class ReplicaRouter:
+    """Reads inside a read_only_view go to the replica; all writes and migrations to default."""
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, "alias", None)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # same data on both aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"  # the replica gets its schema through replication
+
+class StickyPrimaryMiddleware:
+    """Pin a browser's reads to the primary for a few seconds after it changed something."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_enabled() and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, "1", max_age=_sticky_seconds(), httponly=True, samesite="Lax",
+                secure=request.is_secure(),
+            )
+        return response
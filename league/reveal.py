@@ -0,0 +1,123 @@
+# league/reveal.py
+"""
+Reveal times and pre-built reveal snapshots.
+
+Pending picks for week N become public at Sunday 1:00 PM ET, and that is
+when everyone opens the dashboard for week N. The snapshot is that page's
+payload (every pick of the week, pending included) frozen into a
+RevealSnapshot row shortly before reveal by `manage.py build_reveal_snapshots`
+(run from cron), or by the first request after reveal if the job hasn't.
+It is served only while the season's data_version is the one it was built
+at; the first settlement or edit after that falls back to the live query.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import cache as league_cache
+from .models import RevealSnapshot
+
+ET = ZoneInfo("America/New_York")
+SNAPSHOT_LEAD = timedelta(minutes=15)   # how early the scheduled job freezes a week
+SNAPSHOT_HOLD = timedelta(hours=6)      # how long after reveal it keeps it current
+
+def week_reveal_dt(season, week: int, hour: int = 13, minute: int = 0):
+    """
+    Reveal time for a given NFL week = Sunday 1:00pm ET.
+    We anchor to the first Sunday on/after season.start_date, then add N-1 weeks.
+    """
+    base_date = season.start_date
+    # Move to Sunday (weekday: Mon=0 ... Sun=6)
+    sunday = base_date + timedelta(days=(6 - base_date.weekday()) % 7)
+    return datetime.combine(sunday, time(hour, minute), tzinfo=ET) + timedelta(weeks=week - 1)
+
+def revealed_through(season, now=None, weeks=range(1, 19)) -> int:
+    """The last week whose picks are public (0 before week 1's reveal)."""
+    if not season.start_date:
+        return 0
+    now = now or timezone.now()
+    return max((w for w in weeks if week_reveal_dt(season, w) <= now), default=0)
+
+def picks_public(season, week: int, now=None) -> bool:
+    """
+    Whether a change to the week's pending picks can reach a cached page: the
+    week is revealed, or close enough that its snapshot may be frozen already.
+    """
+    if not season.start_date:
+        return True
+    return (now or timezone.now()) >= week_reveal_dt(season, week) - SNAPSHOT_LEAD
+
+def futures_reveal_dt(season_year: int):
+    # Sep 4, 8:00 PM in America/New_York for the given season year
+    return datetime(season_year, 9, 4, 20, 0, tzinfo=ET)
+
+def snapshot_parts(week: int):
+    """
+    Dashboard cache parts of the page a snapshot stands in for: ?week=N, no
+    other filters, first page, while N is the latest revealed week.
+    """
+    return league_cache.dashboard_cache_parts(str(week), reveal_is_open=True, revealed=week)
+
+def _plain(payload) -> dict:
+    """A dashboard payload as JSON-able dicts (the template reads them like the model rows)."""
+    return {
+        "bets": [
+            {
+                "week": b.week, "user": {"username": b.user.username}, "team": {"name": b.team.name},
+                "bet_type": b.bet_type, "pick_text": b.pick_text, "line": b.line,
+                "american_odds": b.american_odds, "parlay_selected": b.parlay_selected,
+                "status": b.status, "pnl_units": b.pnl_units,
+            }
+            for b in payload["bets"]
+        ],
+        "next_cursor": payload["next_cursor"],
+        "parlays": [
+            {"week": p.week, "team": {"name": p.team.name}, "decimal_odds": p.decimal_odds,
+             "status": p.status, "pnl_units": p.pnl_units}
+            for p in payload["parlays"]
+        ],
+        "filter_weeks": payload["filter_weeks"],
+        "filter_users": payload["filter_users"],
+        "filter_teams": [{"id": t.id, "name": t.name} for t in payload["filter_teams"]],
+    }
+
+def _frozen(season, week: int):
+    """(data_version, plain payload) for the week's reveal page."""
+    from .views import dashboard_payload  # views import this module
+
+    version = season.data_version  # read before the rows, so the snapshot is never older than its label
+    return version, _plain(dashboard_payload(season, *snapshot_parts(week)))
+
+def build_snapshot(season, week: int) -> RevealSnapshot:
+    """Freeze the week's reveal page at the season's current data_version."""
+    version, payload = _frozen(season, week)
+    snapshot, _ = RevealSnapshot.objects.update_or_create(
+        season=season, week=week, defaults={"data_version": version, "payload": payload},
+    )
+    return snapshot
+
+def snapshot_payload(season, week: int) -> dict:
+    """The week's snapshot if it is current, else build it now (first touch after reveal)."""
+    payload = (
+        RevealSnapshot.objects.filter(season=season, week=week, data_version=season.data_version)
+        .values_list("payload", flat=True).first()
+    )
+    if payload is None:
+        version, payload = _frozen(season, week)
+        try:
+            with transaction.atomic():
+                RevealSnapshot.objects.update_or_create(
+                    season=season, week=week, defaults={"data_version": version, "payload": payload},
+                )
+        except DatabaseError:
+            pass  # a concurrent first touch is saving the same rows; this request still has its page
+    return payload
+
+def due_weeks(season, now=None, lead=SNAPSHOT_LEAD, hold=SNAPSHOT_HOLD, weeks=range(1, 19)):
+    """Weeks whose reveal is between `lead` from now and `hold` ago: the ones about to be (or being) hammered."""
+    if not season.start_date:
+        return []
+    now = now or timezone.now()
+    return [w for w in weeks if week_reveal_dt(season, w) - lead <= now < week_reveal_dt(season, w) + hold]
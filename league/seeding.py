@@ -0,0 +1,176 @@
+# league/seeding.py
+"""
+Synthetic leagues for local load testing and the benchmark suite.
+
+seed_league() writes seasons, teams, memberships, 18 weeks of picks, team
+parlays and futures with bulk inserts, then derives parlays and the ledger
+once per season through the same set-based services the app uses. The
+generator is driven by a seeded random.Random, so the same arguments always
+produce the same league.
+"""
+import random
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Season, Team, TeamMembership, Bet, FuturePick
+from .recompute import defer_recomputes
+from .sevices import recompute_team_parlays
+from . import exposure, ledger
+
+NFL = [
+    "ARI", "ATL", "BAL", "BUF", "CAR", "CHI", "CIN", "CLE", "DAL", "DEN", "DET",
+    "GB", "HOU", "IND", "JAX", "KC", "LAC", "LAR", "LV", "MIA", "MIN", "NE",
+    "NO", "NYG", "NYJ", "PHI", "PIT", "SEA", "SF", "TB", "TEN", "WAS",
+]
+MVP_CANDIDATES = ["Patrick Mahomes", "Josh Allen", "Lamar Jackson", "Joe Burrow", "Jalen Hurts", "Jared Goff", "Jordan Love"]
+PROPS = ["passing yards", "rushing yards", "receiving yards", "receptions", "TDs"]
+
+# settled outcome mix for weekly picks: roughly what a -110 bettor sees
+STATUS_WEIGHTS = {"WON": 0.47, "LOST": 0.49, "PUSH": 0.04}
+BATCH_SIZE = 2000
+
+def _american(rng, lo: int, hi: int, step: int = 5) -> int:
+    """Random american odds in [lo, hi], never in the invalid (-100, +100) gap."""
+    odds = rng.randrange(lo, hi + 1, step)
+    if -100 < odds < 100:
+        odds = 100 if odds >= 0 else -105
+    return odds
+
+def _half(rng, lo: float, hi: float) -> float:
+    """Random x.5 line in [lo, hi]."""
+    return rng.randint(int(lo), int(hi)) + 0.5
+
+def _status(rng, weights=STATUS_WEIGHTS) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def _pick(rng, bet_type: str):
+    """(pick_text, line, american_odds, over_under) for one bet type."""
+    home, away = rng.sample(NFL, 2)
+    if bet_type == "SPREAD":
+        line = _half(rng, -14, 13) * rng.choice((1, -1))
+        return f"{home} {line:+g} vs {away}", line, rng.choice((-105, -110, -110, -110, -115, -120, 100)), None
+    ou = rng.choice(("OVER", "UNDER"))
+    if bet_type == "TOTAL":
+        line = _half(rng, 37, 54)
+        return f"{away} @ {home} {ou.lower()} {line:g}", line, rng.choice((-105, -110, -110, -115, -120)), ou
+    line = _half(rng, 0, 120)
+    prop = rng.choice(PROPS)
+    return f"{home} WR{rng.randint(1, 3)} {ou.lower()} {line:g} {prop}", line, _american(rng, -200, 250), ou
+
+def _futures(rng, team, season, settled: bool, n_teams: int):
+    """The three futures slots (Super Bowl, MVP, team win total)."""
+    sb_won = settled and rng.random() < 1.0 / max(n_teams, 1)
+    mvp_won = settled and rng.random() < 0.05
+    ou_status = _status(rng, {"WON": 0.5, "LOST": 0.45, "PUSH": 0.05}) if settled else "PENDING"
+    slots = [
+        (f"{rng.choice(NFL)} to win Super Bowl", _american(rng, 400, 5000, 50), "WON" if sb_won else "LOST"),
+        (f"{rng.choice(MVP_CANDIDATES)} MVP", _american(rng, 500, 3000, 50), "WON" if mvp_won else "LOST"),
+        (f"{rng.choice(NFL)} {rng.choice(('over', 'under'))} {_half(rng, 5, 11):g} wins",
+         rng.choice((-130, -120, -110, 100, 110)), ou_status),
+    ]
+    picks = [
+        FuturePick(team=team, season=season, index=i, pick_text=text, american_odds=odds,
+                   status=status if settled else "PENDING")
+        for i, (text, odds, status) in enumerate(slots, start=1)
+    ]
+    for pick in picks:
+        pick.set_selection_key()  # bulk_create skips save()
+    return picks
+
+def seed_users(count: int, prefix: str = "seed"):
+    """Get or bulk-create count users named <prefix>_user0001..; they cannot log in with a password."""
+    names = [f"{prefix}_user{i:04d}" for i in range(1, count + 1)]
+    existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+    password = make_password(None)  # unusable
+    User.objects.bulk_create(
+        [User(username=n, password=password) for n in names if n not in existing],
+        batch_size=BATCH_SIZE,
+    )
+    by_name = User.objects.in_bulk(names, field_name="username")
+    return [by_name[n] for n in names]
+
+@transaction.atomic
+def seed_season(year: int, users, teams: int, weeks: int = 18, pending_weeks: int = 1,
+                rng=None, prefix: str = "seed") -> Season:
+    """
+    One season: users are shuffled round-robin onto teams; every user makes
+    three picks a week (one usually flagged for the team parlay). The last
+    pending_weeks weeks stay PENDING, and futures settle only when none do.
+    """
+    rng = rng or random.Random(year)
+    season = Season.objects.create(year=year, start_date=date(year, 9, 4), end_date=date(year, 9, 4) + timedelta(weeks=weeks))
+    team_objs = Team.objects.bulk_create([
+        Team(season=season, name=f"{prefix.title()} {NFL[i % len(NFL)]} {i // len(NFL) + 1}")
+        for i in range(teams)
+    ])
+    roster = list(users)
+    rng.shuffle(roster)
+    team_of = {u.id: team_objs[i % teams] for i, u in enumerate(roster)}
+    TeamMembership.objects.bulk_create(
+        [TeamMembership(user=u, team=team_of[u.id]) for u in roster], batch_size=BATCH_SIZE,
+    )
+
+    bets = []
+    for week in range(1, weeks + 1):
+        settled = week <= weeks - pending_weeks
+        placed = timezone.make_aware(datetime.combine(season.start_date + timedelta(weeks=week - 1), time(12)))
+        for user in roster:
+            parlay_leg = rng.choice(("SPREAD", "TOTAL", "PROP")) if rng.random() < 0.85 else None
+            for bet_type in ("SPREAD", "TOTAL", "PROP"):
+                text, line, odds, ou = _pick(rng, bet_type)
+                status = _status(rng) if settled else "PENDING"
+                bets.append(Bet(
+                    user=user, team=team_of[user.id], season=season, week=week,
+                    bet_type=bet_type, pick_text=text, line=line, american_odds=odds,
+                    over_under=ou, parlay_selected=(bet_type == parlay_leg), status=status,
+                    created_at=placed - timedelta(minutes=rng.randint(0, 3 * 24 * 60)),
+                    settled_at=placed + timedelta(days=4) if settled else None,
+                ))
+    futures = [
+        fp for team in team_objs
+        for fp in _futures(rng, team, season, settled=pending_weeks == 0, n_teams=teams)
+    ]
+
+    # bulk_create skips the model signals; parlays and the ledger are derived once below
+    with defer_recomputes(flush_on_exit=False):
+        Bet.objects.bulk_create(bets, batch_size=BATCH_SIZE)
+        FuturePick.objects.bulk_create(futures, batch_size=BATCH_SIZE)
+    for week in range(1, weeks + 1):  # one week per call keeps the key filter short
+        recompute_team_parlays({(t.id, season.id, week) for t in team_objs})
+    ledger.rebuild_season(season)
+    exposure.rebuild_season(season)
+    season.refresh_from_db()
+    return season
+
+def delete_seasons(years) -> int:
+    """Delete seasons (and everything under them) without queueing a recompute per bet."""
+    with defer_recomputes(flush_on_exit=False):
+        n, _ = Season.objects.filter(year__in=list(years)).delete()
+    return n
+
+def seed_league(seasons: int = 1, teams: int = 8, users: int = 32, weeks: int = 18,
+                start_year: int = 2025, pending_weeks: int = 1, seed: int = 42,
+                prefix: str = "seed", replace: bool = False):
+    """
+    seasons consecutive seasons from start_year, each with the same users
+    reshuffled onto teams. Only the latest season keeps pending weeks.
+    Returns the Season objects.
+    """
+    years = list(range(start_year, start_year + seasons))
+    taken = list(Season.objects.filter(year__in=years).values_list("year", flat=True))
+    if taken and not replace:
+        raise ValueError(f"Season(s) {', '.join(map(str, sorted(taken)))} already exist.")
+    delete_seasons(taken)
+
+    rng = random.Random(seed)
+    people = seed_users(users, prefix=prefix)
+    return [
+        seed_season(year, people, teams, weeks=weeks,
+                    pending_weeks=pending_weeks if year == years[-1] else 0,
+                    rng=rng, prefix=prefix)
+        for year in years
+    ]
@@ -0,0 +1,132 @@
+# league/settlement.py
+"""
+Settling bets from final scores.
+
+Scores reach Game rows either through the odds feed (ingest_odds writes
+status, scores and prop results as they come) or from a local JSON/CSV file
+via apply_scores(). settle() then grades every PENDING bet it is given
+whose game is FINAL, in Python from one joined read, and writes
+the lot through settle_bet_outcomes: one UPDATE, one parlay recompute, one
+ledger refresh, all in one transaction.
+
+Grading, against the bet's own line (the number it was booked at):
+    SPREAD  picked side's score + line vs the other side's (needs the selection, for the side)
+    TOTAL   home + away vs line, by over_under (the game is enough)
+    PROP    the market's result vs line, by over_under (needs the selection, for the market,
+            and only if the pick names its player or was booked at its line)
+Anything that can't be graded (unlinked pick, a prop linked to another
+player's market, no result yet) stays PENDING for the admin actions.
+
+Scores file, JSON ({"games": [...]} or a bare list) or CSV with a header:
+    {"id": "2025-w1-KC-LAC", "home_score": 27, "away_score": 24,
+     "props": {"prop-mahomes-pass-yds": 281}}
+    id,home_score,away_score,market,result      (a row may carry a score, a prop result, or both)
+"""
+import csv
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .matching import same_prop
+from .models import Game, Market
+from .sevices import settle_bet_outcomes
+
+def grade(bet_type: str, line: float, over_under, side, home: int, away: int, result) -> str:
+    """WON / LOST / PUSH for one bet, or None when it can't be graded."""
+    if bet_type == "SPREAD":
+        if side not in ("home", "away"):
+            return None
+        mine, theirs = (home, away) if side == "home" else (away, home)
+        margin = mine + line - theirs
+    else:
+        value = home + away if bet_type == "TOTAL" else result
+        if value is None or over_under not in ("OVER", "UNDER"):
+            return None
+        margin = value - line if over_under == "OVER" else line - value
+    return "WON" if margin > 0 else "LOST" if margin < 0 else "PUSH"
+
+@dataclass
+class SettleResult:
+    settled: Counter = field(default_factory=Counter)
+    skipped: int = 0  # pending on a final game, but not gradeable
+
+    @property
+    def total(self) -> int:
+        return sum(self.settled.values())
+
+def outcomes(bets) -> tuple:
+    """({bet_id: status}, skipped) for the pending bets (a Bet queryset) on final games."""
+    rows = (
+        bets.filter(
+            status="PENDING",
+            game__status="FINAL", game__home_score__isnull=False, game__away_score__isnull=False,
+        )
+        .values_list("id", "bet_type", "line", "over_under", "selection__key",
+                     "game__home_score", "game__away_score", "selection__market__result",
+                     "pick_text", "selection__label", "selection__line")
+    )
+    graded, skipped = {}, 0
+    for bet_id, bet_type, line, over_under, side, home, away, result, text, label, selection_line in rows:
+        if bet_type == "PROP" and label is not None and not same_prop(text, label, selection_line, line):
+            result = None  # linked to a different prop: leave it for an admin
+        status = grade(bet_type, line, over_under, side, home, away, result)
+        if status:
+            graded[bet_id] = status
+        else:
+            skipped += 1
+    return graded, skipped
+
+@transaction.atomic
+def settle(bets, dry_run=False) -> SettleResult:
+    """Grade and settle a Bet queryset, e.g. a season's weeks or the bets on some games."""
+    graded, skipped = outcomes(bets)
+    result = SettleResult(settled=Counter(graded.values()), skipped=skipped)
+    if not dry_run:
+        settle_bet_outcomes(graded)
+    return result
+
+# ---------- scores files ----------
+def read_scores(path: str) -> list:
+    """Rows from a JSON or CSV scores file, as dicts in the JSON shape."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if not path.lower().endswith(".csv"):
+            data = json.load(f)
+            return data["games"] if isinstance(data, dict) else data
+        games = {}
+        for row in csv.DictReader(f):
+            game = games.setdefault(row["id"], {"id": row["id"], "props": {}})
+            if row.get("home_score") not in (None, ""):
+                game["home_score"], game["away_score"] = int(row["home_score"]), int(row["away_score"])
+            if row.get("market"):
+                game["props"][row["market"]] = float(row["result"])
+        return list(games.values())
+
+@transaction.atomic
+def apply_scores(season, rows) -> tuple:
+    """Mark the rows' games FINAL with their scores and set prop results. Returns (games, props, unknown ids)."""
+    games = {g.external_id: g for g in Game.objects.filter(season=season, external_id__in=[r["id"] for r in rows])}
+    final, props = [], []
+    for row in rows:
+        game = games.get(row["id"])
+        if game is None:
+            continue
+        if row.get("home_score") is not None:
+            game.home_score, game.away_score, game.status = row["home_score"], row["away_score"], "FINAL"
+            final.append(game)
+        props += [(game.id, key, value) for key, value in (row.get("props") or {}).items()]
+    Game.objects.bulk_update(final, ["home_score", "away_score", "status"])
+
+    markets = {
+        (m.game_id, m.key): m
+        for m in Market.objects.filter(game_id__in={g for g, _, _ in props}, key__in={k for _, k, _ in props})
+    }
+    updated = []
+    for game_id, key, value in props:
+        market = markets.get((game_id, key))
+        if market is not None:
+            market.result = value
+            updated.append(market)
+    Market.objects.bulk_update(updated, ["result"])
+    return len(final), len(updated), sorted({r["id"] for r in rows} - set(games))
@@ -1,53 +1,253 @@
-from functools import reduce
-from operator import mul
-from .models import Bet, TeamParlay, Team, Season
-from decimal import Decimal
+from collections import defaultdict
+from .models import Bet, TeamParlay, Team, Selection, FuturePick, bets_for
 from django.db import transaction
+from django.db.models import Case, When, Value, Count, Q
+from django.utils import timezone
+from . import exposure, ledger, matching
+from .cache import bump_season_version
+from .pricing import parlay_decimal_odds
+from .reveal import picks_public
 
-def american_to_decimal(odds: int) -> Decimal:
-    if odds is None:
-        return Decimal("1")
-    return Decimal("1") + (Decimal(odds) / Decimal("100")) if odds >= 100 \
-           else Decimal("1") + (Decimal("100") / Decimal(abs(odds)))
+def parlay_price_and_status(legs):
+    """
+    legs: iterable of (american_odds, status) for the parlay-selected bets.
+    Returns (booked decimal odds rounded to 4dp, parlay status).
+    """
+    legs = list(legs)
+
+    # (A) BOOKED price: product of ALL legs’ quoted prices (sportsbook-style),
+    #     regardless of status. This is what we ALWAYS show.
+    dec_all = parlay_decimal_odds(odds for odds, _ in legs)
+
+    # (B) Status logic (unchanged semantics)
+    statuses = [status for _, status in legs]
+    if not legs:
+        status = "PENDING"
+    elif "LOST" in statuses:
+        status = "LOST"
+    elif "PENDING" in statuses:
+        status = "PENDING"
+    elif all(s == "PUSH" for s in statuses):
+        status = "PUSH"
+    else:
+        # no lost, no pending, and not all push -> at least one WON (others may be PUSH)
+        status = "WON"
+
+    return dec_all, status
+
+@transaction.atomic(savepoint=False)
+def recompute_team_parlays(keys) -> int:
+    """
+    Set-based recompute for many (team_id, season_id, week) groups at once:
+    one query for every leg, one upsert for every parlay, then the ledger
+    refresh, regardless of how many groups are touched. Returns groups written.
+    Doesn't bump the seasons' cache version; that's up to the caller.
+    """
+    keys = set(keys)
+    # keys can outlive their team (a season/team delete cascades to bets, whose
+    # signals queue recomputes); don't resurrect parlays for those
+    # nor touch archived seasons, whose legs are no longer in Bet
+    live = set(
+        Team.objects.filter(id__in={k[0] for k in keys}, season__archived_at__isnull=True)
+        .values_list("id", flat=True)
+    )
+    keys = {k for k in keys if k[0] in live}
+    if not keys:
+        return 0
+
+    legs = defaultdict(list)
+    rows = (
+        Bet.objects.filter(ledger.keys_q(("team_id", "season_id", "week"), keys), parlay_selected=True)
+        .values_list("team_id", "season_id", "week", "american_odds", "status")
+    )
+    for team_id, season_id, week, odds, status in rows:
+        legs[(team_id, season_id, week)].append((odds, status))
+
+    now = timezone.now()
+    parlays = []
+    for team_id, season_id, week in keys:
+        dec, status = parlay_price_and_status(legs.get((team_id, season_id, week), []))
+        parlays.append(TeamParlay(
+            team_id=team_id, season_id=season_id, week=week,
+            decimal_odds=dec, status=status, updated_at=now,
+        ))
+    # stake_units is left alone on existing rows, as get_or_create + save did
+    TeamParlay.objects.bulk_create(
+        parlays, update_conflicts=True,
+        unique_fields=["team", "season", "week"],
+        update_fields=["decimal_odds", "status", "updated_at"],
+    )
+
+    # bulk_create skips post_save, so keep the ledger in step here; callers bump
+    # the cache version once per operation, and only when something shown changed
+    ledger.refresh_parlays({(season_id, team_id, week) for team_id, season_id, week in keys})
+    return len(parlays)
 
 @transaction.atomic
-def recompute_team_parlay(team, season_year: int, week: int) -> TeamParlay:
-    season = team.season if getattr(team, "season_id", None) else Season.objects.get(year=season_year)
+def settle_bets(queryset, status: str) -> int:
+    """
+    Set status on a Bet queryset and reprice every affected TeamParlay in a
+    constant number of queries. Returns the number of bets updated.
+    """
+    keys = list(queryset.values_list("season_id", "team_id", "user_id", "week").distinct())  # BEFORE update()
+    n = queryset.update(status=status, settled_at=None if status == "PENDING" else timezone.now())
 
-    legs = list(Bet.objects.filter(
-        team=team, season=season, week=week, parlay_selected=True
-    ).select_related("team", "season"))
+    recompute_team_parlays({(team_id, season_id, week) for season_id, team_id, _, week in keys})
+    ledger.refresh_bets(keys)
+    exposure.refresh(exposure.team_picks({(season_id, team_id, week) for season_id, team_id, _, week in keys}))
+    for season_id in {k[0] for k in keys}:
+        bump_season_version(season_id)
+    return n
 
-    parlay, _ = TeamParlay.objects.get_or_create(team=team, season=season, week=week)
+@transaction.atomic
+def settle_bet_outcomes(outcomes: dict) -> int:
+    """
+    Settle many bets to their own statuses ({bet_id: "WON" | "LOST" | "PUSH"})
+    in one UPDATE, then reprice the affected parlays and refresh the ledger
+    once. Returns the number of bets updated.
+    """
+    if not outcomes:
+        return 0
+    ids = defaultdict(list)
+    for bet_id, status in outcomes.items():
+        ids[status].append(bet_id)
+    queryset = Bet.objects.filter(id__in=list(outcomes))
+    keys = list(queryset.values_list("season_id", "team_id", "user_id", "week").distinct())  # BEFORE update()
+    n = queryset.update(
+        status=Case(*(When(id__in=bet_ids, then=Value(status)) for status, bet_ids in ids.items())),
+        settled_at=timezone.now(),
+    )
 
-    # (A) BOOKED price: product of ALL legs’ quoted prices (sportsbook-style),
-    #     regardless of status. This is what we ALWAYS show.
-    dec_all = Decimal("1")
-    for b in legs:
-        try:
-            dec_all *= american_to_decimal(int(b.american_odds))
-        except Exception:
-            # be defensive if odds are missing
-            dec_all *= Decimal("1")
+    recompute_team_parlays({(team_id, season_id, week) for season_id, team_id, _, week in keys})
+    ledger.refresh_bets(keys)
+    exposure.refresh(exposure.team_picks({(season_id, team_id, week) for season_id, team_id, _, week in keys}))
+    for season_id in {k[0] for k in keys}:
+        bump_season_version(season_id)
+    return n
 
-    parlay.decimal_odds = float(round(dec_all, 4))  # <- THIS is the one you display
+@transaction.atomic
+def set_parlay_status(queryset, status: str) -> int:
+    """
+    Manual override of TeamParlay status (the leg-driven path is
+    recompute_team_parlays). It lasts until one of the parlay's legs changes:
+    that recompute re-derives the status from the legs again.
+    """
+    keys = list(queryset.values_list("season_id", "team_id", "week").distinct())
+    n = queryset.update(status=status, updated_at=timezone.now())
+    ledger.refresh_parlays(keys)
+    exposure.refresh(exposure.team_picks(keys))
+    for season_id in {k[0] for k in keys}:
+        bump_season_version(season_id)
+    return n
 
-    # (B) Status logic (unchanged semantics)
-    lost = any(l.status == "LOST" for l in legs)
-    pending = any(l.status == "PENDING" for l in legs)
-    all_push = len(legs) > 0 and all(l.status == "PUSH" for l in legs)
+@transaction.atomic
+def reprice_parlays(queryset) -> int:
+    """
+    Rebook the selected parlays' decimal_odds as the product of all their
+    legs' odds, whatever the legs' status. One leg query per season, one
+    bulk update, and one cache bump per season however many parlays are
+    selected. Returns the number of parlays repriced.
+    """
+    parlays = list(queryset.select_related("season"))
+    by_season = defaultdict(list)
+    for p in parlays:
+        by_season[p.season].append(p)
 
-    if not legs:
-        parlay.status = "PENDING"
-    elif lost:
-        parlay.status = "LOST"
-    elif pending:
-        parlay.status = "PENDING"
-    elif all_push:
-        parlay.status = "PUSH"
+    legs = defaultdict(list)
+    for season, group in by_season.items():
+        rows = (
+            bets_for(season)
+            .filter(ledger.keys_q(("team_id", "week"), {(p.team_id, p.week) for p in group}), parlay_selected=True)
+            .values_list("team_id", "week", "american_odds")
+        )
+        for team_id, week, odds in rows:
+            legs[(season.id, team_id, week)].append(odds)
+
+    now = timezone.now()
+    for p in parlays:
+        p.decimal_odds = parlay_decimal_odds(legs.get((p.season_id, p.team_id, p.week), []))
+        p.updated_at = now
+    # bulk_update skips post_save, so refresh what parlay_changed would have, once
+    TeamParlay.objects.bulk_update(parlays, ["decimal_odds", "updated_at"])
+
+    keys = {(p.season_id, p.team_id, p.week) for p in parlays}
+    ledger.refresh_parlays(keys)
+    exposure.refresh(exposure.team_picks(keys))
+    for season_id in {k[0] for k in keys}:
+        bump_season_version(season_id)
+    return len(parlays)
+
+SUBMITTED_FIELDS = ["team", "pick_text", "line", "american_odds", "parlay_selected", "over_under", "game", "selection"]
+
+@transaction.atomic
+def submit_week_picks(user, team, season, week: int, bets) -> None:
+    """
+    Upsert a user's picks for one week in a single statement (on the
+    user/season/week/bet_type unique constraint), then reprice the team parlay
+    and refresh the ledger once. Status and created_at of existing picks are kept.
+    bets: unsaved Bet instances, e.g. from BetSimpleForm.save(commit=False).
+    Raises ValueError for an archived season: its bets live in BetArchive.
+    """
+    if season.archived_at:
+        raise ValueError(f"Season {season.year} is archived.")
+    for bet in bets:
+        bet.pk = None  # conflict on the natural key, not the primary key
+        bet.user, bet.team, bet.season, bet.week = user, team, season, week
+    matching.link(Selection, bets)  # tie each pick to the feed's game/selection where it can
+    replaced = exposure.picks(Q(user=user, season=season, week=week))  # the picks these may move off
+    Bet.objects.bulk_create(
+        bets, update_conflicts=True,
+        unique_fields=["user", "season", "week", "bet_type"],
+        update_fields=SUBMITTED_FIELDS,
+    )
+    # bulk_create skips the Bet signals; do their work once for the whole set
+    recompute_team_parlays({(team.id, season.id, week)})
+    ledger.refresh_bets({(season.id, team.id, user.id, week)})
+    exposure.refresh(replaced | exposure.team_picks({(season.id, team.id, week)}))
+    # pending picks only reach cached pages once the week is (about to be) revealed
+    if picks_public(season, week):
+        bump_season_version(season.id)
+
+def _team_ou_status(side: str, line: float, wins: float) -> str:
+    margin = wins - line if side == "OVER" else line - wins
+    return "WON" if margin > 0 else "LOST" if margin < 0 else "PUSH"
+
+@transaction.atomic
+def settle_futures_market(season, market: str, outcome, force: bool = False) -> dict:
+    """
+    Settle every team's pick in one futures market with a single UPDATE on
+    (season, market, selection_key), then refresh the futures ledger rows and
+    the season's caches. Returns {status: picks}.
+    outcome: the winner for SUPER_BOWL / MVP, normalized like the picks (so
+    "Chiefs" settles "KC to win SB"); {team code: final wins} for TEAM_OU,
+    where teams left out stay as they are. Picks with a blank (unrecognized)
+    key stay PENDING. Raises ValueError when the winner isn't recognized, or
+    when no pick is on it and not force (a typo would otherwise settle every
+    pick LOST).
+    """
+    picks = FuturePick.objects.filter(season=season, market=market)
+    if market == "TEAM_OU":
+        ids = defaultdict(list)
+        rows = picks.filter(selection_key__in=list(outcome)).values_list("id", "selection_key", "pick_text")
+        for pick_id, team, text in rows:
+            side, line = matching.team_ou(text)
+            if side:
+                ids[_team_ou_status(side, line, outcome[team])].append(pick_id)
+        if not ids:
+            return {}
+        picks = picks.filter(id__in=[i for group in ids.values() for i in group])
+        status = Case(*(When(id__in=group, then=Value(st)) for st, group in ids.items()))
     else:
-        # no lost, no pending, and not all push -> at least one WON (others may be PUSH)
-        parlay.status = "WON"
+        winner = matching.futures_key(market, outcome)
+        if not winner:
+            raise ValueError(f"{outcome!r} doesn't name a {market} selection.")
+        picks = picks.exclude(selection_key="")
+        if not force and not picks.filter(selection_key=winner).exists():
+            raise ValueError(f"No {market} pick is on {winner}; force it to settle every pick LOST.")
+        status = Case(When(selection_key=winner, then=Value("WON")), default=Value("LOST"))
 
-    parlay.save()
-    return parlay
+    keys = list(picks.values_list("season_id", "team_id").distinct())  # BEFORE update()
+    picks.update(status=status, settled_at=timezone.now())
+    ledger.refresh_futures(keys)
+    bump_season_version(season.id)
+    return dict(picks.order_by().values_list("status").annotate(n=Count("id")))
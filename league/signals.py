@@ -1,13 +1,27 @@
 # league/signals.py
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Bet
-from .sevices import recompute_team_parlay
+from .models import Bet, TeamParlay, FuturePick
+from . import exposure, ledger
+from .cache import bump_season_version
+from .recompute import mark_bet_dirty
 
+# Parlay + ledger work for bets is coalesced per request/transaction (league/recompute.py)
 @receiver(post_save, sender=Bet)
 def bet_saved(sender, instance: Bet, **kwargs):
-    recompute_team_parlay(instance.team, instance.season.year, instance.week)
+    mark_bet_dirty(instance)
 
 @receiver(post_delete, sender=Bet)
 def bet_deleted(sender, instance: Bet, **kwargs):
-    recompute_team_parlay(instance.team, instance.season.year, instance.week)
+    mark_bet_dirty(instance)
+
+@receiver([post_save, post_delete], sender=TeamParlay)
+def parlay_changed(sender, instance: TeamParlay, **kwargs):
+    ledger.refresh_parlays([(instance.season_id, instance.team_id, instance.week)])
+    exposure.refresh(exposure.team_picks([(instance.season_id, instance.team_id, instance.week)]))
+    bump_season_version(instance.season_id)
+
+@receiver([post_save, post_delete], sender=FuturePick)
+def future_changed(sender, instance: FuturePick, **kwargs):
+    ledger.refresh_futures([(instance.season_id, instance.team_id)])
+    bump_season_version(instance.season_id)
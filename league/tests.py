@@ -1,3 +1,1606 @@
-from django.test import TestCase
+import base64
+import copy
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from io import StringIO
 
-# Create your tests here.
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Season, Team, TeamMembership, Bet, BetArchive, TeamParlay, UnitsLedger, Game, Market, Selection, FuturePick, Exposure,
+    RevealSnapshot, ARCHIVED_BET_FIELDS, bets_for,
+)
+from . import cache as league_cache, metrics as league_metrics, exports, exposure, finalize, ledger, matching, odds, recompute, reveal, settlement
+from .pricing import american_to_decimal, safe_decimal_odds
+from .views import dashboard_payload, standings_payload
+from .sevices import (
+    recompute_team_parlays, settle_bets, settle_futures_market, settle_bet_outcomes, set_parlay_status, submit_week_picks,
+)
+
+
+def pick_form_data(odds="-110", parlay="TOTAL"):
+    data = {}
+    for bt in ("SPREAD", "TOTAL", "PROP"):
+        data.update({
+            f"{bt}-pick_text": f"{bt} pick",
+            f"{bt}-line": "-3.5",
+            f"{bt}-american_odds": odds,
+            f"{bt}-over_under": "OVER",
+        })
+    if parlay:
+        data[f"{parlay}-parlay_selected"] = "on"
+    return data
+
+# A test-mirror replica is a second connection, which can't see a TestCase's
+# uncommitted rows: routing is exercised in ReplicaRoutingTests only. The same
+# goes for the thread a background cache warm runs in, so warms run inline.
+PRIMARY_ONLY = override_settings(REPLICA_DB_ALIAS=None, LEAGUE_CACHE_WARM="inline")
+
+
+@override_settings(LEAGUE_CACHE_WARM="off")  # in production the re-warm runs on its own thread
+@PRIMARY_ONLY
+class SubmitPickTests(TestCase):
+    # session, user, season, membership, existing picks, the week's feed selections, upsert,
+    # parlay recompute (team, legs, upsert, ledger x2), bet ledger x3 (archived seasons, bets, upsert),
+    # exposure (picks replaced, the team's picks, bets, parlays, upsert, delete of settled
+    # picks), version bump (week 1 of 2025 is revealed), plus the savepoint pair TestCase
+    # adds around the write transaction; on commit, the finalized-snapshot check
+    QUERY_BUDGET = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025, start_date=date(2025, 9, 4))
+        cls.team = Team.objects.create(season=cls.season, name="Sharps")
+        cls.user = User.objects.create_user("alice", password="pw")
+        TeamMembership.objects.create(user=cls.user, team=cls.team)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse("submit_pick", args=[2025, 1])
+
+    def post_within(self, budget, data):
+        # a TestCase never commits, so run the on_commit callbacks (recomputes,
+        # the re-warm) inside the count: they are part of the request's cost
+        with self.assertNumQueries(budget), self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(self.url, data)
+        self.assertTrue(callbacks)  # the version bump's re-warm, at least
+        return response
+
+    def test_submit_pick_query_budget(self):
+        r = self.post_within(self.QUERY_BUDGET - 1, pick_form_data(odds="+150"))  # nothing settled yet, so no exposure delete
+        self.assertEqual(r.status_code, 302)
+        self.assertEqual(Bet.objects.filter(user=self.user, week=1).count(), 3)
+
+        parlay = TeamParlay.objects.get(team=self.team, week=1)
+        self.assertEqual(parlay.decimal_odds, 2.5)
+        self.assertEqual(UnitsLedger.objects.get(user=self.user, week=1, source="BET").picks, 3)
+        self.assertEqual(Bet.objects.get(user=self.user, bet_type="TOTAL").over_under, "OVER")
+
+    def test_resubmit_updates_in_place_within_budget(self):
+        self.client.post(self.url, pick_form_data(odds="+150"))
+        settle_bets(Bet.objects.filter(user=self.user, bet_type="SPREAD"), "WON")
+        ids = set(Bet.objects.values_list("id", flat=True))
+
+        self.post_within(self.QUERY_BUDGET, pick_form_data(odds="-200", parlay="PROP"))
+
+        self.assertEqual(set(Bet.objects.values_list("id", flat=True)), ids)
+        self.assertEqual(Bet.objects.get(user=self.user, bet_type="SPREAD").status, "WON")
+        self.assertEqual(Bet.objects.get(user=self.user, bet_type="PROP").american_odds, -200)
+        self.assertEqual(TeamParlay.objects.get(team=self.team, week=1).decimal_odds, 1.5)
+
+
+@PRIMARY_ONLY
+class CacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025, start_date=date(2025, 9, 4))
+        cls.future = Season.objects.create(year=2099, start_date=date(2099, 9, 4))  # nothing revealed yet
+        cls.user = User.objects.create_user("alice")
+        for season in (cls.season, cls.future):
+            TeamMembership.objects.create(user=cls.user, team=Team.objects.create(season=season, name="Sharps"))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def version(self, season):
+        return Season.objects.values_list("data_version", flat=True).get(pk=season.pk)
+
+    def warms(self, callbacks):
+        return [c for c in callbacks if isinstance(c, league_cache._Warm)]
+
+    def test_payload_is_built_once_per_version(self):
+        builds = []
+        build = lambda: builds.append(1) or len(builds)
+        self.assertEqual(league_cache.cached_payload("standings", self.season, build), 1)
+        self.assertEqual(league_cache.cached_payload("standings", self.season, build), 1)
+
+        league_cache.bump_season_version(self.season.id)
+        self.season.refresh_from_db()
+        self.assertEqual(league_cache.cached_payload("standings", self.season, build), 2)
+        self.assertEqual(len(builds), 2)
+
+    def test_pending_picks_before_reveal_keep_the_version(self):
+        before = self.version(self.future)
+        with self.captureOnCommitCallbacks() as callbacks:
+            r = self.client.post(reverse("submit_pick", args=[2099, 1]), pick_form_data())
+        self.assertEqual(r.status_code, 302)
+        self.assertEqual(self.version(self.future), before)
+        self.assertEqual(self.warms(callbacks), [])
+
+    def test_settlement_bumps_once_and_rewarms(self):
+        self.client.post(reverse("submit_pick", args=[2025, 1]), pick_form_data())  # revealed week: bumps
+        self.client.get(reverse("standings", args=[2025]))
+        before = self.version(self.season)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            settle_bets(Bet.objects.filter(season=self.season, week=1), "WON")
+        self.assertEqual(self.version(self.season), before + 1)
+        self.assertEqual(len(self.warms(callbacks)), 1)
+
+        # the warm rebuilt standings at the new version, from the settled rows
+        self.season.refresh_from_db()
+        payload = cache.get(league_cache.payload_key("standings", self.season))
+        self.assertEqual([row["user__username"] for row in payload["individuals"]], ["alice"])
+        with self.assertNumQueries(0):
+            league_cache.cached_payload("standings", self.season, lambda: self.fail("rebuilt"))
+
+    def test_warm_runs_in_a_background_thread(self):
+        with self.settings(LEAGUE_CACHE_WARM="background"), mock.patch.object(league_cache.threading, "Thread") as thread:
+            with self.captureOnCommitCallbacks(execute=True):
+                league_cache.bump_season_version(self.season.id)
+        thread.assert_called_once()
+        self.assertTrue(thread.call_args.kwargs["daemon"])
+        thread.return_value.start.assert_called_once_with()
+
+    def backends(self):
+        """The default cache as each backend that takes its single-flight lock differently."""
+        yield "locmem", {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        yield "file", {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}}
+
+    def test_lock_is_exclusive_and_released_only_by_its_holder(self):
+        for name, caches_setting in self.backends():
+            with self.subTest(name), self.settings(CACHES=caches_setting):
+                holder, other, third = (league_cache._payload_lock("league:test:lock") for _ in range(3))
+                self.assertTrue(holder.acquire())
+                self.assertFalse(other.acquire())
+                other.release()  # not its lock to drop
+                self.assertFalse(third.acquire())
+                holder.release()
+                self.assertTrue(other.acquire())
+                other.release()
+                if name == "file":
+                    self.assertEqual([f for f in os.listdir(caches_setting["default"]["LOCATION"]) if f.endswith(".lock")], [])
+
+    def test_concurrent_misses_build_once(self):
+        for name, caches_setting in self.backends():
+            with self.subTest(name), self.settings(CACHES=caches_setting, LEAGUE_CACHE_WAIT_SECONDS=5):
+                building, release = threading.Event(), threading.Event()
+                builds, results = [], []
+
+                def build():
+                    builds.append(1)
+                    building.set()
+                    release.wait(5)
+                    return {"built": len(builds)}
+
+                def fetch():
+                    results.append(league_cache.cached_payload("standings", self.season, build, stale_ok=False))
+
+                threads = [threading.Thread(target=fetch)]
+                threads[0].start()
+                self.assertTrue(building.wait(5))  # the first miss holds the lock and is building
+                threads += [threading.Thread(target=fetch) for _ in range(3)]
+                for t in threads[1:]:
+                    t.start()
+                release.set()
+                for t in threads:
+                    t.join(10)
+                self.assertEqual(len(builds), 1)
+                self.assertEqual(results, [{"built": 1}] * 4)
+                lock = league_cache._payload_lock(league_cache.payload_key("standings", self.season) + ":lock")
+                self.assertTrue(lock.acquire())  # released
+                lock.release()
+
+    def test_stale_fallback_while_another_worker_rebuilds(self):
+        league_cache.cached_payload("standings", self.season, lambda: "v1")
+        newer = copy.copy(self.season)
+        newer.data_version += 1
+        lock_key = league_cache.payload_key("standings", newer) + ":lock"
+        other = league_cache._payload_lock(lock_key)
+        self.assertTrue(other.acquire())  # another worker is rebuilding
+        self.addCleanup(other.release)
+
+        league_cache.stale_served()  # reset
+        self.assertEqual(league_cache.cached_payload("standings", newer, lambda: self.fail("rebuilt")), "v1")
+        self.assertTrue(league_cache.stale_served())
+        self.assertFalse(league_cache.stale_served())  # reading resets it
+
+        # no stale wanted: wait for the holder, then build anyway when it never delivers
+        with self.settings(LEAGUE_CACHE_WAIT_SECONDS=0.1):
+            self.assertEqual(league_cache.cached_payload("standings", newer, lambda: "v2", stale_ok=False), "v2")
+        self.assertFalse(league_cache.stale_served())
+        self.assertFalse(league_cache._payload_lock(lock_key).acquire())  # still the other worker's
+        self.assertEqual(league_cache.cached_payload("standings", newer, lambda: self.fail("rebuilt")), "v2")
+
+@PRIMARY_ONLY
+class RecomputeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025, start_date=date(2025, 9, 4))
+        cls.team = Team.objects.create(season=cls.season, name="Sharps")
+        cls.user = User.objects.create_user("alice")
+        TeamMembership.objects.create(user=cls.user, team=cls.team)
+
+    def bet(self, week, bet_type="SPREAD"):
+        return Bet.objects.create(
+            user=self.user, team=self.team, season=self.season, week=week, bet_type=bet_type,
+            pick_text="pick", line=-3.5, american_odds=-110, parlay_selected=True,
+        )
+
+    def batches(self, callbacks):
+        return [c for c in callbacks if isinstance(c, recompute._Batch)]
+
+    def queued(self, callbacks):
+        return {key for batch in self.batches(callbacks) for key in batch.parlays}
+
+    def test_keys_coalesce_and_flush_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for bt in ("SPREAD", "TOTAL", "PROP"):
+                self.bet(1, bt)
+        self.assertEqual(len(self.batches(callbacks)), 1)
+        self.assertEqual(TeamParlay.objects.get(team=self.team, week=1).status, "PENDING")
+        self.assertEqual(UnitsLedger.objects.get(user=self.user, week=1, source="BET").picks, 3)
+
+    def test_rolled_back_savepoint_drops_its_keys(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.bet(1)
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.bet(2)
+                raise RuntimeError
+        self.assertEqual(self.queued(callbacks), {(self.team.id, self.season.id, 1)})
+
+    def test_raising_scope_leaves_nothing_behind(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic(), recompute.defer_recomputes():
+                self.bet(1)
+                raise RuntimeError
+        self.assertEqual(self.queued(callbacks), set())
+        state = recompute._scope()
+        self.assertEqual((state.depth, bool(state.keys), bool(state.marked), state.batches), (0, False, False, []))
+
+    def test_scope_without_flush_drops_only_its_own_keys(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.bet(1)
+            with recompute.defer_recomputes(flush_on_exit=False):
+                self.bet(2)
+        self.assertEqual(self.queued(callbacks), {(self.team.id, self.season.id, 1)})
+
+
+@PRIMARY_ONLY
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN every query the season views run against a seeded league and fail
+    if any league table is read with a sequential scan. On PostgreSQL the
+    planner would pick seq scans for tables this small anyway, so they are
+    disabled and we check that an index path exists at all.
+    """
+    SEQ_SCAN = {
+        "sqlite": re.compile(r"^SCAN (league_\w+)$"),
+        "postgresql": re.compile(r"Seq Scan on (league_\w+)"),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025, start_date=date(2025, 9, 4))
+        statuses = ["WON", "LOST", "PUSH", "PENDING"]
+        for t in range(4):
+            team = Team.objects.create(season=cls.season, name=f"Team {t}")
+            for u in range(3):
+                user = User.objects.create_user(f"user{t}{u}")
+                TeamMembership.objects.create(user=user, team=team)
+                Bet.objects.bulk_create([
+                    Bet(user=user, team=team, season=cls.season, week=w, bet_type=bt,
+                        pick_text="pick", line=-3.5, american_odds=-110,
+                        parlay_selected=(bt == "SPREAD" and u == 0),
+                        status=statuses[(w + u + i) % 4])
+                    for w in range(1, 5) for i, bt in enumerate(("SPREAD", "TOTAL", "PROP"))
+                ])
+            for w in range(1, 5):
+                TeamParlay.objects.create(team=team, season=cls.season, week=w, status=statuses[w % 4])
+        cls.user = User.objects.get(username="user00")
+
+    def setUp(self):
+        cache.clear()  # cached payloads would hide the queries we want to plan
+        self.client.force_login(self.user)
+
+    def _explain(self, sql):
+        with connection.cursor() as cur:
+            if connection.vendor == "postgresql":
+                cur.execute("SET LOCAL enable_seqscan = off")
+                cur.execute("EXPLAIN " + sql)
+                return [row[0] for row in cur.fetchall()]
+            cur.execute("EXPLAIN QUERY PLAN " + sql)
+            return [row[-1] for row in cur.fetchall()]
+
+    def assertNoSeqScans(self, url):
+        pattern = self.SEQ_SCAN.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f"no plan parser for {connection.vendor}")
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for q in ctx.captured_queries:
+            sql = q["sql"].lstrip()  # the standings CTE starts on a new line
+            if not sql.startswith(("SELECT", "WITH")) or "league_" not in sql:
+                continue
+            for line in self._explain(sql):
+                m = pattern.search(line.strip())
+                self.assertIsNone(m, f"{url}: sequential scan on {m and m.group(1)}\n{sql}")
+
+    def test_week_view(self):
+        self.assertNoSeqScans(reverse("week_view", args=[2025, 2]))
+
+    def test_dashboard_all_weeks(self):
+        self.assertNoSeqScans(reverse("league_dashboard", args=[2025]))
+
+    def test_dashboard_single_week(self):
+        self.assertNoSeqScans(reverse("league_dashboard", args=[2025]) + "?week=2&parlay=yes")
+
+    def test_standings(self):
+        self.assertNoSeqScans(reverse("standings", args=[2025]))
+
+    def test_standings_data_debug(self):
+        self.assertNoSeqScans(reverse("standings_data_debug", args=[2025]))
+
+
+# "replica" always exists; it mirrors the default test database unless DATABASE_REPLICA_URL names another
+@override_settings(REPLICA_DB_ALIAS="replica", LEAGUE_CACHE_WARM="inline")
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.season = Season.objects.create(year=2025, start_date=date(2025, 9, 4))
+        self.team = Team.objects.create(season=self.season, name="Sharps")
+        self.user = User.objects.create_user("alice", password="pw")
+        TeamMembership.objects.create(user=self.user, team=self.team)
+        self.client.force_login(self.user)
+
+    def queries_by_alias(self, method, url, data=None):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(self.client, method)(url, data or {})
+        return response, len(primary.captured_queries), len(replica.captured_queries)
+
+    def test_read_only_views_read_from_replica(self):
+        for url in (
+            reverse("standings", args=[2025]), reverse("league_dashboard", args=[2025]),
+            reverse("week_view", args=[2025, 1]), reverse("futures_board", args=[2025]),
+            reverse("user_stats", args=["alice"]),
+        ):
+            response, primary, replica = self.queries_by_alias("get", url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertGreater(replica, 0, url)
+            self.assertEqual(primary, 0, url)
+
+    def test_other_views_stay_on_primary(self):
+        _, primary, replica = self.queries_by_alias("get", reverse("submit_pick", args=[2025, 1]))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        response, _, replica = self.queries_by_alias(
+            "post", reverse("submit_pick", args=[2025, 1]), pick_form_data(),
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(replica, 0)
+        self.assertIn("league_primary", response.cookies)
+        _, primary, replica = self.queries_by_alias("get", reverse("standings", args=[2025]))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        del self.client.cookies["league_primary"]  # expired
+        _, primary, replica = self.queries_by_alias("get", reverse("standings", args=[2025]))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_without_a_replica_everything_reads_the_primary(self):
+        with self.settings(REPLICA_DB_ALIAS=None):
+            response = self.queries_by_alias("post", reverse("submit_pick", args=[2025, 1]), pick_form_data())[0]
+            self.assertNotIn("league_primary", response.cookies)
+            _, primary, replica = self.queries_by_alias("get", reverse("standings", args=[2025]))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+
+@PRIMARY_ONLY
+class OddsIngestTests(TransactionTestCase):
+    """ingest_odds against the sample replay slate in league/odds_replay/."""
+
+    def setUp(self):
+        self.season = Season.objects.create(year=2025, start_date=date(2025, 9, 1), end_date=date(2026, 2, 15))
+        self.replay = tempfile.mkdtemp()
+        with open(os.path.join(os.path.dirname(__file__), "odds_replay", "week-1.json")) as f:
+            self.slate = json.load(f)["games"]
+        self.write(self.slate)
+
+    def write(self, games):
+        odds.record(self.replay, 1, games)
+
+    def ingest(self):
+        out = StringIO()
+        call_command("ingest_odds", season=2025, weeks="1-2", replay=self.replay, stdout=out)
+        return out.getvalue()
+
+    def test_worker_outlives_feed_errors(self):
+        bad = os.path.join(self.replay, "week-2.json")
+        with open(bad, "w") as f:
+            f.write("{truncated")
+        with self.assertRaisesMessage(CommandError, "Ingest failed"):  # one-shot: the error is the result
+            self.ingest()
+
+        class Stop(Exception):
+            pass
+
+        def sleep(seconds):
+            if os.path.exists(bad):
+                os.remove(bad)  # the feed recovers for the next round
+            else:
+                raise Stop
+
+        out, err = StringIO(), StringIO()
+        with mock.patch("league.management.commands.ingest_odds.time.sleep", side_effect=sleep), \
+                self.assertLogs("league.management.commands.ingest_odds", "ERROR"), self.assertRaises(Stop):
+            call_command("ingest_odds", season=2025, weeks="1-2", replay=self.replay, every=60, stdout=out, stderr=err)
+        self.assertIn("ingest failed", err.getvalue())
+        self.assertIn("2 games, 2 changed", out.getvalue())
+
+    def test_first_ingest_creates_everything(self):
+        self.assertIn("2 games, 2 changed, 5 markets, 10 selections, 0 removed", self.ingest())
+        self.assertEqual(Game.objects.filter(season=self.season, week=1).count(), 2)
+        self.assertEqual(Market.objects.count(), 5)
+        self.assertEqual(Selection.objects.count(), 10)
+
+    def test_unchanged_slate_writes_nothing(self):
+        self.ingest()
+        self.assertIn("2 games, 0 changed", self.ingest())
+        with self.assertNumQueries(3):  # BEGIN, the hash lookup, COMMIT
+            self.assertEqual(odds.upsert_slate(self.season, self.slate).changed, 0)
+
+    def test_price_move_and_pulled_market(self):
+        self.ingest()
+        games = copy.deepcopy(self.slate)
+        games[0]["markets"][0]["selections"][0]["odds"] = -125
+        del games[0]["markets"][2]
+        self.write(games)
+        self.assertIn("2 games, 1 changed, 2 markets, 4 selections, 3 removed", self.ingest())
+        moved = Selection.objects.get(market__game__external_id="2025-w1-KC-LAC", market__key="spread", key="away")
+        self.assertEqual(moved.american_odds, -125)
+        self.assertFalse(Market.objects.filter(key="prop-mahomes-pass-yds").exists())
+        self.assertEqual(Selection.objects.count(), 8)
+
+    def test_picks_link_to_games_and_selections(self):
+        user = User.objects.create_user("linker", password="pw")
+        team = Team.objects.create(name="Linkers", season=self.season)
+        TeamMembership.objects.create(user=user, team=team)
+        early = Bet.objects.create(user=user, team=team, season=self.season, week=1, bet_type="TOTAL",
+                                   pick_text="Over 44.5", line=44.5, american_odds=-110, over_under="OVER")
+        self.assertIn("1 picks linked", self.ingest())  # submitted before the feed had the game
+        early.refresh_from_db()
+        self.assertEqual((early.game.external_id, early.selection.key), ("2025-w1-BUF-NYJ", "over"))
+
+        self.client.force_login(user)
+        data = pick_form_data(parlay=None)
+        data.update({"SPREAD-pick_text": "kc -3.5 @ lac", "PROP-pick_text": "KC Mahomes o265.5 yds",
+                     "TOTAL-pick_text": "Jets game over"})
+        self.client.post(reverse("submit_pick", args=[2025, 1]), data)
+        picks = {b.bet_type: b for b in Bet.objects.filter(user=user).select_related("game", "selection")}
+        self.assertEqual(picks["SPREAD"].selection.label, "KC -3.5")
+        self.assertEqual((picks["PROP"].game.home, picks["PROP"].selection.key), ("LAC", "over"))
+        self.assertIsNone(picks["TOTAL"].game_id)  # no team code, no unique label
+
+
+class MatchingTests(SimpleTestCase):
+    def rows(self):
+        game = {"game_id": 1, "home": "LAC", "away": "KC"}
+        return [
+            {**game, "selection_id": 1, "market_type": "SPREAD", "key": "away", "label": "KC -3.5", "line": -3.5},
+            {**game, "selection_id": 2, "market_type": "SPREAD", "key": "home", "label": "LAC +3.5", "line": 3.5},
+            {**game, "selection_id": 3, "market_type": "PROP", "key": "over", "label": "Mahomes Over 265.5 pass yds", "line": 265.5},
+            {**game, "selection_id": 4, "market_type": "PROP", "key": "under", "label": "Mahomes Under 265.5 pass yds", "line": 265.5},
+        ]
+
+    def test_prop_links_on_player_or_line(self):
+        self.assertEqual(matching.match("KC Mahomes o265.5", "PROP", "OVER", self.rows(), 250.5), (1, 3))
+        self.assertEqual(matching.match("KC QB under", "PROP", "UNDER", self.rows(), 265.5), (1, 4))
+
+    def test_other_players_prop_stays_unlinked(self):
+        self.assertEqual(matching.match("KC Kelce over 65.5 rec yds", "PROP", "OVER", self.rows(), 65.5), (1, None))
+        self.assertEqual(matching.match("LAC Herbert over 1.5 TDs", "PROP", "OVER", self.rows(), None), (1, None))
+
+    def test_spread_side_named_first(self):
+        self.assertEqual(matching.match("lac +3 vs KC", "SPREAD", None, self.rows(), 3.0), (1, 2))
+
+
+class LinkedWeekMixin:
+    """Week 1 of the replay slate, with two users' picks linked to it."""
+
+    def setUp(self):
+        self.season = Season.objects.create(year=2025, start_date=date(2025, 9, 1), end_date=date(2026, 2, 15))
+        with open(os.path.join(os.path.dirname(__file__), "odds_replay", "week-1.json")) as f:
+            odds.upsert_slate(self.season, json.load(f)["games"])
+        self.team = Team.objects.create(name="Graders", season=self.season)
+        self.bets = {}
+        for user, bt, text, line, ou, parlay in (
+            ("u1", "SPREAD", "KC -3.5 @ LAC", -3.5, None, True),
+            ("u1", "TOTAL", "Over 44.5", 44.5, "OVER", False),
+            ("u1", "PROP", "KC Mahomes o265.5", 265.5, "OVER", False),
+            ("u2", "SPREAD", "LAC +3.5", 3.5, None, True),
+            ("u2", "TOTAL", "BUF/NYJ under 44", 44.0, "UNDER", False),
+            ("u2", "PROP", "BUF Allen over 1.5 TDs", 1.5, "OVER", False),  # no prop market: game only
+        ):
+            user, _ = User.objects.get_or_create(username=user)
+            self.bets[(user.username, bt)] = Bet.objects.create(
+                user=user, team=self.team, season=self.season, week=1, bet_type=bt, pick_text=text,
+                line=line, american_odds=-110, over_under=ou, parlay_selected=parlay,
+            )
+        odds.link_bets(self.season, [1])
+
+
+@PRIMARY_ONLY
+class SettlementTests(LinkedWeekMixin, TestCase):
+    def test_relinking_reads_each_bet_once(self):
+        Bet.objects.filter(season=self.season).update(game=None, selection=None)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(odds.link_bets(self.season, [1]), 6)
+        # the bets, the week's selections, then the write and the exposure refresh: no per-bet deferred loads
+        self.assertFalse([q for q in queries.captured_queries if 'WHERE "league_bet"."id" =' in q["sql"]])
+
+    def test_grade(self):
+        self.assertEqual(settlement.grade("SPREAD", -3.5, None, "away", 20, 27, None), "WON")
+        self.assertEqual(settlement.grade("SPREAD", 3.0, None, "home", 20, 23, None), "PUSH")
+        self.assertEqual(settlement.grade("TOTAL", 44.5, "UNDER", None, 24, 21, None), "LOST")
+        self.assertIsNone(settlement.grade("SPREAD", -3.5, None, None, 20, 27, None))
+        self.assertIsNone(settlement.grade("PROP", 265.5, "OVER", "over", 20, 27, None))
+
+    def test_settle_week_from_csv(self):
+        path = os.path.join(tempfile.mkdtemp(), "finals.csv")
+        with open(path, "w") as f:
+            f.write("id,home_score,away_score,market,result\n"
+                    "2025-w1-KC-LAC,20,27,prop-mahomes-pass-yds,281\n"
+                    "2025-w1-BUF-NYJ,20,24,,\n")
+        out = StringIO()
+        with self.assertNumQueries(27):  # the same however many bets and parlays a week has
+            call_command("settle_results", season=2025, weeks="1", scores=path, stdout=out)
+        self.assertIn("settled 5 bets (2 won, 2 lost, 1 push), 1 left pending", out.getvalue())
+
+        status = {
+            (u, bt): st for u, bt, st in Bet.objects.filter(season=self.season).values_list("user__username", "bet_type", "status")
+        }
+        self.assertEqual(status, {
+            ("u1", "SPREAD"): "WON", ("u1", "TOTAL"): "LOST", ("u1", "PROP"): "WON",
+            ("u2", "SPREAD"): "LOST", ("u2", "TOTAL"): "PUSH", ("u2", "PROP"): "PENDING",
+        })
+        self.assertEqual(TeamParlay.objects.get(team=self.team, week=1).status, "LOST")
+        self.assertAlmostEqual(
+            UnitsLedger.objects.filter(season=self.season, source="BET").aggregate(u=Sum("units"))["u"],
+            2 * 100 / 110 - 2,
+        )
+
+    def test_prop_linked_to_another_players_market_stays_pending(self):
+        mahomes = Selection.objects.get(market__key="prop-mahomes-pass-yds", key="over")
+        kelce = Bet.objects.create(
+            user=User.objects.create_user("u3"), team=self.team, season=self.season, week=1, bet_type="PROP",
+            pick_text="KC Kelce over 65.5 rec yds", line=65.5, american_odds=-110, over_under="OVER",
+            game=mahomes.market.game, selection=mahomes,  # as the matcher used to link it
+        )
+        settlement.apply_scores(self.season, [
+            {"id": "2025-w1-KC-LAC", "home_score": 20, "away_score": 27, "props": {"prop-mahomes-pass-yds": 281}},
+        ])
+        result = settlement.settle(Bet.objects.filter(id__in=[kelce.id, self.bets[("u1", "PROP")].id]))
+        self.assertEqual((dict(result.settled), result.skipped), ({"WON": 1}, 1))
+        kelce.refresh_from_db()
+        self.assertEqual(kelce.status, "PENDING")
+
+
+@PRIMARY_ONLY
+class FuturesSettlementTests(TestCase):
+    def setUp(self):
+        self.season = Season.objects.create(year=2025, start_date=date(2025, 9, 1), end_date=date(2026, 2, 15))
+        self.teams = {}
+        for name, sb, mvp, ou in (
+            ("A", "Chiefs to win Super Bowl", "Patrick Mahomes MVP", "Patriots over 8.5 wins"),
+            ("B", "KC", "patrick mahomes", "NE u8.5"),
+            ("C", "Eagles SB", "Josh Allen MVP", "Jets over 6.5 wins"),
+        ):
+            team = self.teams[name] = Team.objects.create(name=name, season=self.season)
+            for i, (text, odds) in enumerate(((sb, 600), (mvp, 800), (ou, -110)), start=1):
+                FuturePick.objects.create(team=team, season=self.season, index=i, pick_text=text, american_odds=odds)
+
+    def status(self, market):
+        return dict(FuturePick.objects.filter(season=self.season, market=market).values_list("team__name", "status"))
+
+    def test_picks_share_a_normalized_key(self):
+        keys = dict(FuturePick.objects.filter(season=self.season, team=self.teams["B"]).values_list("market", "selection_key"))
+        self.assertEqual(keys, {"SUPER_BOWL": "KC", "MVP": "MAHOMES", "TEAM_OU": "NE"})
+        for market, text, key in (
+            ("MVP", "Mahomes MVP", "MAHOMES"), ("MVP", "Josh Allen (BUF) MVP", "ALLEN"), ("MVP", "Marvin Harrison Jr.", "HARRISON"),
+            ("MVP", "MVP", ""), ("SUPER_BOWL", "Kanas City", ""), ("TEAM_OU", "over 8.5 wins", ""),
+        ):
+            self.assertEqual(matching.futures_key(market, text), key, text)
+
+    def test_settle_winner_market_in_one_pass(self):
+        with self.assertNumQueries(9):  # however many teams picked
+            counts = settle_futures_market(self.season, "SUPER_BOWL", "Kansas City")
+        self.assertEqual(counts, {"WON": 2, "LOST": 1})
+        self.assertEqual(self.status("SUPER_BOWL"), {"A": "WON", "B": "WON", "C": "LOST"})
+        self.assertEqual(self.status("MVP"), {"A": "PENDING", "B": "PENDING", "C": "PENDING"})
+        futures = dict(UnitsLedger.objects.filter(season=self.season, source="FUTURE").values_list("team__name", "units"))
+        self.assertEqual(futures, {"A": 6.0, "B": 6.0, "C": -1.0})
+
+    def test_unrecognized_picks_and_winners_settle_nothing(self):
+        FuturePick.objects.filter(team=self.teams["C"], market="MVP").update(pick_text="the QB", selection_key="")
+        FuturePick.objects.filter(team=self.teams["C"], market="SUPER_BOWL").update(pick_text="Kanas City", selection_key="")
+        with self.assertRaisesMessage(CommandError, "No MVP pick is on BURROW"):
+            call_command("settle_futures", 2025, "MVP", "Joe Burrow", stdout=StringIO())
+        with self.assertRaisesMessage(ValueError, "doesn't name"):
+            settle_futures_market(self.season, "SUPER_BOWL", "Kanas City")
+        self.assertEqual(set(FuturePick.objects.values_list("status", flat=True)), {"PENDING"})
+
+        out = StringIO()
+        call_command("settle_futures", 2025, "MVP", "Mahomes", stdout=out)
+        self.assertEqual(self.status("MVP"), {"A": "WON", "B": "WON", "C": "PENDING"})  # the blank key waits for a person
+        self.assertIn("1 unrecognized pick(s) left PENDING", out.getvalue())
+        call_command("settle_futures", 2025, "SUPER_BOWL", "Bills", "--force", stdout=StringIO())
+        self.assertEqual(self.status("SUPER_BOWL"), {"A": "LOST", "B": "LOST", "C": "PENDING"})
+
+    def test_settle_win_totals(self):
+        out = StringIO()
+        call_command("settle_futures", 2025, "TEAM_OU", "NE=9,nyj=5", stdout=out)
+        self.assertIn("2 lost, 1 won", out.getvalue())
+        self.assertEqual(self.status("TEAM_OU"), {"A": "WON", "B": "LOST", "C": "LOST"})
+
+
+@PRIMARY_ONLY
+class ExposureTests(LinkedWeekMixin, TestCase):
+    """Exposure rows follow submissions and settlement without a rebuild."""
+
+    def exposure(self):
+        return {
+            (e.pick, e.bet_type): (e.bets, round(e.stake_units, 2), e.parlay_legs)
+            for e in Exposure.objects.filter(season=self.season, week=1)
+        }
+
+    def test_settlement_removes_settled_action(self):
+        self.assertEqual(len(self.exposure()), 6)  # written by link_bets in setUp
+        settle_bet_outcomes({self.bets[("u2", "PROP")].id: "PENDING"})  # builds the team parlay
+        before = self.exposure()
+        self.assertEqual(before[("KC -3.5", "SPREAD")], (1, 1.0, 1))
+        self.assertEqual(before[("LAC +3.5", "SPREAD")], (1, 1.0, 1))
+        self.assertEqual(len(before), 6)
+
+        settle_bet_outcomes({self.bets[("u1", "SPREAD")].id: "WON", self.bets[("u2", "TOTAL")].id: "PUSH"})
+        after = self.exposure()
+        self.assertNotIn(("KC -3.5", "SPREAD"), after)
+        self.assertEqual(after[("LAC +3.5", "SPREAD")], (1, 1.0, 1))  # its parlay is still alive
+        self.assertEqual(len(after), 4)
+
+    def test_refresh_upserts_the_picks_it_touches(self):
+        untouched = dict(Exposure.objects.filter(pick="LAC +3.5").values_list("pick", "id"))
+        user = User.objects.get(username="u1")
+        TeamMembership.objects.create(user=user, team=self.team)
+        self.client.force_login(user)
+        data = pick_form_data(parlay="SPREAD")
+        data.update({"TOTAL-pick_text": "Over 44.5", "PROP-pick_text": "KC Mahomes o265.5"})
+        self.client.post(reverse("submit_pick", args=[2025, 1]), data)  # SPREAD moves off KC -3.5
+        after = self.exposure()
+        self.assertNotIn(("KC -3.5", "SPREAD"), after)
+        self.assertEqual(after[("SPREAD PICK", "SPREAD")], (1, 1.0, 1))
+        self.assertEqual(Exposure.objects.get(pick="SPREAD PICK").game_key, 0)  # unlinked
+        self.assertEqual(dict(Exposure.objects.filter(pick="LAC +3.5").values_list("pick", "id")), untouched)
+
+        # refreshing again (or concurrently) upserts the same rows, and matches a rebuild
+        n = Exposure.objects.count()
+        exposure.refresh(exposure.week_picks({(self.season.id, 1)}))
+        exposure.refresh(exposure.team_picks({(self.season.id, self.team.id, 1)}))
+        self.assertEqual(Exposure.objects.count(), n)
+        exposure.rebuild_season(self.season)
+        self.assertEqual(self.exposure(), after)
+
+    def test_report_page(self):
+        User.objects.create_user("boss", password="pw", is_staff=True)
+        self.client.login(username="boss", password="pw")
+        user = User.objects.get(username="u1")
+        TeamMembership.objects.create(user=user, team=self.team)
+        self.client.force_login(user)
+        data = pick_form_data(parlay="SPREAD")
+        data.update({"SPREAD-pick_text": "KC -3.5 @ LAC", "TOTAL-pick_text": "Over 44.5", "PROP-pick_text": "KC Mahomes o265.5"})
+        self.client.post(reverse("submit_pick", args=[2025, 1]), data)  # resubmits u1's picks
+        self.assertEqual(self.exposure()[("KC -3.5", "SPREAD")], (1, 1.0, 1))
+
+        self.client.force_login(User.objects.get(username="boss"))
+        with self.assertNumQueries(5):  # session, user, season, weeks, rows
+            response = self.client.get(reverse("exposure_report", args=[2025]))
+        self.assertContains(response, "KC @ LAC")
+        self.assertContains(response, "Picks not linked to a game", count=0)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse("exposure_report", args=[2025])).status_code, 302)
+
+
+@PRIMARY_ONLY
+class LedgerTests(LinkedWeekMixin, TestCase):
+    """The incrementally maintained ledger always equals a from-scratch rebuild."""
+
+    def ledger(self):
+        return sorted(
+            UnitsLedger.objects.filter(season=self.season).values_list(
+                "team_id", "user_key", "week", "source", "units", "picks", "wins", "losses", "pushes",
+            )
+        )
+
+    def assertMatchesRebuild(self):
+        kept = self.ledger()
+        ledger.rebuild_season(self.season)
+        self.assertEqual(kept, self.ledger())
+
+    def test_settle_unsettle_and_parlay_change(self):
+        ledger.rebuild_season(self.season)  # the fixture's creates queued on_commit work a TestCase never commits
+        settle_bet_outcomes({self.bets[("u2", "PROP")].id: "PENDING"})  # builds the team parlay
+        self.assertMatchesRebuild()
+        stamp = UnitsLedger.objects.get(user__username="u1", source="BET").updated_at
+
+        settle_bet_outcomes({self.bets[("u1", "SPREAD")].id: "WON", self.bets[("u2", "TOTAL")].id: "LOST"})
+        self.assertMatchesRebuild()
+        row = UnitsLedger.objects.get(user__username="u1", source="BET")
+        self.assertEqual((row.wins, round(row.units, 4)), (1, round(100 / 110, 4)))
+        self.assertGreater(row.updated_at, stamp)  # upserts move the page validators too
+
+        settle_bets(Bet.objects.filter(id=self.bets[("u1", "SPREAD")].id), "PENDING")
+        self.assertMatchesRebuild()
+        self.assertEqual(UnitsLedger.objects.get(user__username="u1", source="BET").wins, 0)
+
+        # a leg dropped from the parlay (signal path), then the parlay overridden
+        leg = self.bets[("u2", "SPREAD")]
+        leg.parlay_selected = False
+        with self.captureOnCommitCallbacks(execute=True):
+            leg.save()
+        self.assertMatchesRebuild()
+        set_parlay_status(TeamParlay.objects.filter(team=self.team, week=1), "WON")
+        self.assertMatchesRebuild()
+        self.assertEqual(UnitsLedger.objects.get(team=self.team, source="PARLAY").wins, 1)
+
+        # deleting a user's last pick of the week removes their row rather than zeroing it
+        with self.captureOnCommitCallbacks(execute=True):
+            Bet.objects.filter(user__username="u1").delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(UnitsLedger.objects.filter(user__username="u1").exists())
+
+
+class PricingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025)
+        cls.team = Team.objects.create(season=cls.season, name="Sharps")
+        cls.user = User.objects.create_user("alice")
+
+    def bet(self, **kw):
+        return Bet(user=self.user, team=self.team, season=self.season, week=1, bet_type="SPREAD",
+                   pick_text="KC -3.5", line=-3.5, **kw)
+
+    def test_scalar_prices_match_the_generated_columns(self):
+        for odds in (150, -120, 100, -100, -110, 50, 0):
+            bet = self.bet(american_odds=odds, stake_units=2.0)
+            unsaved = bet.potential_return_units  # no generated column to read yet
+            bet.save()
+            self.assertAlmostEqual(bet.decimal_odds, safe_decimal_odds(odds))
+            self.assertAlmostEqual(bet.potential_return_units, unsaved)
+            bet.delete()
+        with self.assertRaises(ValueError):
+            american_to_decimal(50)
+
+    def test_save_refreshes_generated_columns(self):
+        bet = self.bet(american_odds=150, stake_units=2.0)
+        bet.save()
+        self.assertEqual(bet.pnl_units, 0.0)
+        bet.status = "WON"
+        bet.save()
+        self.assertAlmostEqual(bet.pnl_units, 3.0)
+        bet.american_odds = -200
+        bet.save(update_fields=["american_odds"])
+        self.assertAlmostEqual(bet.decimal_odds, 1.5)
+        self.assertAlmostEqual(bet.pnl_units, 1.0)
+
+        parlay = TeamParlay.objects.create(team=self.team, season=self.season, week=1, decimal_odds=3.0)
+        parlay.status = "WON"
+        parlay.save()
+        self.assertAlmostEqual(parlay.pnl_units, 2.0)
+
+        future = FuturePick.objects.create(team=self.team, season=self.season, index=1, pick_text="KC", american_odds=500)
+        future.status = "LOST"
+        future.save()
+        self.assertEqual((future.decimal_odds, future.pnl_units), (6.0, -1.0))
+
+
+@PRIMARY_ONLY
+class StandingsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025)
+        sharps, squares = (Team.objects.create(season=cls.season, name=n) for n in ("Sharps", "Squares"))
+        Team.objects.create(season=cls.season, name="Idle")  # no picks: a flat line
+        for user, team, week, odds, status in (
+            ("ann", sharps, 1, 150, "WON"), ("ann", sharps, 3, -110, "LOST"),  # nothing in week 2
+            ("bob", sharps, 1, -120, "LOST"), ("bob", sharps, 2, 200, "WON"),
+            ("cat", squares, 2, -110, "PUSH"), ("cat", squares, 4, 120, "PENDING"),  # past the last settled week
+            ("dan", squares, 4, 110, "PENDING"),  # pending only: on the axis at zero
+        ):
+            user, _ = User.objects.get_or_create(username=user)
+            Bet.objects.create(user=user, team=team, season=cls.season, week=week, bet_type="SPREAD",
+                               pick_text="x", line=1.5, american_odds=odds, status=status)
+        TeamParlay.objects.create(team=sharps, season=cls.season, week=2, decimal_odds=3.0, status="WON")
+        FuturePick.objects.create(team=squares, season=cls.season, index=1, pick_text="KC", american_odds=500, status="WON")
+        ledger.rebuild_season(cls.season)  # the creates queued their refreshes for a commit that never comes
+
+    def reference(self):
+        """The running totals the way standings used to build them: per week from the raw rows, carried forward."""
+        settled = [b for b in Bet.objects.filter(season=self.season) if b.status != "PENDING"]
+        parlays = list(TeamParlay.objects.filter(season=self.season))
+        last = max(r.week for r in settled + parlays)
+        weeks = list(range(last + 1))
+
+        def running(rows):
+            return [round(sum(r.pnl_units for r in rows if r.week <= w), 4) for w in weeks]
+
+        teams = [
+            {"label": t.name, "data": running([r for r in settled + parlays if r.team_id == t.id])}
+            for t in self.season.teams.order_by("name")
+        ]
+        users = [
+            {"label": u, "data": running([b for b in settled if b.user.username == u])}
+            for u in sorted(set(Bet.objects.filter(season=self.season).values_list("user__username", flat=True)))
+        ]
+        return weeks, teams, users
+
+    def test_chart_series_match_the_raw_rows(self):
+        payload = standings_payload(self.season)
+        weeks, teams, users = self.reference()
+        self.assertEqual(payload["chart_weeks"], weeks)
+        self.assertEqual(payload["team_chart_series"], teams)
+        self.assertEqual(payload["user_chart_series"], users)
+        self.assertEqual(weeks, [0, 1, 2, 3])
+        self.assertEqual(teams[1], {"label": "Sharps", "data": [0.0, 0.5, 4.5, 3.5]})  # ann +1.5, bob -1; bob +2, parlay +2; ann -1
+        self.assertEqual(users[3], {"label": "dan", "data": [0.0, 0.0, 0.0, 0.0]})
+        self.assertEqual([t["team"].name for t in payload["teams"]], ["Squares", "Sharps", "Idle"])  # futures count in the table
+
+
+@override_settings(LEAGUE_CACHE_WARM="off")
+@PRIMARY_ONLY
+class ChartDataTests(TestCase):
+    """The chart-data API: deltas that line up with the full series, bounded however big the league."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025)
+        teams = [Team.objects.create(season=cls.season, name=n) for n in ("Aces", "Bears", "Colts")]
+        for i in range(25):
+            user = User.objects.create_user(f"p{i:02d}")
+            for week in (1, 2, 3, 4):
+                status = ("WON", "LOST", "PUSH", "LOST")[(i * week + i) % 4]
+                Bet.objects.create(user=user, team=teams[i % 3], season=cls.season, week=week, bet_type="SPREAD",
+                                   pick_text="x", line=1.5, american_odds=100 + 10 * i, status=status)
+        ledger.rebuild_season(cls.season)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, params=None, **headers):
+        return self.client.get(reverse("standings_chart_data", args=[2025]), params or {}, **headers)
+
+    def rows(self, packed, n):
+        """Unpacked series, {label: [hundredths, ...]} with n points each."""
+        values = packed["values"]
+        return {label: values[i * n:(i + 1) * n] for i, label in enumerate(packed["labels"])}
+
+    def test_since_week_sends_the_points_after_it(self):
+        full = self.get().json()
+        weeks = full["weeks"]
+        self.assertEqual(weeks, [0, 1, 2, 3, 4])
+        self.assertIsNone(full["anchor"])
+        n = len(weeks)
+        for since in range(-2, n + 1):
+            delta = self.get({"since_week": since}).json()
+            start = min(max(since + 1, 0), n)
+            self.assertEqual(delta["weeks"], weeks[start:], since)
+            self.assertEqual(delta["since_week"], since)
+            for kind in ("teams", "users"):
+                self.assertEqual(delta[kind]["labels"], full[kind]["labels"])
+                before, after = self.rows(full[kind], n), self.rows(delta[kind], n - start)
+                # the client's merge: its copy through since_week, then the delta
+                self.assertEqual({l: v[:start] + after[l] for l, v in before.items()}, before, (since, kind))
+                if start:
+                    self.assertEqual(delta["anchor"][kind], [before[l][start - 1] for l in delta[kind]["labels"]])
+            if not start:
+                self.assertIsNone(delta["anchor"])
+
+    def test_etag_names_the_version_and_the_window(self):
+        first = self.get({"since_week": 2})
+        etag = first["ETag"]
+        self.assertEqual(self.get({"since_week": 2}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        other = self.get({"since_week": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, 200)
+        self.assertNotEqual(other["ETag"], etag)
+
+        bet = Bet.objects.filter(season=self.season, week=4, status="LOST").first()
+        settle_bet_outcomes({bet.pk: "WON"})  # moves data_version
+        response = self.get({"since_week": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["version"], Season.objects.get(pk=self.season.pk).data_version)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        self.assertEqual(self.get({"since_week": "two"}).status_code, 400)
+
+    def test_users_chart_is_the_top_and_bottom_k(self):
+        payload = standings_payload(self.season)
+        series = {s["label"]: s["data"] for s in payload["user_chart_series"]}
+        ranked = sorted(series, key=lambda u: (-series[u][-1], u))
+        with mock.patch("league.views.USER_CHART_K", 4):
+            data = self.get().json()
+        self.assertEqual(data["users"]["labels"], ranked[:4] + ranked[-4:])
+        self.assertEqual(data["user_count"], 25)
+        with mock.patch("league.views.USER_CHART_K", 13):  # 2k covers everyone: all of them, best first
+            self.assertEqual(self.get().json()["users"]["labels"], ranked)
+        self.assertEqual(len(self.get().json()["users"]["labels"]), 20)
+
+        hidden = ranked[12]  # not on the default chart: fetched on demand, full series
+        data = self.get({"users": f"{hidden}, nobody,{hidden}"}).json()
+        self.assertEqual(data["users"]["labels"], [hidden])
+        self.assertEqual(data["missing"], ["nobody"])
+        self.assertEqual(self.rows(data["users"], 5)[hidden], [round(v * 100) for v in series[hidden]])
+        everyone = ",".join(f"p{i:02d}" for i in range(25))
+        self.assertEqual(self.get({"users": everyone}).json()["users"]["labels"], [f"p{i:02d}" for i in range(20)])
+
+    def test_bar_charts_keep_the_biggest_counts(self):
+        payload = standings_payload(self.season)
+        for kind in ("heater", "stinker"):
+            counts = sorted(zip(payload[f"{kind}_labels"], payload[f"{kind}_data"]), key=lambda x: (-x[1], x[0]))
+            self.assertGreater(len(counts), 5)
+            with mock.patch("league.views.BAR_CHART_LIMIT", 5):
+                bars = self.get().json()[kind]
+            self.assertEqual(list(zip(bars["labels"], bars["data"])), counts[:5])
+            full = self.get().json()[kind]  # under the limit: as the standings page has it
+            self.assertEqual((full["labels"], full["data"]), (payload[f"{kind}_labels"], payload[f"{kind}_data"]))
+
+
+@override_settings(LEAGUE_CACHE_WARM="off")
+@PRIMARY_ONLY
+class ConditionalPageTests(TestCase):
+    """Season pages answer revalidations with a 304 until what they show changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025)
+        sharps, squares = (Team.objects.create(season=cls.season, name=n) for n in ("Sharps", "Squares"))
+        cls.bets = []
+        for name, team in (("ann", sharps), ("bob", squares)):
+            user = User.objects.create_user(name, password="pw")
+            TeamMembership.objects.create(user=user, team=team)
+            cls.bets.append(Bet.objects.create(user=user, team=team, season=cls.season, week=1, bet_type="SPREAD",
+                                               pick_text="x", line=1.5, american_odds=-110))
+        ledger.rebuild_season(cls.season)
+        # an hour back, so a change made during the test is a later second for If-Modified-Since
+        UnitsLedger.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("standings", args=[2025])
+
+    def test_etag_revalidation(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("private", first["Cache-Control"])
+        self.assertIn("no-cache", first["Cache-Control"])
+        etag = first["ETag"]
+        with self.assertNumQueries(2):  # season row, newest ledger row: no page queries
+            again = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+
+        settle_bet_outcomes({self.bets[0].pk: "WON"})
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_if_modified_since_revalidation(self):
+        first = self.client.get(self.url)
+        stamp = first["Last-Modified"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=stamp).status_code, 304)
+
+        settle_bet_outcomes({self.bets[1].pk: "LOST"})  # touches the ledger rows
+        changed = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=stamp)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["Last-Modified"], stamp)
+
+    def test_validators_name_the_viewer_and_drop_on_a_stale_body(self):
+        week = reverse("week_view", args=[2025, 1])
+        self.client.login(username="ann", password="pw")
+        etag = self.client.get(week)["ETag"]
+        self.assertEqual(self.client.get(week, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.login(username="bob", password="pw")  # other nav, other team's picks
+        self.assertEqual(self.client.get(week, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        real = league_cache.cached_payload
+
+        def stale(*args, **kwargs):
+            league_cache._local.stale = True  # as if the previous version was served during a rebuild
+            return real(*args, **kwargs)
+
+        with mock.patch("league.views.league_cache.cached_payload", side_effect=stale):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+
+@override_settings(LEAGUE_CACHE_WARM="off")
+@PRIMARY_ONLY
+class RevealSnapshotTests(TestCase):
+    """The frozen reveal page is served while its data_version is current, and rebuilt once it isn't."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025, start_date=date(2025, 9, 4))  # week 1 reveals Sun Sep 7, 1 PM ET
+        teams = [Team.objects.create(season=cls.season, name=n) for n in ("Sharps", "Squares")]
+        cls.bets = []
+        for i, name in enumerate(("ann", "bob", "cat")):
+            user = User.objects.create_user(name, password="pw")
+            for bt in ("SPREAD", "TOTAL"):
+                cls.bets.append(Bet.objects.create(
+                    user=user, team=teams[i % 2], season=cls.season, week=1, bet_type=bt, pick_text=f"{name} {bt}",
+                    line=1.5, american_odds=-110, over_under="OVER" if bt == "TOTAL" else None,
+                ))
+        cls.reveal_at = reveal.week_reveal_dt(cls.season, 1)
+
+    def setUp(self):
+        cache.clear()
+
+    def season_now(self):
+        return Season.objects.get(pk=self.season.pk)
+
+    def live(self, season):
+        return reveal._plain(dashboard_payload(season, *reveal.snapshot_parts(1)))
+
+    def build(self, **opts):
+        out = StringIO()
+        call_command("build_reveal_snapshots", season=2025, stdout=out, **opts)
+        return out.getvalue()
+
+    def test_due_weeks(self):
+        for offset, due in ((-20, []), (-10, [1]), (0, [1]), (5 * 60, [1]), (7 * 60, [])):
+            self.assertEqual(reveal.due_weeks(self.season, now=self.reveal_at + timedelta(minutes=offset)), due, offset)
+
+    def test_snapshot_is_reused_until_the_version_moves(self):
+        self.assertIn("W1: 6 bets", self.build(week=1))
+        self.assertEqual(self.build(week=1), "")  # current already: skipped
+        with self.assertNumQueries(1):
+            payload = reveal.snapshot_payload(self.season, 1)
+        self.assertEqual(payload, self.live(self.season))
+
+        settle_bet_outcomes({self.bets[0].pk: "WON"})
+        season = self.season_now()
+        self.assertGreater(season.data_version, self.season.data_version)
+        payload = reveal.snapshot_payload(season, 1)  # stale row: rebuilt on first touch
+        self.assertEqual(payload, self.live(season))
+        self.assertIn("WON", [b["status"] for b in payload["bets"]])
+        snapshot = RevealSnapshot.objects.get(season=season, week=1)
+        self.assertEqual((snapshot.data_version, snapshot.payload), (season.data_version, payload))
+        self.assertIn("W1: 6 bets", self.build(week=1, force=True))
+
+    def test_dashboard_serves_the_current_snapshot(self):
+        reveal.build_snapshot(self.season, 1)
+        ghost = {**RevealSnapshot.objects.get().payload["bets"][0], "pick_text": "frozen pick"}
+        RevealSnapshot.objects.update(payload={**RevealSnapshot.objects.get().payload, "bets": [ghost]})
+        url = reverse("league_dashboard", args=[2025])
+        self.client.login(username="ann", password="pw")
+
+        with mock.patch("django.utils.timezone.now", return_value=self.reveal_at + timedelta(minutes=1)):
+            self.assertContains(self.client.get(url, {"week": 1}), "frozen pick")
+            self.assertNotContains(self.client.get(url, {"week": 1, "user": "ann"}), "frozen pick")  # not the reveal page
+
+            league_cache.bump_season_version(self.season.pk)
+            cache.clear()
+            response = self.client.get(url, {"week": 1})
+        self.assertNotContains(response, "frozen pick")
+        self.assertContains(response, "cat TOTAL")
+        self.assertEqual(RevealSnapshot.objects.get().data_version, self.season_now().data_version)
+
+
+@PRIMARY_ONLY
+class FinalizeTests(TransactionTestCase):
+    """
+    A finished season is served from its static snapshot, and falls back to the
+    live pages while reopened. Transactional: the snapshot follows results in the
+    post-commit warm.
+    """
+
+    def setUp(self):
+        self.season = Season.objects.create(year=2025, start_date=date(2025, 9, 4))
+        sharps, squares = (Team.objects.create(season=self.season, name=n) for n in ("Sharps", "Squares"))
+        self.bets = []
+        for name, team, week, status in (("ann", sharps, 1, "WON"), ("ann", sharps, 2, "LOST"), ("bob", squares, 2, "PUSH")):
+            user, _ = User.objects.get_or_create(username=name)
+            self.bets.append(Bet.objects.create(  # every team-week has its parlay, or it stays pending
+                user=user, team=team, season=self.season, week=week, bet_type="SPREAD", pick_text=f"{name} W{week}",
+                line=1.5, american_odds=-110, status=status, parlay_selected=True,
+            ))
+        FuturePick.objects.create(team=squares, season=self.season, index=1, pick_text="KC", american_odds=500, status="LOST")
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        overrides = override_settings(SEASON_SNAPSHOT_DIR=self.root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.standings = reverse("standings", args=[2025])
+
+    def finalize(self, *args):
+        out = StringIO()
+        call_command("finalize_season", "2025", *args, stdout=out)
+        return out.getvalue()
+
+    def served(self, url, params=None, **headers):
+        """The snapshot's answer, checking it cost no queries."""
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params or {}, **headers)
+        self.assertIn(response.status_code, (200, 304))
+        return response
+
+    def body(self, response):
+        return b"".join(response.streaming_content) if response.streaming else response.content
+
+    def test_pending_results_block_finalizing(self):
+        settle_bets(Bet.objects.filter(pk=self.bets[2].pk), "PENDING")
+        with self.assertRaisesMessage(CommandError, "pending"):
+            self.finalize()
+        self.assertIsNone(Season.objects.get(pk=self.season.pk).finalized_at)
+        self.assertFalse(os.path.exists(finalize.season_dir(2025)))
+
+    def test_snapshot_serves_the_pages_without_queries(self):
+        self.assertIn("files in", self.finalize())
+        self.assertIsNotNone(Season.objects.get(pk=self.season.pk).finalized_at)
+
+        response = self.served(self.standings)
+        self.assertEqual(self.body(response), finalize._render(self.standings, {}))
+        self.assertEqual(self.served(self.standings, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertIn(b"bob W2", self.body(self.served(reverse("league_dashboard", args=[2025]), {"week": 2})))
+        self.assertContains(self.client.get(reverse("league_dashboard", args=[2025]), {"week": 2, "user": "ann"}), "ann W2")
+
+        charts = reverse("standings_chart_data", args=[2025])
+        full = json.loads(self.body(self.served(charts)))
+        self.assertEqual(full["weeks"], [0, 1, 2])
+        self.assertEqual(json.loads(self.body(self.served(charts, {"since_week": 2})))["weeks"], [])
+        self.assertEqual(json.loads(self.body(self.served(charts, {"since_week": 1}))), full)  # no delta file: the full series
+
+        self.assertIn("back to live", self.finalize("--undo"))
+        self.assertIsNone(Season.objects.get(pk=self.season.pk).finalized_at)
+        self.assertFalse(os.path.exists(finalize.season_dir(2025)))
+
+    def test_snapshot_follows_results_whatever_the_warm_mode(self):
+        self.finalize()
+        before = self.body(self.served(self.standings))
+        for mode in ("off", "background"):
+            with self.settings(LEAGUE_CACHE_WARM=mode), mock.patch.object(league_cache.threading, "Thread"):
+                settle_bets(Bet.objects.filter(pk=self.bets[1].pk), "PENDING")
+                self.assertFalse(os.path.exists(finalize.season_dir(2025)), mode)  # dropped at commit, not by a warm
+                settle_bets(Bet.objects.filter(pk=self.bets[1].pk), "LOST")
+                self.assertEqual(self.body(self.served(self.standings)), before, mode)
+
+    def test_reopened_result_drops_the_snapshot_until_it_settles_again(self):
+        self.finalize()
+        before = self.body(self.served(self.standings))
+
+        settle_bets(Bet.objects.filter(pk=self.bets[1].pk), "PENDING")  # the post-commit warm drops the files
+        self.assertFalse(os.path.exists(finalize.season_dir(2025)))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.standings).status_code, 200)
+        self.assertTrue(queries)  # the live view
+
+        settle_bets(Bet.objects.filter(pk=self.bets[1].pk), "WON")  # ... and renders them again
+        after = self.body(self.served(self.standings))
+        self.assertNotEqual(after, before)
+        self.assertEqual(after, finalize._render(self.standings, {}))
+
+
+@override_settings(LEAGUE_CACHE_WARM="off")
+@PRIMARY_ONLY
+class ArchiveTests(TestCase):
+    """Archiving moves a settled season's bets out of Bet and back, row for row; nothing derived moves."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season, cls.other = Season.objects.create(year=2024), Season.objects.create(year=2025)
+        for season in (cls.season, cls.other):
+            teams = [Team.objects.create(season=season, name=n) for n in ("Sharps", "Squares")]
+            for i, name in enumerate(("ann", "bob", "cat")):
+                user, _ = User.objects.get_or_create(username=name)
+                for week, status in ((1, "WON"), (2, "LOST"), (3, "PUSH")):
+                    Bet.objects.create(user=user, team=teams[i % 2], season=season, week=week, bet_type="SPREAD",
+                                       pick_text=f"{name} W{week}", line=-2.5, american_odds=120 - 40 * i,
+                                       status=status, parlay_selected=True, settled_at=timezone.now())
+        recompute_team_parlays(set(Bet.objects.values_list("team_id", "season_id", "week")))
+        ledger.rebuild_season(cls.season)
+
+    def rows(self, model, season):
+        return list(model.objects.filter(season=season).order_by("id").values_list(*ARCHIVED_BET_FIELDS))
+
+    def derived(self):
+        return (
+            sorted(UnitsLedger.objects.values_list("season_id", "team_id", "user_key", "week", "source", "units")),
+            sorted(TeamParlay.objects.values_list("id", "status", "decimal_odds")),
+        )
+
+    def run_command(self, *args):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):  # whatever the move queues runs
+            call_command("archive_season", "2024", *args, stdout=out)
+        return out.getvalue()
+
+    def test_round_trip(self):
+        live, other, derived = self.rows(Bet, self.season), self.rows(Bet, self.other), self.derived()
+        standings = standings_payload(self.season)
+
+        with mock.patch("league.archive.BATCH_SIZE", 4):  # 9 rows: two full batches and a tail
+            self.assertIn("9 bets archived", self.run_command())
+        self.season.refresh_from_db()
+        self.assertIsNotNone(self.season.archived_at)
+        self.assertFalse(Bet.objects.filter(season=self.season).exists())
+        self.assertEqual(self.rows(BetArchive, self.season), live)  # ids, odds and PnL included
+        self.assertEqual(list(bets_for(self.season).order_by("id").values_list(*ARCHIVED_BET_FIELDS)), live)
+        self.assertEqual(self.rows(Bet, self.other), other)
+        self.assertEqual(self.derived(), derived)
+        self.assertEqual(standings_payload(self.season), standings)
+
+        with mock.patch("league.archive.BATCH_SIZE", 4):
+            self.assertIn("9 bets restored", self.run_command("--restore"))
+        self.season.refresh_from_db()
+        self.assertIsNone(self.season.archived_at)
+        self.assertEqual(self.rows(Bet, self.season), live)  # generated odds and PnL come back the same
+        self.assertFalse(BetArchive.objects.exists())
+        self.assertEqual(self.derived(), derived)
+
+    def test_archived_season_takes_no_picks(self):
+        self.run_command()
+        self.season.refresh_from_db()
+        user = User.objects.get(username="ann")
+        TeamMembership.objects.create(user=user, team=Team.objects.get(season=self.season, name="Sharps"))
+        self.client.force_login(user)
+        ledger_rows = self.derived()[0]
+
+        response = self.client.post(reverse("submit_pick", args=[2024, 1]), pick_form_data())
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Bet.objects.filter(season=self.season).exists())
+        with self.assertRaises(ValueError):
+            submit_week_picks(user, Team.objects.get(season=self.season, name="Sharps"), self.season, 1, [])
+
+        # a stray refresh re-aggregates the archived rows instead of zeroing the week
+        ledger.refresh_bets(BetArchive.objects.values_list("season_id", "team_id", "user_id", "week"))
+        self.assertEqual(self.derived()[0], ledger_rows)
+
+        picker = self.client.get(reverse("submit_pick_week_picker", args=[2024]))
+        self.assertEqual(sorted(picker.context["weeks_with_any"]), [1, 2, 3])  # read from the archive
+        self.assertEqual(sorted(picker.context["weeks_parlay"]), [1, 2, 3])
+
+    def test_refusals(self):
+        with self.assertRaisesMessage(CommandError, "not archived"):
+            self.run_command("--restore")
+        settle_bets(Bet.objects.filter(season=self.season, week=3), "PENDING")
+        with self.assertRaisesMessage(CommandError, "pending"):
+            self.run_command()
+        self.assertEqual(BetArchive.objects.count(), 0)
+
+        settle_bets(Bet.objects.filter(season=self.season, week=3), "PUSH")
+        self.run_command()
+        with self.assertRaisesMessage(CommandError, "already archived"):
+            self.run_command()
+
+
+@PRIMARY_ONLY
+class AdminSettlementTests(TestCase):
+    """The bulk admin actions settle through the services: parlays and the ledger follow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025)
+        cls.teams = [Team.objects.create(season=cls.season, name=n) for n in ("Sharps", "Squares")]
+        cls.bets = []
+        for i, team in enumerate(cls.teams * 2):
+            user = User.objects.create_user(f"u{i}")
+            cls.bets.append(Bet.objects.create(
+                user=user, team=team, season=cls.season, week=1, bet_type="SPREAD", pick_text="x",
+                line=1.5, american_odds=-110, parlay_selected=True,
+            ))
+        # the creates queued their parlay/ledger work for a commit a TestCase never makes
+        recompute_team_parlays({(t.id, cls.season.id, 1) for t in cls.teams})
+        ledger.rebuild_season(cls.season)
+        User.objects.create_superuser("boss", password="pw")
+
+    def setUp(self):
+        self.client.login(username="boss", password="pw")
+
+    def act(self, model, action, objs):
+        response = self.client.post(reverse(f"admin:league_{model}_changelist"), {
+            "action": action, "_selected_action": [o.pk for o in objs],
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def parlays(self):
+        return dict(TeamParlay.objects.filter(season=self.season, week=1).values_list("team__name", "status"))
+
+    def assertLedgerMatchesRebuild(self):
+        fields = ("team_id", "user_key", "week", "source", "units", "wins", "losses", "pushes")
+        kept = sorted(UnitsLedger.objects.filter(season=self.season).values_list(*fields))
+        ledger.rebuild_season(self.season)
+        self.assertEqual(kept, sorted(UnitsLedger.objects.filter(season=self.season).values_list(*fields)))
+
+    def test_bet_actions_reprice_every_touched_parlay(self):
+        self.act("bet", "mark_won", self.bets)  # both legs of both teams
+        self.assertEqual(set(Bet.objects.values_list("status", flat=True)), {"WON"})
+        self.assertEqual(self.parlays(), {"Sharps": "WON", "Squares": "WON"})
+        self.assertLedgerMatchesRebuild()
+
+        self.act("bet", "mark_lost", [self.bets[1]])  # one Squares leg
+        self.act("bet", "mark_pending", [self.bets[0]])  # one Sharps leg
+        self.assertEqual(self.parlays(), {"Sharps": "PENDING", "Squares": "LOST"})
+        self.assertIsNone(Bet.objects.get(pk=self.bets[0].pk).settled_at)
+        self.assertLedgerMatchesRebuild()
+
+    def test_parlay_override_holds_until_a_leg_changes(self):
+        sharps = TeamParlay.objects.filter(team=self.teams[0])
+        self.act("teamparlay", "parlay_won", sharps)  # legs still pending
+        self.assertEqual(self.parlays()["Sharps"], "WON")
+        self.assertEqual(UnitsLedger.objects.get(team=self.teams[0], source="PARLAY").wins, 1)
+        self.assertLedgerMatchesRebuild()
+
+        self.act("teamparlay", "settle_parlay_from_legs", sharps)  # back to what the legs say
+        self.assertEqual(self.parlays()["Sharps"], "PENDING")
+
+        self.act("teamparlay", "parlay_lost", sharps)
+        self.act("bet", "mark_won", [self.bets[0]])  # a leg change re-derives the status
+        self.assertEqual(self.parlays()["Sharps"], "PENDING")
+        self.assertLedgerMatchesRebuild()
+
+    def test_recompute_parlay_odds_is_one_pass_however_many_parlays(self):
+        Bet.objects.filter(pk=self.bets[0].pk).update(american_odds=150)  # a Sharps leg, behind the signals' back
+        parlays = TeamParlay.objects.filter(season=self.season, week=1).order_by("team__name")
+        counts = []
+        for selected in (parlays[:1], parlays):
+            with CaptureQueriesContext(connection) as ctx:
+                self.act("teamparlay", "recompute_parlay_odds", selected)
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1])
+        odds = dict(parlays.values_list("team__name", "decimal_odds"))
+        self.assertEqual(odds, {"Sharps": round(2.5 * (1 + 100 / 110), 4), "Squares": round((1 + 100 / 110) ** 2, 4)})
+        self.assertLedgerMatchesRebuild()
+
+
+@PRIMARY_ONLY
+class DashboardPagingTests(TestCase):
+    """Keyset pages of the dashboard's bets table: every row exactly once, in order, at any page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025, start_date=date(2025, 9, 4))
+        teams = [Team.objects.create(season=cls.season, name=n) for n in ("Sharps", "Squares")]
+        for i, name in enumerate(("cat", "ann", "bob")):  # ids don't follow the username order
+            user = User.objects.create_user(name, password="pw")
+            for week in (2, 1):
+                for bt in ("TOTAL", "SPREAD", "PROP"):
+                    Bet.objects.create(
+                        user=user, team=teams[i % 2], season=cls.season, week=week, bet_type=bt,
+                        pick_text="x", line=1.5, american_odds=-110, over_under="OVER",
+                        parlay_selected=bt == "SPREAD", status="WON" if bt != "PROP" or week == 1 else "PENDING",
+                    )
+        TeamParlay.objects.create(team=teams[0], season=cls.season, week=1, decimal_odds=3.0, status="LOST")
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self, **filters):
+        settled = Bet.objects.filter(season=self.season, **filters).exclude(status="PENDING")
+        return list(settled.order_by("week", "team__name", "user__username", "bet_type", "id").values_list("id", flat=True))
+
+    def walk(self, size, sel_week="", sel_user=""):
+        pages, after = [], ""
+        with mock.patch("league.views.DASHBOARD_PAGE_SIZE", size):
+            while True:
+                payload = dashboard_payload(self.season, sel_week, sel_user, "", "", False, after)
+                pages.append([b.id for b in payload["bets"]])
+                after = payload["next_cursor"]
+                if not after:
+                    return pages
+
+    def test_pages_cover_every_row_once(self):
+        rows = self.expected()
+        self.assertEqual(len(rows), 15)
+        for size in (1, 2, 4, 5, 15, 50):
+            pages = self.walk(size)
+            self.assertEqual([i for page in pages for i in page], rows, size)
+            self.assertEqual(len(pages), max(1, -(-len(rows) // size)), size)  # no empty page after an exact fit
+            self.assertTrue(all(0 < len(page) <= size for page in pages), size)
+
+    def test_filtered_pages_and_bad_cursors(self):
+        self.assertEqual(sum(self.walk(2, sel_user="bob"), []), self.expected(user__username="bob"))
+        self.assertEqual(sum(self.walk(3, sel_week="2"), []), self.expected(week=2))
+        first = dashboard_payload(self.season, "", "", "", "", False)
+        junk = ["nope", "bm9wZQ", "WzFd"]  # not base64 json, not a list, wrong length
+        for values in (["x", "a", "b", "c", "d"], [1, "a", "b", "c", "2"], [1, 2, "b", "c", 3], [True, "a", "b", "c", 3],
+                       [1, None, "b", "c", 3]):  # well-formed, wrong types
+            junk.append(base64.urlsafe_b64encode(json.dumps(values).encode()).decode())
+        for token in junk:
+            page = dashboard_payload(self.season, "", "", "", "", False, token)
+            self.assertEqual([b.id for b in page["bets"]], [b.id for b in first["bets"]], token)
+        self.client.login(username="ann", password="pw")
+        response = self.client.get(reverse("league_dashboard", args=[2025]), {"after": junk[3]})
+        self.assertEqual(response.status_code, 200)
+
+    def test_view_pager_keeps_filters(self):
+        self.client.login(username="ann", password="pw")
+        url = reverse("league_dashboard", args=[2025])
+        seen, query = [], "parlay=no"
+        with mock.patch("league.views.DASHBOARD_PAGE_SIZE", 4):
+            while query:
+                response = self.client.get(f"{url}?{query}")
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("parlay=no", query)
+                if seen:
+                    self.assertEqual(response.context["parlays"], [])  # parlays ride on the first page only
+                seen += [b.id for b in response.context["bets"]]
+                query = response.context["next_query"]
+        self.assertEqual(seen, self.expected(parlay_selected=False))
+
+
+@PRIMARY_ONLY
+class ExportTests(TestCase):
+    """The streamed export is the season's data, row for row, in either format."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.season = Season.objects.create(year=2025)
+        cls.sharps, cls.squares = (Team.objects.create(season=cls.season, name=n) for n in ("Sharps", "Squares"))
+        for name, team, week, bt, odds, status in (
+            ("ann", cls.sharps, 1, "SPREAD", 150, "WON"), ("ann", cls.sharps, 2, "TOTAL", -110, "PENDING"),
+            ("bob", cls.squares, 1, "PROP", -120, "LOST"), ("bob", cls.squares, 2, "SPREAD", 100, "PUSH"),
+        ):
+            user, _ = User.objects.get_or_create(username=name)
+            Bet.objects.create(user=user, team=team, season=cls.season, week=week, bet_type=bt, pick_text=f'{name}, "{bt}"',
+                               line=-3.5, american_odds=odds, over_under="OVER" if bt != "SPREAD" else None, status=status,
+                               settled_at=timezone.now() if status != "PENDING" else None, parlay_selected=week == 1)
+        TeamParlay.objects.create(team=cls.sharps, season=cls.season, week=1, decimal_odds=2.5, status="WON")
+        FuturePick.objects.create(team=cls.squares, season=cls.season, index=1, pick_text="KC", american_odds=500)
+        User.objects.create_user("boss", password="pw", is_staff=True)
+
+    def setUp(self):
+        self.client.login(username="boss", password="pw")
+
+    def export(self, **params):
+        response = self.client.get(reverse("export_season", args=[2025]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_and_ndjson_carry_the_same_rows(self):
+        rows = list(csv.DictReader(StringIO(self.export(format="csv"))))
+        lines = [json.loads(l) for l in self.export(format="ndjson").splitlines()]
+        self.assertEqual(list(rows[0]), exports.COLUMNS)
+        self.assertEqual([(r["kind"], r["user"], r["pick_text"]) for r in rows],
+                         [(l["kind"], l["user"] or "", l["pick_text"] or "") for l in lines])
+        self.assertEqual([r["kind"] for r in rows], ["bet"] * 4 + ["parlay", "future"])
+        self.assertEqual(rows[0]["pick_text"], 'ann, "SPREAD"')  # quoting survives the round trip
+
+        bets = {(b.user.username, b.week): b for b in Bet.objects.select_related("user")}
+        for line in lines[:4]:
+            bet = bets[(line["user"], line["week"])]
+            self.assertEqual((line["bet_type"], line["status"], line["american_odds"]), (bet.bet_type, bet.status, bet.american_odds))
+            self.assertEqual(line["pnl_units"], round(bet.pnl_units, 4))
+            self.assertEqual(line["settled_at"], bet.settled_at.isoformat() if bet.settled_at else None)
+        self.assertAlmostEqual(sum(l["pnl_units"] for l in lines), 1.5 - 1 + 0 + 1.5 + 0)
+
+    def test_filters(self):
+        week1 = [json.loads(l) for l in self.export(format="ndjson", week=1).splitlines()]
+        self.assertEqual([(l["kind"], l["week"]) for l in week1], [("bet", 1), ("bet", 1), ("parlay", 1)])  # no futures
+        squares = [json.loads(l) for l in self.export(format="ndjson", team=self.squares.pk).splitlines()]
+        self.assertEqual({l["team"] for l in squares}, {"Squares"})
+        self.assertEqual([l["kind"] for l in squares], ["bet", "bet", "future"])
+
+        url = reverse("export_season", args=[2025])
+        for params in ({"format": "xml"}, {"week": "one"}, {"team": "999"}, {"team": "x"}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+
+class MetricsTests(TestCase):
+    """/metrics speaks the Prometheus text format and merges every worker's numbers."""
+
+    SAMPLE = re.compile(r'^([a-z_]+)(\{(?:[a-z_]+="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        overrides = override_settings(METRICS_DIR=self.dir, METRICS_FLUSH_SECONDS=3600, METRICS_TOKEN="s3cret")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        fresh = mock.patch.dict(league_metrics._state, {"histograms": {}, "counters": {}})  # this process's numbers
+        fresh.start()
+        self.addCleanup(fresh.stop)
+
+    def parse(self, text):
+        """{family: type}, [(name, labels dict, value)], checking the exposition grammar line by line."""
+        types, samples = {}, []
+        self.assertTrue(text.endswith("\n"))
+        for line in text.splitlines():
+            if line.startswith("# TYPE "):
+                _, _, name, kind = line.split(" ")
+                types[name] = kind
+            elif line.startswith("# HELP "):
+                self.assertNotIn(line.split(" ")[2], types)  # HELP comes before TYPE and the samples
+            else:
+                m = self.SAMPLE.match(line)
+                self.assertIsNotNone(m, line)
+                family = re.sub(r"_(bucket|sum|count)$", "", m[1]) if m[1] not in types else m[1]
+                self.assertIn(family, types, line)  # every sample follows its family's TYPE
+                labels = dict(re.findall(r'([a-z_]+)="((?:[^"\\]|\\.)*)"', m[2] or ""))
+                samples.append((m[1], labels, float(m[3])))
+        return types, samples
+
+    def test_histograms_and_counters(self):
+        for seconds, queries in ((0.003, 0), (0.2, 7), (30.0, 900)):
+            league_metrics.record_request("week_view", "GET", 200, seconds, queries, seconds / 2)
+        league_metrics.record_request('odd "view"\nname', "POST", 500, 0.01, 1, 0.001)
+        types, samples = self.parse(league_metrics.render())
+
+        self.assertEqual(types["league_request_duration_seconds"], "histogram")
+        self.assertEqual(types["league_requests_total"], "counter")
+        self.assertEqual(types["league_metrics_workers"], "gauge")
+        week = [(n, l, v) for n, l, v in samples if l.get("view") == "week_view"]
+        buckets = [(l["le"], v) for n, l, v in week if n == "league_request_duration_seconds_bucket"]
+        self.assertEqual([le for le, _ in buckets], [*map(str, league_metrics.LATENCY_BUCKETS), "+Inf"])
+        counts = [v for _, v in buckets]
+        self.assertEqual(counts, sorted(counts))  # cumulative
+        self.assertEqual((counts[0], counts[-2], counts[-1]), (1, 2, 3))  # 30s only lands in +Inf
+        total = {n: v for n, l, v in week if n.endswith(("_sum", "_count"))}
+        self.assertEqual(total["league_request_duration_seconds_count"], 3)
+        self.assertAlmostEqual(total["league_request_duration_seconds_sum"], 30.203)
+        self.assertIn(("league_requests_total", {"view": "week_view", "method": "GET", "status": "200"}, 3.0), samples)
+        self.assertIn({"view": 'odd \\"view\\"\\nname', "method": "POST", "status": "500"},
+                      [l for n, l, _ in samples if n == "league_requests_total"])  # escaped, still one line
+
+    def test_workers_merge_and_the_endpoint(self):
+        league_metrics.record_request("standings", "GET", 200, 0.05, 3, 0.01)
+        league_metrics.flush()
+        os.rename(os.path.join(self.dir, f"{os.getpid()}.json"), os.path.join(self.dir, "1.json"))  # another worker's
+        with open(os.path.join(self.dir, "2.json"), "w") as f:
+            f.write("{half a fi")  # mid-write garbage is skipped
+        with open(os.path.join(self.dir, "3.json"), "w") as f:
+            f.write("[]")  # and so is a stray file
+
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response["Content-Type"], league_metrics.CONTENT_TYPE)
+        _, samples = self.parse(response.content.decode())
+        self.assertIn(("league_metrics_workers", {}, 2.0), samples)
+        self.assertIn(("league_requests_total", {"view": "standings", "method": "GET", "status": "200"}, 2.0), samples)
+        self.assertEqual(self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer nope").status_code, 302)
@@ -9,10 +9,14 @@ urlpatterns = [
     path("pick/<int:season_year>/<int:week>/submit/", views.submit_pick, name="submit_pick"),
     path("dashboard/<int:season_year>/", views.league_dashboard, name="league_dashboard"),
     path("standings/<int:season_year>/", views.standings, name="standings"),
+    path("standings/<int:season_year>/chart-data/", views.standings_chart_data, name="standings_chart_data"),
     path("submit/<int:season_year>/", views.submit_pick_week_picker, name="submit_pick_week_picker"),
     path("stats/<str:username>/", views.user_stats, name="user_stats"),
     path("accounts/profile/", views.landing, name="profile_redirect"),
     path("futures/<int:season_year>/", views.futures_board,  name="futures_board"),
     path("futures/<int:season_year>/edit/", views.submit_futures, name="submit_futures"),
+    path("export/<int:season_year>/", views.export_season, name="export_season"),
+    path("exposure/<int:season_year>/", views.exposure_report, name="exposure_report"),
+    path("metrics", views.metrics, name="metrics"),
 ]
 
@@ -3,45 +3,123 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.contrib.auth.models import User
-from .models import Season, TeamMembership, Bet, TeamParlay, FuturePick
+from .models import Season, Team, TeamMembership, Bet, BetArchive, TeamParlay, FuturePick, UnitsLedger, bets_for
 from django.http import HttpResponseForbidden
 from django import forms
-from .sevices import recompute_team_parlay
-from django.db.models import Sum, F, Case, When, FloatField, IntegerField
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Max
 from .forms import BetSimpleForm
-import json
+import hashlib
 from django.contrib import messages
 from django.conf import settings
-from django.db.models import IntegerField, Count
-from datetime import datetime, time, timedelta
 from zoneinfo import ZoneInfo
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, HttpResponseBadRequest
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from django.contrib.admin.views.decorators import staff_member_required
 from collections import defaultdict, Counter
+from itertools import chain
+from functools import wraps
 from .models import FuturePick
 from .forms import FuturesForm
-from django.db import transaction
+from django.db import connections, transaction
+from . import cache as league_cache
+from . import reveal
+from .replica import read_only_view
+from .reveal import week_reveal_dt, futures_reveal_dt
+from . import metrics as league_metrics
+from .sevices import submit_week_picks
+from .pagination import keyset_page
+from .exports import EXPORT_FORMATS, iter_export
+from .models import Exposure
+from . import exposure as league_exposure
 
 class BetForm(forms.ModelForm):
     class Meta:
         model = Bet
         fields = ["pick_text", "line", "american_odds", "parlay_selected","over_under"]  # stake_units fixed at 1 for now
 
-def week_reveal_dt(season, week: int, hour: int = 13, minute: int = 0):
+# ----- conditional GET for the read-heavy season pages -----
+def _page_validators(request, kind: str, season_year: int, week=None):
     """
-    Reveal time for a given NFL week = Sunday 1:00pm ET.
-    We anchor to the first Sunday on/after season.start_date, then add N-1 weeks.
+    (etag, last_modified) for a season page, computed once per request.
+    data_version moves when results or public picks change (league/cache.py)
+    and the newest ledger row of the season/week when any pick does (own
+    team's pending rows, futures before their settlement), so together with the
+    viewer (nav, own team) and any time-based reveal they name the rendered
+    page. That ledger time (or the reveal moment) is also the Last-Modified
+    for clients that don't send ETags.
     """
-    base_date = season.start_date
-    # Move to Sunday (weekday: Mon=0 ... Sun=6)
-    sunday = base_date + timedelta(days=(6 - base_date.weekday()) % 7)
-    return datetime.combine(sunday, time(hour, minute), tzinfo=ZoneInfo("America/New_York")) + timedelta(weeks=week - 1)
-
-def futures_reveal_dt(season_year: int):
-    # Sep 4, 8:00 PM in America/New_York for the given season year
-    return datetime(season_year, 9, 4, 20, 0, tzinfo=ZoneInfo("America/New_York"))
+    memo = getattr(request, "_league_validators", None)
+    if memo is not None:
+        return memo
+    row = Season.objects.filter(year=season_year).values_list("pk", "data_version", "start_date").first()
+    if row is None:
+        request._league_validators = (None, None)  # let the view 404
+        return request._league_validators
+    season_pk, version, start_date = row
+
+    user = getattr(request, "user", None)
+    viewer = user.pk if user is not None and user.is_authenticated else None
+    team = None
+    if kind == "week" and viewer:
+        team = (
+            TeamMembership.objects.filter(user_id=viewer, team__season_id=season_pk)
+            .values_list("team_id", flat=True).first()
+        )
 
+    revealed_at = None
+    now = timezone.now()
+    if kind == "dashboard" and request.GET.get("week", "").strip().isdigit() and start_date:
+        at = week_reveal_dt(Season(year=season_year, start_date=start_date), int(request.GET["week"]))
+        revealed_at = at if now >= at else None
+    elif kind == "futures":
+        at = futures_reveal_dt(season_year)
+        revealed_at = at if now >= at else None
+
+    ledger_rows = UnitsLedger.objects.filter(season_id=season_pk)
+    if week is not None:
+        ledger_rows = ledger_rows.filter(week=week)
+    last_modified = ledger_rows.aggregate(m=Max("updated_at"))["m"]
+    if revealed_at and (last_modified is None or revealed_at > last_modified):
+        last_modified = revealed_at
+
+    parts = (kind, week, viewer, team, bool(revealed_at), last_modified)
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()[:12]
+    request._league_validators = (f"{kind}-{season_pk}-v{version}-{digest}", last_modified)
+    return request._league_validators
+
+def conditional_page(kind: str):
+    """
+    condition() for a season page: matching If-None-Match / If-Modified-Since
+    get a 304 before the view's queries run. Responses are private and
+    no-cache so browsers always revalidate instead of guessing freshness.
+    """
+    def etag(request, season_year, week=None):
+        return _page_validators(request, kind, season_year, week)[0]
+
+    def last_modified(request, season_year, week=None):
+        return _page_validators(request, kind, season_year, week)[1]
+
+    def decorator(view):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            league_cache.stale_served()  # reset
+            response = conditional(request, *args, **kwargs)
+            if league_cache.stale_served():
+                # body is the previous version's (a rebuild is in flight): don't let it be revalidated as current
+                response.headers.pop("ETag", None)
+                response.headers.pop("Last-Modified", None)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapped
+    return decorator
+
+@read_only_view
+@conditional_page("futures")
 def futures_board(request, season_year: int):
     season = get_object_or_404(Season, year=season_year)
 
@@ -67,6 +145,8 @@ def home(request):
     seasons = Season.objects.order_by("-year")
     return render(request, "league/home.html", {"seasons": seasons})
 
+@read_only_view
+@conditional_page("week")
 def week_view(request, season_year: int, week: int):
     season = get_object_or_404(Season, year=season_year)
 
@@ -86,8 +166,8 @@ def week_view(request, season_year: int, week: int):
             q |= Q(status="PENDING", team=membership.team)
 
     bets = (
-        Bet.objects
-        .filter(season=season, week=week)
+        bets_for(season)
+        .filter(week=week)
         .filter(q)
         .select_related("user", "team")
         .order_by("team__name", "user__username", "bet_type")
@@ -100,6 +180,8 @@ def week_view(request, season_year: int, week: int):
 @login_required
 def submit_pick(request, season_year: int, week: int):
     season = get_object_or_404(Season, year=season_year)
+    if season.archived_at:
+        return HttpResponseForbidden("This season is archived; picks are closed.")
     membership = (
         TeamMembership.objects
         .filter(user=request.user, team__season=season)
@@ -110,10 +192,13 @@ def submit_pick(request, season_year: int, week: int):
         return HttpResponseForbidden("You are not assigned to a team for this season.")
 
     bt_types = ["SPREAD", "TOTAL", "PROP"]
-    instances = {
-        bt: Bet.objects.filter(user=request.user, season=season, week=week, bet_type=bt).first()
-        for bt in bt_types
+    # all of this user's picks for the week in one query
+    existing = {
+        b.bet_type: b
+        for b in Bet.objects.filter(user=request.user, season=season, week=week, bet_type__in=bt_types)
     }
+    # unsaved instances carry their bet_type so Bet.clean() keeps Over/Under on new Totals/Props
+    instances = {bt: existing.get(bt) or Bet(bet_type=bt) for bt in bt_types}
 
     if request.method == "POST":
         forms = {
@@ -131,21 +216,18 @@ def submit_pick(request, season_year: int, week: int):
 
         # STRICT: all three forms must be valid; otherwise nothing saves
         if all(f.is_valid() for f in forms.values()):
+            bets = []
             for bt, form in forms.items():
                 bet = form.save(commit=False)
-                bet.user = request.user
-                bet.team = membership.team
-                bet.season = season
-                bet.week = week
                 bet.bet_type = bt
                 bet.parlay_selected = (
                     request.POST.get(f"{bt}-parlay_selected") == "on"
                     if selected_count == 1 else False
                 )
-                bet.save()
+                bets.append(bet)
 
-            # recompute team parlay
-            recompute_team_parlay(membership.team, season_year, week)
+            # one upsert for all three picks, one parlay recompute
+            submit_week_picks(request.user, membership.team, season, week, bets)
 
             messages.success(request, f"Picks saved for Week {week} ({season_year}).")
             return redirect("submit_pick_week_picker", season_year=season.year)
@@ -163,36 +245,98 @@ def submit_pick(request, season_year: int, week: int):
         "season": season, "week": week, "forms": forms
     })
 
+@read_only_view
+@conditional_page("dashboard")
 def league_dashboard(request, season_year: int):
     season = get_object_or_404(Season, year=season_year)
 
-    # ----- filter choices (populates dropdowns) -----
-    weeks_bets    = set(Bet.objects.filter(season=season).values_list("week", flat=True).distinct())
-    weeks_parlays = set(TeamParlay.objects.filter(season=season).values_list("week", flat=True).distinct())
-    filter_weeks  = sorted(weeks_bets | weeks_parlays)
-
-    filter_users  = User.objects.filter(bets__season=season).distinct().order_by("username")
-    filter_teams  = season.teams.order_by("name")
-
     # ----- selected filters from query string -----
     sel_week   = request.GET.get("week", "").strip()
     sel_user   = request.GET.get("user", "").strip()
     sel_team   = request.GET.get("team", "").strip()    # team id
     sel_parlay = request.GET.get("parlay", "").strip()  # '', 'yes', 'no'
+    after      = request.GET.get("after", "").strip()   # keyset cursor for the bets table
+
+    # ----- reveal logic (only for a specific week) -----
+    try:
+        week_for_reveal = int(sel_week) if sel_week else None
+    except ValueError:
+        week_for_reveal = None
+
+    now_et = timezone.now().astimezone(ZoneInfo("America/New_York"))
+    reveal_is_open = False
+    reveal_at = None
 
-    # ----- small helper: 1:00pm ET Sunday for given week -----
-    def _week_reveal_dt(szn: Season, week: int, hour: int = 13, minute: int = 0):
-        """
-        Reveal time = first Sunday on/after season.start_date, + (week-1) weeks, at 1:00pm ET.
-        """
-        base = szn.start_date
-        first_sunday = base + timedelta(days=(6 - base.weekday()) % 7)  # Mon=0..Sun=6
-        return datetime.combine(first_sunday, time(hour, minute), tzinfo=ZoneInfo("America/New_York")) + timedelta(weeks=week - 1)
+    if week_for_reveal:
+        reveal_at = week_reveal_dt(season, week_for_reveal)
+        reveal_is_open = now_et >= reveal_at
 
-    # ----- base querysets (do NOT exclude pending yet) -----
+    # reveal state is part of the key: pending rows appear at reveal time without a version bump
+    parts = league_cache.dashboard_cache_parts(
+        sel_week, sel_user, sel_team, sel_parlay, reveal_is_open, after, reveal.revealed_through(season),
+    )
+    build = lambda: dashboard_payload(season, *parts)
+    if reveal_is_open and parts == reveal.snapshot_parts(week_for_reveal):
+        # the page everyone opens at 1 PM Sunday: served from the pre-built snapshot on a cache miss
+        build = lambda: reveal.snapshot_payload(season, week_for_reveal)
+    payload = league_cache.cached_payload("dashboard", season, build, *parts)
+
+    # pager links keep the current filters
+    q = request.GET.copy()
+    q.pop("after", None)
+    first_query = q.urlencode()
+    next_query = None
+    if payload["next_cursor"]:
+        q["after"] = payload["next_cursor"]
+        next_query = q.urlencode()
+
+    return render(request, "league/dashboard.html", {
+        "season": season,
+        **payload,
+        "paged": bool(after),
+        "next_query": next_query,
+        "first_query": first_query,
+
+        # filter widgets
+        "sel_week": sel_week,
+        "sel_user": sel_user,
+        "sel_team": sel_team,
+        "sel_parlay": sel_parlay,
+
+        # reveal info (use in a banner if you want)
+        "reveal_is_open": reveal_is_open,
+        "reveal_at_et": reveal_at,
+        "now_et": now_et,
+    })
+
+DASHBOARD_PAGE_SIZE = 100
+DASHBOARD_BET_ORDER = ("week", "team__name", "user__username", "bet_type", "id")
+
+def dashboard_payload(season, sel_week, sel_user, sel_team, sel_parlay, reveal_is_open, after="", revealed=0) -> dict:
+    """One page of rows plus dropdown choices for a dashboard filter combination (cached per data_version)."""
+    # ----- filter choices (populates dropdowns) -----
+    # one read of the ledger (a row per user/week and team/week) instead of distinct() scans of Bet;
+    # only rows something is shown for (settled, or revealed through `revealed`), so picks
+    # submitted ahead of their reveal don't need a version bump
+    choices = (
+        UnitsLedger.objects.filter(season=season)
+        .exclude(source="FUTURE")
+        .filter(Q(week__lte=revealed) | Q(wins__gt=0) | Q(losses__gt=0) | Q(pushes__gt=0))
+        .values_list("week", "user__username")
+        .distinct()
+    )
+    weeks, usernames = set(), set()
+    for week, uname in choices:
+        weeks.add(week)
+        if uname:
+            usernames.add(uname)
+    filter_weeks  = sorted(weeks)
+    filter_users  = sorted(usernames)
+    filter_teams  = list(season.teams.order_by("name"))
+
+    # ----- base querysets (do NOT exclude pending yet); pnl_units is a generated column -----
     bets = (
-        Bet.objects
-        .filter(season=season)
+        bets_for(season)
         .select_related("team", "user")
     )
     parlays = (
@@ -201,19 +345,12 @@ def league_dashboard(request, season_year: int):
         .select_related("team")
     )
 
-    # ----- reveal logic (only for a specific week) -----
     try:
         week_for_reveal = int(sel_week) if sel_week else None
     except ValueError:
         week_for_reveal = None
 
-    now_et = timezone.now().astimezone(ZoneInfo("America/New_York"))
-    reveal_is_open = False
-    reveal_at = None
-
     if week_for_reveal:
-        reveal_at = _week_reveal_dt(season, week_for_reveal)
-        reveal_is_open = now_et >= reveal_at
         bets    = bets.filter(week=week_for_reveal)
         parlays = parlays.filter(week=week_for_reveal)
         # If reveal not open yet, hide pending for that week
@@ -243,225 +380,138 @@ def league_dashboard(request, season_year: int):
         bets = bets.filter(parlay_selected=False)
     # else '' (All): no filter
 
-    bets    = bets.order_by("week", "team__name", "user__username", "bet_type")
-    parlays = parlays.order_by("week", "team__name")
+    bet_page, next_cursor = keyset_page(bets, DASHBOARD_BET_ORDER, after, DASHBOARD_PAGE_SIZE)
+    # parlays are one row per team-week; show them with the first page only
+    parlays = list(parlays.order_by("week", "team__name")) if not after else []
 
-    return render(request, "league/dashboard.html", {
-        "season": season,
-        "bets": bets,
+    return {
+        "bets": bet_page,
+        "next_cursor": next_cursor,
         "parlays": parlays,
-
-        # filter widgets
         "filter_weeks": filter_weeks,
         "filter_users": filter_users,
         "filter_teams": filter_teams,
-        "sel_week": sel_week,
-        "sel_user": sel_user,
-        "sel_team": sel_team,
-        "sel_parlay": sel_parlay,
-
-        # reveal info (use in a banner if you want)
-        "reveal_is_open": reveal_is_open,
-        "reveal_at_et": reveal_at,
-        "now_et": now_et,
-    })
+    }
 
+@read_only_view
+@conditional_page("standings")
 def standings(request, season_year: int):
-    from django.db.models import Count, Q  # local import to keep this drop-in self-contained
-
     season = get_object_or_404(Season, year=season_year)
-
-    # ---------- existing tables ----------
-    indiv = (
-        Bet.objects.filter(season=season).exclude(status="PENDING")
-        .values("user__username")
-        .annotate(
-            units=Sum(
-                Case(
-                    When(status="WON", then=(F("stake_units") * ((Case(
-                        When(american_odds__gte=100, then=(1 + F("american_odds") / 100.0)),
-                        default=(1 + 100.0 / (F("american_odds") * -1.0))
-                    )) - 1.0)) ),
-                    When(status="LOST", then=(-1.0 * F("stake_units"))),
-                    default=0.0, output_field=FloatField(),
-                )
-            )
-        )
-        .order_by("-units")
+    payload = league_cache.cached_payload("standings", season, lambda: standings_payload(season))
+    return render(request, "league/standings.html", {"season": season, **payload})
+
+# Chart series, densified by the database: every team and every user with a
+# BET ledger row, cross-joined with weeks 0..last, left-joined to the week's
+# ledger units, then summed in week order into running totals. Weeks without
+# rows carry the total forward. (Recursive CTE + window SUM: PostgreSQL and SQLite.)
+RUNNING_TOTALS_SQL = """
+WITH RECURSIVE weeks(week) AS (
+    SELECT 0 UNION ALL SELECT week + 1 FROM weeks WHERE week < %(last)s
+),
+series(kind, key, label) AS (
+    SELECT 'team', t.id, t.name FROM {team} t WHERE t.season_id = %(season)s
+    UNION ALL
+    SELECT DISTINCT 'user', u.id, u.username
+    FROM {ledger} l JOIN {user} u ON u.id = l.user_id
+    WHERE l.season_id = %(season)s AND l.source = 'BET'
+),
+points(kind, key, week, units) AS (
+    SELECT 'team', team_id, week, SUM(units) FROM {ledger}
+    WHERE season_id = %(season)s AND source <> 'FUTURE' GROUP BY team_id, week
+    UNION ALL
+    SELECT 'user', user_id, week, SUM(units) FROM {ledger}
+    WHERE season_id = %(season)s AND source = 'BET' GROUP BY user_id, week
+)
+SELECT s.kind, s.key, s.label, w.week,
+       SUM(COALESCE(p.units, 0.0)) OVER (PARTITION BY s.kind, s.key ORDER BY w.week)
+FROM series s CROSS JOIN weeks w
+LEFT JOIN points p ON p.kind = s.kind AND p.key = s.key AND p.week = w.week
+ORDER BY s.kind, s.label, w.week
+"""
+
+def _running_totals(season, last_week: int) -> dict:
+    """{("team", team_id) | ("user", username): [running units for weeks 0..last_week]}."""
+    conn = connections[UnitsLedger.objects.db]  # the router's read alias
+    sql = RUNNING_TOTALS_SQL.format(
+        team=conn.ops.quote_name(Team._meta.db_table),
+        user=conn.ops.quote_name(User._meta.db_table),
+        ledger=conn.ops.quote_name(UnitsLedger._meta.db_table),
     )
-
-    parlay_units = (
-        TeamParlay.objects.filter(season=season).exclude(status="PENDING")
-        .values("team__id")
-        .annotate(
-            units=Sum(
-                Case(
-                    When(status="WON", then=(F("stake_units") * (F("decimal_odds") - 1.0)) ),
-                    When(status="LOST", then=(-1.0 * F("stake_units"))),
-                    default=0.0, output_field=FloatField(),
-                )
-            )
-        )
-    )
-    parlay_map = {row["team__id"]: row["units"] for row in parlay_units}
-
-    # Team futures units (settled only)
-    futures_units = (
-        FuturePick.objects.filter(season=season).exclude(status="PENDING")
-        .values("team__id")
-        .annotate(
-            units=Sum(
-                Case(
-                    When(status="WON", then=(F("stake_units") * (
-                        Case(
-                            When(american_odds__gte=100, then=(1 + F("american_odds") / 100.0)),
-                            default=(1 + 100.0 / (F("american_odds") * -1.0))
-                        ) - 1.0
-                    ))),
-                    When(status="LOST", then=(-1.0 * F("stake_units"))),
-                    default=0.0, output_field=FloatField(),
-                )
-            )
-        )
-    )
-    futures_map = {row["team__id"]: row["units"] for row in futures_units}
-
-    team_units = (
-        season.teams.all()
-        .annotate(
-            indiv_units=Sum(
-                Case(
-                    When(bets__status="WON", then=(F("bets__stake_units") * (
-                        Case(
-                            When(bets__american_odds__gte=100, then=(1 + F("bets__american_odds") / 100.0)),
-                            default=(1 + 100.0 / (F("bets__american_odds") * -1.0))
-                        ) - 1.0
-                    ))),
-                    When(bets__status="LOST", then=(-1.0 * F("bets__stake_units"))),
-                    default=0.0, output_field=FloatField(),
-                )
-            )
-        )
+    series = defaultdict(list)
+    with conn.cursor() as cursor:
+        cursor.execute(sql, {"season": season.pk, "last": last_week})
+        for kind, key, label, _, cum in cursor.fetchall():
+            series[(kind, key if kind == "team" else label)].append(round(cum, 4))
+    return series
+
+def standings_payload(season) -> dict:
+    """Everything standings.html needs except the season itself (cached per data_version)."""
+    season_teams = list(season.teams.order_by("name"))
+
+    # One indexed read of the materialized ledger (see league/ledger.py) for the tables
+    entries = list(
+        UnitsLedger.objects.filter(season=season)
+        .values_list("team_id", "user__username", "week", "source", "units", "wins", "losses", "pushes")
     )
+
+    # ---------- tables ----------
+    team_totals = defaultdict(lambda: {"BET": 0.0, "PARLAY": 0.0, "FUTURE": 0.0})
+    user_units = defaultdict(float)
+    settled_users = set()
+    per_week = defaultdict(lambda: {"WON": 0, "LOST": 0, "PUSH": 0})
+    last_settled_week = 0
+
+    for team_id, uname, week, source, units, wins, losses, pushes in entries:
+        team_totals[team_id][source] += units
+        settled = wins + losses + pushes
+        if source == "FUTURE":
+            continue
+        if settled:
+            last_settled_week = max(last_settled_week, week)
+        if source == "BET":
+            user_units[uname] += units
+            if settled:
+                settled_users.add(uname)
+            c = per_week[(uname, week)]
+            c["WON"] += wins
+            c["LOST"] += losses
+            c["PUSH"] += pushes
+
     teams = []
-    for t in team_units:
-        pu = parlay_map.get(t.id, 0.0)
-        fu = futures_map.get(t.id, 0.0)
-        total = (t.indiv_units or 0.0) + pu + fu
+    for t in season_teams:
+        totals = team_totals.get(t.id, {"BET": 0.0, "PARLAY": 0.0, "FUTURE": 0.0})
         teams.append({
             "team": t,
-            "indiv_units": t.indiv_units or 0.0,
-            "parlay_units": pu,
-            "futures_units": fu,
-            "total_units": total,
+            "indiv_units": totals["BET"],
+            "parlay_units": totals["PARLAY"],
+            "futures_units": totals["FUTURE"],
+            "total_units": totals["BET"] + totals["PARLAY"] + totals["FUTURE"],
         })
     teams.sort(key=lambda x: x["total_units"], reverse=True)
 
-    # ---------- charts ----------
-    # Determine the last week with any settled result (bets or parlays)
-    settled_bet_weeks = set(
-        Bet.objects.filter(season=season).exclude(status="PENDING")
-        .values_list("week", flat=True).distinct()
-    )
-    settled_parlay_weeks = set(
-        TeamParlay.objects.filter(season=season).exclude(status="PENDING")
-        .values_list("week", flat=True).distinct()
+    indiv = sorted(
+        ({"user__username": u, "units": user_units[u]} for u in settled_users),
+        key=lambda r: r["units"], reverse=True,
     )
-    last_settled_week = max(settled_bet_weeks | settled_parlay_weeks, default=0)
 
+    # ---------- charts ----------
     # X-axis for charts: start with 0 for visual baseline, then 1..last_settled_week
     weeks = [0] + list(range(1, last_settled_week + 1))
+    running = _running_totals(season, last_settled_week)
 
-    # Per-bet PnL expression
-    bet_pnl_expr = Case(
-        When(status="WON", then=(F("stake_units") * (
-            Case(
-                When(american_odds__gte=100, then=(1 + F("american_odds") / 100.0)),
-                default=(1 + 100.0 / (F("american_odds") * -1.0))
-            ) - 1.0
-        ))),
-        When(status="LOST", then=(-1.0 * F("stake_units"))),
-        default=0.0, output_field=FloatField(),
-    )
+    team_series = [
+        {"label": t.name, "data": running[("team", t.id)]}
+        for t in season_teams
+    ]
 
-    # Team week deltas (indiv + parlay)
-    indiv_by_team_week = (
-        Bet.objects.filter(season=season).exclude(status="PENDING")
-        .values("team__name", "week")
-        .annotate(units=Sum(bet_pnl_expr))
-    )
-    parlay_by_team_week = (
-        TeamParlay.objects.filter(season=season).exclude(status="PENDING")
-        .values("team__name", "week")
-        .annotate(
-            units=Sum(
-                Case(
-                    When(status="WON", then=(F("stake_units") * (F("decimal_odds") - 1.0))),
-                    When(status="LOST", then=(-1.0 * F("stake_units"))),
-                    default=0.0, output_field=FloatField(),
-                )
-            )
-        )
-    )
-
-    team_week_delta = {}
-    for row in indiv_by_team_week:
-        team_week_delta.setdefault(row["team__name"], {}).setdefault(row["week"], 0.0)
-        team_week_delta[row["team__name"]][row["week"]] += float(row["units"] or 0.0)
-    for row in parlay_by_team_week:
-        team_week_delta.setdefault(row["team__name"], {}).setdefault(row["week"], 0.0)
-        team_week_delta[row["team__name"]][row["week"]] += float(row["units"] or 0.0)
-
-    team_series = []
-    for team in season.teams.order_by("name"):
-        name = team.name
-        cum = 0.0
-        data = []
-        wk_map = team_week_delta.get(name, {})
-        for w in weeks:
-            cum += float(wk_map.get(w, 0.0))
-            data.append(round(cum, 4))
-        team_series.append({"label": name, "data": data})
-
-    # User week deltas
-    user_by_week = (
-        Bet.objects.filter(season=season).exclude(status="PENDING")
-        .values("user__username", "week")
-        .annotate(units=Sum(bet_pnl_expr))
-    )
-    user_week_delta = {}
-    for row in user_by_week:
-        user_week_delta.setdefault(row["user__username"], {})[row["week"]] = float(row["units"] or 0.0)
-
-    user_series = []
-    usernames = (
-        Bet.objects.filter(season=season)
-        .values_list("user__username", flat=True).distinct()
-    )
-    for uname in sorted(set(usernames)):
-        cum = 0.0
-        data = []
-        wk_map = user_week_delta.get(uname, {})
-        for w in weeks:
-            cum += float(wk_map.get(w, 0.0))
-            data.append(round(cum, 4))
-        user_series.append({"label": uname, "data": data})
-
-    # ---------- STINKER/HEATER charts (portable, computed in Python) ----------
-    # Pull the settled rows we need (username, week, status)
-    rows = list(
-        Bet.objects.filter(season=season)
-            .exclude(status="PENDING")
-            .values_list("user__username", "week", "status")
-    )
-
-    # Count outcomes per (user, week)
-    per_week = defaultdict(lambda: {"WON": 0, "LOST": 0, "PUSH": 0})
-    for uname, week, status in rows:
-        if status in ("WON", "LOST", "PUSH"):
-            per_week[(uname, week)][status] += 1
+    # Every user with any bet this season (pending included) is on the axis
+    all_usernames = sorted(label for kind, label in running if kind == "user")
+    user_series = [
+        {"label": uname, "data": running[("user", uname)]}
+        for uname in all_usernames
+    ]
 
-    # Tally stinkers/heaters per user
+    # ---------- STINKER/HEATER charts ----------
     stinker_cnt = Counter()
     heater_cnt  = Counter()
     for (uname, week), c in per_week.items():
@@ -471,14 +521,6 @@ def standings(request, season_year: int):
         if c["WON"] == 3 and c["LOST"] == 0 and c["PUSH"] == 0:
             heater_cnt[uname]  += 1
 
-    # Make sure every user with any bet this season is on the axis
-    all_usernames = list(
-        Bet.objects.filter(season=season)
-            .values_list("user__username", flat=True)
-            .distinct()
-            .order_by("user__username")
-    )
-
     stinker_labels = all_usernames
     stinker_data   = [int(stinker_cnt.get(u, 0)) for u in stinker_labels]
 
@@ -486,8 +528,7 @@ def standings(request, season_year: int):
     heater_data    = [int(heater_cnt.get(u, 0)) for u in heater_labels]
 
 
-    return render(request, "league/standings.html", {
-        "season": season,
+    return {
         "teams": teams,
         "individuals": indiv,
         "chart_weeks": weeks,
@@ -498,18 +539,141 @@ def standings(request, season_year: int):
         "stinker_data": stinker_data,
         "heater_labels": heater_labels,
         "heater_data": heater_data,
-    })
+    }
+
+# ----- chart data API (standings.html fetches this instead of inlining the series) -----
+CHART_DATA_FORMAT = 2  # bump when the JSON shape changes so old ETags stop matching
+USER_CHART_K = 10        # users chart: the K best and K worst running totals
+BAR_CHART_LIMIT = 30     # heater/stinker: everyone up to this many users, then the top counts
+USER_FETCH_LIMIT = 20    # ?users=a,b,... names per request
+CHART_SCALE = 100        # values are sent as integer hundredths of a unit
+
+def _since_week(request):
+    """?since_week=N as an int, None when absent; raises ValueError when malformed."""
+    raw = request.GET.get("since_week", "").strip()
+    return int(raw) if raw else None
+
+def _requested_users(request):
+    """?users=a,b,c as a de-duplicated list (at most USER_FETCH_LIMIT), None when absent."""
+    raw = request.GET.get("users", "")
+    names = list(dict.fromkeys(n.strip() for n in raw.split(",") if n.strip()))
+    return names[:USER_FETCH_LIMIT] or None
+
+def _chart_data_etag(request, season_year: int):
+    row = Season.objects.filter(year=season_year).values_list("pk", "data_version").first()
+    if row is None:
+        return None
+    try:
+        since = _since_week(request)
+    except ValueError:
+        return None
+    users = _requested_users(request)
+    users_key = hashlib.md5(",".join(users).encode()).hexdigest()[:12] if users else ""
+    # the series only change when data_version does, so this names the exact bytes
+    return f"charts-{CHART_DATA_FORMAT}-{row[0]}-v{row[1]}-s{'' if since is None else since}-u{users_key}"
+
+def pack_series(series, start=0) -> dict:
+    """
+    Columnar encoding: labels once, then every series' points from week index
+    `start` on, concatenated row by row as integer hundredths. With n weeks on
+    the axis, series i is values[i*n:(i+1)*n] / scale.
+    """
+    return {
+        "labels": [s["label"] for s in series],
+        "scale": CHART_SCALE,
+        "values": [round(v * CHART_SCALE) for s in series for v in s["data"][start:]],
+    }
 
+def top_bottom(series, k: int):
+    """The k highest and k lowest series by final value (everyone if that's all of them), best first."""
+    ranked = sorted(series, key=lambda s: (-s["data"][-1] if s["data"] else 0.0, s["label"]))
+    if len(ranked) <= 2 * k:
+        return ranked
+    return ranked[:k] + ranked[-k:]
 
+def _bar_chart(labels, data, limit: int) -> dict:
+    if len(labels) > limit:  # too many bars to read: keep the biggest counts
+        ranked = sorted(zip(labels, data), key=lambda x: (-x[1], x[0]))[:limit]
+        labels, data = [l for l, _ in ranked], [d for _, d in ranked]
+    return {"labels": labels, "data": data}
 
+def chart_data_payload(season, payload, since_week=None, users=None) -> dict:
+    """
+    Chart data from a standings payload, size bounded whatever the league size:
+    all teams, the top/bottom USER_CHART_K users, and capped bar charts.
+    users=[...] returns just those users' full series instead (for on-demand
+    lines). With since_week, only the points after that week, plus each
+    series' value at since_week ("anchor") so the client can check its copy
+    still lines up before appending.
+    """
+    weeks = payload["chart_weeks"]  # [0, 1, ..., last_settled_week]
+    user_series = payload["user_chart_series"]
+    head = {
+        "format": CHART_DATA_FORMAT,
+        "season": season.year,
+        "version": season.data_version,
+        "last_settled_week": payload["last_settled_week"],
+    }
+    if users is not None:
+        by_name = {s["label"]: s for s in user_series}
+        found = [by_name[u] for u in users if u in by_name]
+        return {**head, "weeks": weeks, "users": pack_series(found),
+                "missing": [u for u in users if u not in by_name]}
+
+    start = 0 if since_week is None else min(max(since_week + 1, 0), len(weeks))
+    teams = payload["team_chart_series"]
+    shown = top_bottom(user_series, USER_CHART_K)
+
+    def anchor(series):
+        return [round(s["data"][start - 1] * CHART_SCALE) for s in series]
+
+    return {
+        **head,
+        "since_week": since_week,
+        "weeks": weeks[start:],
+        "teams": pack_series(teams, start),
+        "users": pack_series(shown, start),
+        "user_count": len(user_series),
+        "anchor": {"teams": anchor(teams), "users": anchor(shown)} if start else None,
+        "stinker": _bar_chart(payload["stinker_labels"], payload["stinker_data"], BAR_CHART_LIMIT),
+        "heater": _bar_chart(payload["heater_labels"], payload["heater_data"], BAR_CHART_LIMIT),
+    }
+
+@read_only_view
+@condition(etag_func=_chart_data_etag)
+def standings_chart_data(request, season_year: int):
+    """
+    ?since_week=N  only points after week N (see chart_data_payload)
+    ?users=a,b     full series for just these users
+    """
+    season = get_object_or_404(Season, year=season_year)
+    try:
+        since_week = _since_week(request)
+    except ValueError:
+        return HttpResponseBadRequest("since_week must be an integer")
+    # no stale fallback: the client stores this under the current version and merges deltas onto it
+    payload = league_cache.cached_payload("standings", season, lambda: standings_payload(season), stale_ok=False)
+    data = chart_data_payload(season, payload, since_week, users=_requested_users(request))
+    response = JsonResponse(data, json_dumps_params={"separators": (",", ":")})
+    patch_cache_control(response, no_cache=True)  # always revalidate; a 304 costs one tiny query
+    return response
+
+@read_only_view
 def user_stats(request, username: str):
     user = get_object_or_404(User, username=username)
-    bets = Bet.objects.filter(user=user).exclude(status="PENDING")
+    # archived seasons' bets live in their own table; keep the old pk order across both
+    bets = sorted(
+        chain(
+            BetArchive.objects.filter(user=user).select_related("season"),
+            Bet.objects.filter(user=user).exclude(status="PENDING").select_related("season"),
+        ),
+        key=lambda b: b.id,
+    )
     biggest_hit = max((b.pnl_units for b in bets if b.pnl_units > 0), default=0.0)
     # Simple streak calc (improve later)
     streak = 0
     best_streak = 0
-    for b in bets.order_by("created_at"):
+    for b in sorted(bets, key=lambda b: b.created_at):
         if b.status == "WON":
             streak += 1
             best_streak = max(best_streak, streak)
@@ -580,8 +744,8 @@ def submit_pick_week_picker(request, season_year: int):
 
     # ---- WEEK TILES (exclude futures week=0 if you use that) ----
     rows = (
-        Bet.objects
-        .filter(user=request.user, season=season)
+        bets_for(season)
+        .filter(user=request.user)
         .exclude(week=0)  # don't let futures affect weekly tiles
         .values("week", "bet_type", "parlay_selected")
     )
@@ -614,7 +778,7 @@ def standings_data_debug(request, season_year: int):
 
     # What statuses does prod actually have?
     statuses = list(
-        Bet.objects.filter(season=season)
+        bets_for(season)
         .values_list("status", flat=True)
         .distinct()
         .order_by("status")
@@ -622,7 +786,7 @@ def standings_data_debug(request, season_year: int):
 
     # Weekly roll-up (per user/week)
     weekly = (
-        Bet.objects.filter(season=season)
+        bets_for(season)
           .exclude(status="PENDING")
           .values("user_id", "user__username", "week")
           .annotate(
@@ -651,7 +815,7 @@ def standings_data_debug(request, season_year: int):
     )
 
     all_usernames = list(
-        Bet.objects.filter(season=season)
+        bets_for(season)
           .values_list("user__username", flat=True)
           .distinct()
           .order_by("user__username")
@@ -732,4 +896,65 @@ def submit_futures(request, season_year: int):
         "season": season,
         "team": team,
         "form": form,
-    })
\ No newline at end of file
+    })
+@staff_member_required
+def export_season(request, season_year: int):
+    """
+    Stream every bet, parlay and future for a season as CSV or NDJSON.
+    ?format=csv|ndjson  &week=N  &team=<team id>
+    """
+    season = get_object_or_404(Season, year=season_year)
+    fmt = request.GET.get("format", "csv").strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        week = int(request.GET["week"]) if request.GET.get("week") else None
+    except ValueError:
+        return HttpResponseBadRequest("week must be an integer")
+    team = None
+    if request.GET.get("team"):
+        team = season.teams.filter(pk=request.GET["team"]).first() if request.GET["team"].isdigit() else None
+        if team is None:
+            return HttpResponseBadRequest("unknown team for this season")
+
+    suffix = (f"-w{week}" if week is not None else "") + (f"-team{team.pk}" if team else "")
+    response = StreamingHttpResponse(iter_export(fmt, season, week=week, team=team), content_type=EXPORT_FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="season-{season.year}{suffix}.{fmt}"'
+    return response
+
+@staff_member_required
+def exposure_report(request, season_year: int):
+    """
+    Pending stake, potential return and parlay concentration per game and
+    pick for one week (?week=N, default: the earliest week still pending).
+    Reads the Exposure table, which the write paths keep current.
+    """
+    season = get_object_or_404(Season, year=season_year)
+    weeks = list(Exposure.objects.filter(season=season).order_by("week").values_list("week", flat=True).distinct())
+    try:
+        week = int(request.GET["week"]) if request.GET.get("week") else (weeks[0] if weeks else 1)
+    except ValueError:
+        return HttpResponseBadRequest("week must be an integer")
+
+    games = league_exposure.report(season, week)
+    totals = {
+        key: sum(g[key] for g in games)
+        for key in ("bets", "stake", "potential_return", "parlay_legs", "swing")
+    }
+    return render(request, "league/exposure.html", {
+        "season": season, "week": week, "weeks": weeks, "games": games, "totals": totals,
+    })
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint (league/metrics.py), merged across workers.
+    Staff session, or `Authorization: Bearer <METRICS_TOKEN>` for a scraper.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(league_metrics.render(), content_type=league_metrics.CONTENT_TYPE)
+    return _staff_metrics(request)
+
+@staff_member_required
+def _staff_metrics(request):
+    return HttpResponse(league_metrics.render(), content_type=league_metrics.CONTENT_TYPE)